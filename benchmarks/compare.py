@@ -0,0 +1,95 @@
+"""
+Compare two pytest-benchmark JSON results and fail on regressions.
+
+Save results with ``uv run pytest benchmarks --benchmark-json=results.json``,
+then compare a change against a baseline (e.g. from the main branch)::
+
+    uv run python -m benchmarks.compare baseline.json results.json
+
+A benchmark regresses when its mean time grows by more than
+``--time-tolerance`` or its recorded peak memory by more than
+``--memory-tolerance`` (fractions, 0.2 meaning 20%). The exit status is 1 if
+any benchmark regressed, so the command can gate CI.
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline_time: float
+    current_time: float
+    baseline_memory: int | None
+    current_memory: int | None
+
+    @property
+    def time_ratio(self) -> float:
+        return self.current_time / self.baseline_time
+
+    @property
+    def memory_ratio(self) -> float | None:
+        if not self.baseline_memory or self.current_memory is None:
+            return None
+        return self.current_memory / self.baseline_memory
+
+
+def _load(path: str) -> dict[str, dict[str, Any]]:
+    with open(path) as f:
+        return {b["fullname"]: b for b in json.load(f)["benchmarks"]}
+
+
+def compare(baseline_path: str, current_path: str) -> list[Comparison]:
+    """Pair up the benchmarks present in both result files."""
+    baseline, current = _load(baseline_path), _load(current_path)
+    return [
+        Comparison(
+            name,
+            baseline[name]["stats"]["mean"],
+            current[name]["stats"]["mean"],
+            baseline[name].get("extra_info", {}).get("peak_memory_bytes"),
+            current[name].get("extra_info", {}).get("peak_memory_bytes"),
+        )
+        for name in sorted(baseline.keys() & current.keys())
+    ]
+
+
+def regressions(
+    comparisons: list[Comparison], time_tolerance: float, memory_tolerance: float
+) -> list[str]:
+    """Return a description of every benchmark that got too slow or too big."""
+    found = []
+    for c in comparisons:
+        if c.time_ratio > 1 + time_tolerance:
+            found.append(f"{c.name}: mean time x{c.time_ratio:.2f}")
+        memory_ratio = c.memory_ratio
+        if memory_ratio is not None and memory_ratio > 1 + memory_tolerance:
+            found.append(f"{c.name}: peak memory x{memory_ratio:.2f}")
+    return found
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--time-tolerance", type=float, default=0.2)
+    parser.add_argument("--memory-tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    comparisons = compare(args.baseline, args.current)
+    for c in comparisons:
+        memory = f"x{c.memory_ratio:.2f}" if c.memory_ratio is not None else "-"
+        print(f"{c.name:<80} time x{c.time_ratio:.2f}  memory {memory}")
+
+    found = regressions(comparisons, args.time_tolerance, args.memory_tolerance)
+    for regression in found:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+import tracemalloc
+
+import pytest
+
+
+@pytest.fixture
+def record_peak_memory(benchmark):
+    """
+    Return a function that calls its arguments once under tracemalloc.
+
+    The peak is stored in the benchmark's extra_info, where compare.py finds it.
+    tracemalloc only sees allocations made through Python's allocator, so it
+    understates the memory used inside C extensions such as lxml.
+    """
+
+    def record(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory_bytes"] = peak
+        return result
+
+    return record
@@ -0,0 +1,81 @@
+"""Synthetic BFZ-style listing pages for benchmarks."""
+
+import datetime as dt
+
+_EVENT_TEMPLATE = """
+<article class="event" data-event-id="{event_id}">
+    <div class="event__date">
+        <div class="day">{day}</div><div class="month">{month}</div><div class="year">{year}</div><div class="time">14:30</div>
+    </div>
+    <figure class="event__media">
+        <a href="/en/program/{event_id}/"><img class="event__img" src="/media/images/{event_id}.jpg" alt="Cocoa Concert"></a>
+    </figure>
+    <div class="event__content">
+        <h1 class="event__title"><a href="/en/program/{event_id}/">Cocoa Concert</a></h1>
+        <p class="event__subtitle">Illési</p>
+        <div class="event__fn">
+            <a class="event__venue" href="/en/location/12">BFO Rehearsal Hall, Budapest</a>
+            {ticket}
+        </div>
+    </div>
+</article>
+"""
+
+_BUY = '<a class="event__buy-btn" href="https://jegy.bfz.hu/program/{event_id}">Buy tickets</a>'
+_SOLD_OUT = '<span class="event__soldout">Sold out</span>'
+
+# Stand-in for the navigation, scripts and footer around the event list.
+_PAGE_FILLER = "<div class='menu'>" + "<a href='/en/page/'>Page</a>" * 200 + "</div>"
+
+
+def _every(i: int, ratio: float) -> bool:
+    # Spreads the marked events evenly, e.g. every fourth one for a ratio of 0.25
+    return int((i + 1) * ratio) > int(i * ratio)
+
+
+def make_listing_page(
+    n_events: int,
+    start: dt.date = dt.date(2025, 1, 1),
+    *,
+    sold_out_ratio: float = 0.25,
+    malformed_ratio: float = 0.0,
+) -> str:
+    """
+    Return a listing page with *n_events* events on consecutive days.
+
+    A *sold_out_ratio* share of them is sold out and a *malformed_ratio* share
+    has a month that cannot be parsed; both are spread evenly over the page.
+    """
+    events = []
+    for i in range(n_events):
+        date = start + dt.timedelta(days=i)
+        sold_out = _every(i, sold_out_ratio)
+        events.append(
+            _EVENT_TEMPLATE.format(
+                event_id=i,
+                day=date.day,
+                month="Smarch" if _every(i, malformed_ratio) else date.strftime("%B"),
+                year=date.year,
+                ticket=_SOLD_OUT if sold_out else _BUY.format(event_id=i),
+            )
+        )
+    return (
+        "<!DOCTYPE html><html><head><title>Cocoa Concerts</title></head><body>"
+        f"{_PAGE_FILLER}<section class='block--event-list'><div class='block__body'>"
+        f"{''.join(events)}</div></section>{_PAGE_FILLER}</body></html>"
+    )
+
+
+def listing_dates(
+    n_events: int,
+    start: dt.date = dt.date(2025, 1, 1),
+    *,
+    sold_out_ratio: float = 0.25,
+    malformed_ratio: float = 0.0,
+) -> list[dt.date]:
+    """Return the dates a parser should find on the matching make_listing_page()."""
+    return [
+        start + dt.timedelta(days=i)
+        for i in range(n_events)
+        if not _every(i, sold_out_ratio) and not _every(i, malformed_ratio)
+    ]
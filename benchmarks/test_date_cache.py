@@ -0,0 +1,81 @@
+"""
+New-date detection and updates against a large DateCache.
+
+Compares DateCache.find_new_dates, which bisects the sorted ordinal index,
+with the previous set-difference implementation on a cache of a million
+dates, and times update() writing through LocalStorage.
+Run with ``uv run pytest benchmarks``.
+"""
+
+import datetime as dt
+
+import pytest
+
+from src.storage import DateCache, LocalStorage
+
+CACHE_SIZE = 1_000_000
+SCRAPED_COUNTS = [100, 10_000]
+
+_FIRST = dt.date(1, 1, 1).toordinal()
+
+
+def _set_based_find_new_dates(cached, current):
+    # The implementation find_new_dates replaced
+    return sorted(set(current) - set(cached))
+
+
+@pytest.fixture(scope="module")
+def big_cache(tmp_path_factory):
+    storage = LocalStorage(str(tmp_path_factory.mktemp("cache")))
+    cache = DateCache(storage=storage, key="dates.bin")
+    # Every other day, so half of the scraped dates below are new
+    cache.update(dt.date.fromordinal(_FIRST + 2 * i) for i in range(CACHE_SIZE))
+    return cache
+
+
+def _scraped(count):
+    step = 2 * CACHE_SIZE // count
+    return [dt.date.fromordinal(_FIRST + i * step + i % 2) for i in range(count)]
+
+
+@pytest.mark.parametrize("count", SCRAPED_COUNTS, ids=lambda n: f"{n}-scraped")
+def test_find_new_dates_sorted_index(benchmark, record_peak_memory, big_cache, count):
+    current = _scraped(count)
+    record_peak_memory(big_cache.find_new_dates, current)
+
+    result = benchmark(big_cache.find_new_dates, current)
+
+    assert len(result) == count // 2
+
+
+@pytest.mark.parametrize("count", SCRAPED_COUNTS, ids=lambda n: f"{n}-scraped")
+def test_find_new_dates_set_based(benchmark, record_peak_memory, big_cache, count):
+    current = _scraped(count)
+    # The old cache kept a plain list of dates
+    cached = list(big_cache.dates)
+    record_peak_memory(_set_based_find_new_dates, cached, current)
+
+    result = benchmark.pedantic(
+        _set_based_find_new_dates, args=(cached, current), rounds=5, iterations=1
+    )
+
+    assert result == big_cache.find_new_dates(current)
+
+
+@pytest.mark.parametrize("size", [1_000, CACHE_SIZE], ids=lambda n: f"{n}-dates")
+def test_update_local_storage(benchmark, record_peak_memory, tmp_path, size):
+    storage = LocalStorage(str(tmp_path))
+    dates = [dt.date.fromordinal(_FIRST + i) for i in range(size)]
+    keys = (f"dates-{i}.bin" for i in range(1_000))
+
+    def fresh_cache():
+        # A new key each round, so every update really writes
+        return (DateCache(storage=storage, key=next(keys)), dates), {}
+
+    args, _ = fresh_cache()
+    record_peak_memory(DateCache.update, *args)
+    benchmark.pedantic(
+        DateCache.update, setup=fresh_cache, rounds=3 if size == CACHE_SIZE else 20
+    )
+
+    assert DateCache(storage, "dates-0.bin").dates == dates
@@ -0,0 +1,83 @@
+"""
+Full ConcertTrackerService runs against a local HTTP server (src.replay).
+
+Each run fetches a generated listing page over HTTP, parses it, diffs it
+against a DateCache in LocalStorage and hands the new dates to a notifier
+that only records them. The run's own metrics (see src.metrics) are stored
+in the benchmark's extra_info next to its peak memory.
+Run with ``uv run pytest benchmarks``.
+"""
+
+import datetime as dt
+import itertools
+
+import pytest
+
+from benchmarks.pages import listing_dates, make_listing_page
+from src.config import Settings
+from src.metrics import run_metrics
+from src.notifications import NotificationService
+from src.replay import ReplayServer
+from src.runtime import create_session
+from src.service import ConcertTrackerService
+from src.storage import DateCache, LocalStorage
+
+EVENT_COUNTS = [100, 5_000]
+SCENARIOS = ["first-run", "some-new", "not-modified"]
+
+
+class RecordingNotifier(NotificationService):
+    def __init__(self):
+        self.delivered: list[dt.date] = []
+
+    def send_notification(self, dates):
+        self.delivered.extend(dates)
+
+
+@pytest.fixture(scope="module", params=EVENT_COUNTS, ids=lambda n: f"{n}-events")
+def site(request):
+    n_events = request.param
+    with ReplayServer({"/listing": make_listing_page(n_events)}) as server:
+        yield f"{server.url}/listing", listing_dates(n_events)
+
+
+@pytest.fixture(scope="module")
+def session():
+    session = create_session()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_service_run(benchmark, record_peak_memory, tmp_path, site, session, scenario):
+    url, dates = site
+    config = Settings(
+        telegram_token="token", telegram_chat_id="chat", bucket="bucket", url=url
+    )
+    directories = (tmp_path / str(i) for i in itertools.count())
+
+    known = len(dates) * 9 // 10
+
+    def fresh_service():
+        storage = LocalStorage(str(next(directories)))
+        if scenario == "some-new":
+            # The page gained a tenth of its dates since the last run
+            DateCache(storage, config.storage_file).update(dates[:known])
+        elif scenario == "not-modified":
+            ConcertTrackerService(config, storage, RecordingNotifier(), session).run()
+        service = ConcertTrackerService(config, storage, RecordingNotifier(), session)
+        return (service,), {}
+
+    (service,), _ = fresh_service()
+    with run_metrics() as metrics:
+        record_peak_memory(service.run)
+    benchmark.extra_info["run_metrics"] = metrics.as_dict()
+
+    benchmark.pedantic(ConcertTrackerService.run, setup=fresh_service, rounds=5)
+
+    expected = {
+        "first-run": dates,
+        "some-new": dates[known:],
+        "not-modified": [],
+    }[scenario]
+    assert service.notification_service.delivered == expected
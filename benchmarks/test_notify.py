@@ -0,0 +1,59 @@
+"""
+Notifying many subscribers through the emulated Telegram API of src.replay.
+
+Every request takes 20 ms, as over a real connection, and the server refuses
+messages beyond 30 per second with 429 (retry after 1 s) like Telegram's
+flood control. Compares the fan-out's pacing below that limit with sending
+faster than it and relying on the retries.
+Run with ``uv run pytest benchmarks``.
+"""
+
+import datetime as dt
+
+import pytest
+
+from src.replay import ReplayServer
+from src.runtime import create_session
+from src.subscribers import FanOutNotificationService, Subscriber
+
+SUBSCRIBERS = 60
+DATES = [dt.date(2025, 3, 1) + dt.timedelta(days=7 * i) for i in range(10)]
+
+
+@pytest.fixture(scope="module")
+def server():
+    with ReplayServer(latency=0.02, telegram_rate=30, retry_after=1) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def session():
+    session = create_session()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize("rate", [25, 100], ids=lambda r: f"{r}-per-second")
+def test_fan_out(benchmark, server, session, rate):
+    notifier = FanOutNotificationService(
+        "token",
+        [Subscriber(str(i)) for i in range(SUBSCRIBERS)],
+        session=session,
+        messages_per_second=rate,
+        max_concurrency=16,
+        max_attempts=5,
+        api_url=server.url,
+    )
+
+    def fan_out():
+        # Start every round with a fresh flood control budget
+        server.reset()
+        notifier.deliver(DATES)
+
+    benchmark.pedantic(fan_out, rounds=3, iterations=1)
+
+    assert all(r.delivered == DATES for r in notifier.last_results)
+    # Of the last round
+    benchmark.extra_info["rate_limited"] = sum(
+        1 for _, _, status in server.requests if status == 429
+    )
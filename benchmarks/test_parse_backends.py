@@ -0,0 +1,49 @@
+"""
+Parse latency and peak memory of every parser backend.
+
+Run with ``uv run pytest benchmarks``.
+"""
+
+import pytest
+
+from benchmarks.pages import listing_dates, make_listing_page
+from src.scraper import PARSER_BACKENDS, parse_html_content
+
+EVENT_COUNTS = [10, 1_000, 50_000]
+
+# (sold-out ratio, malformed ratio) of the generated pages
+PAGE_MIXES = {"typical": (0.25, 0.0), "messy": (0.5, 0.1)}
+
+
+@pytest.fixture(
+    scope="module",
+    params=[(n, mix) for n in EVENT_COUNTS for mix in PAGE_MIXES],
+    ids=lambda p: f"{p[0]}-events-{p[1]}",
+)
+def page(request):
+    n_events, mix = request.param
+    sold_out_ratio, malformed_ratio = PAGE_MIXES[mix]
+    html = make_listing_page(
+        n_events, sold_out_ratio=sold_out_ratio, malformed_ratio=malformed_ratio
+    )
+    expected = listing_dates(
+        n_events, sold_out_ratio=sold_out_ratio, malformed_ratio=malformed_ratio
+    )
+    return n_events, html, expected
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+def test_parse_backend(benchmark, record_peak_memory, backend, page):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    n_events, html, expected = page
+
+    dates = record_peak_memory(parse_html_content, html, backend=backend)
+    benchmark.extra_info["html_bytes"] = len(html)
+
+    rounds = 1 if n_events >= 10_000 else 10
+    result = benchmark.pedantic(
+        parse_html_content, args=(html, backend), rounds=rounds, iterations=1
+    )
+
+    assert result == dates == expected
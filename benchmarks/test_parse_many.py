@@ -0,0 +1,38 @@
+"""
+Throughput of parse_many on a backfill-sized batch of listing pages.
+
+Compares parsing in-process with a pool of one worker per core; the pool only
+pays off on multi-core hosts. Run with ``uv run pytest benchmarks``.
+"""
+
+import datetime as dt
+import os
+
+import pytest
+
+from benchmarks.pages import listing_dates, make_listing_page
+from src.scraper import parse_many
+
+PAGES = 16
+EVENTS_PER_PAGE = 1_000
+
+
+@pytest.fixture(scope="module")
+def documents():
+    return [make_listing_page(EVENTS_PER_PAGE).encode() for _ in range(PAGES)]
+
+
+@pytest.mark.parametrize("workers", [1, os.process_cpu_count() or 1])
+def test_parse_many(benchmark, documents, workers):
+    benchmark.extra_info["html_bytes"] = sum(map(len, documents))
+
+    parsed = benchmark.pedantic(
+        parse_many,
+        args=(documents, "stream"),
+        kwargs={"max_workers": workers},
+        rounds=3,
+        iterations=1,
+    )
+
+    expected = listing_dates(EVENTS_PER_PAGE)
+    assert all([dt.date.fromordinal(o) for o in p] == expected for p in parsed)
@@ -0,0 +1,76 @@
+"""
+Latency of one tracker run when every round trip is slow.
+
+Storage operations and HTTP responses (from src.replay) each take 20 ms, as
+S3 and bfz.hu do from Lambda. Compares run()'s overlapping of the state
+load with the fetch, and of delivery with the final writes, against loading
+the state up front as the sequential run used to.
+Run with ``uv run pytest benchmarks``.
+"""
+
+import itertools
+import time
+
+import pytest
+
+from benchmarks.pages import make_listing_page
+from src.config import Settings
+from src.notifications import TelegramNotificationService
+from src.replay import ReplayServer
+from src.runtime import create_session
+from src.service import ConcertTrackerService
+from src.storage import InMemoryStorage
+
+ROUND_TRIP = 0.02
+
+
+class SlowStorage(InMemoryStorage):
+    def read_versioned(self, key):
+        time.sleep(ROUND_TRIP)
+        return super().read_versioned(key)
+
+    def write(self, key, data):
+        time.sleep(ROUND_TRIP)
+        super().write(key, data)
+
+    def write_if_match(self, key, data, version):
+        time.sleep(ROUND_TRIP)
+        return super().write_if_match(key, data, version)
+
+
+@pytest.fixture(scope="module")
+def server():
+    with ReplayServer(
+        {"/listing": make_listing_page(100)}, latency=ROUND_TRIP
+    ) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def session():
+    session = create_session()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize("overlapped", [False, True], ids=["state-first", "overlapped"])
+def test_first_run_latency(benchmark, server, session, overlapped):
+    config = Settings(
+        "token", "chat", "bucket", url=f"{server.url}/listing", replay_url=server.url
+    )
+    tokens = (str(i) for i in itertools.count())
+
+    def run():
+        service = ConcertTrackerService(
+            config,
+            SlowStorage(),
+            TelegramNotificationService(
+                next(tokens), "chat", session=session, api_url=config.telegram_api_url
+            ),
+            session=session,
+        )
+        if not overlapped:
+            service.load_state()
+        return service.run()
+
+    benchmark.pedantic(run, rounds=10, iterations=1)
@@ -9,7 +9,7 @@ mkdir -p package
 
 # Export requirements using uv and install them into the package directory
 # This ensures we only get runtime dependencies and matches the lockfile exactly
-uv export --format requirements-txt --no-dev --no-hashes > requirements.txt
+uv export --format requirements-txt --no-dev --all-extras --no-hashes > requirements.txt
 pip install \
 --platform manylinux2014_aarch64 \
 --target=package \
@@ -1,13 +1,27 @@
 import json
 import logging
+import time
 from typing import Any
 
-from src.config import get_config
-from src.service import create_service
+from src.profiling import ImportProfiler, PhaseTimer, profiling_enabled
+
+_init_started = time.perf_counter()
+# Installed before the remaining imports so that they are profiled as well
+_import_profiler = ImportProfiler() if profiling_enabled() else None
+if _import_profiler is not None:
+    _import_profiler.install()
+
+from src.config import get_config  # noqa: E402
+from src.metrics import run_metrics  # noqa: E402
+from src.runtime import get_runtime, invalidate_runtime  # noqa: E402
+from src.service import create_service  # noqa: E402
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+_init_ms = (time.perf_counter() - _init_started) * 1e3
+_cold_start = True
+
 
 def _is_query_command(update: Any, authorized_chat_id: str) -> bool:
     """Check if the Telegram update contains a /query command from an authorized chat."""
@@ -30,39 +44,82 @@ def _is_query_command(update: Any, authorized_chat_id: str) -> bool:
     return text == "/query"
 
 
+def _profile_report(timer: PhaseTimer) -> dict[str, Any]:
+    """Collect the phase timings, plus init and import timings on a cold start."""
+    global _cold_start
+    report: dict[str, Any] = {"cold_start": _cold_start, "phases_ms": timer.as_dict()}
+    if _cold_start:
+        report["init_ms"] = _init_ms
+    if _import_profiler is not None:
+        report["imports"] = _import_profiler.slowest()
+        _import_profiler.records.clear()
+    _cold_start = False
+    return report
+
+
 def lambda_handler(event: dict[str, Any] | None, context: object) -> dict[str, Any]:  # pyright: ignore[reportUnusedParameter]
     logger.info("Lambda handler started")
 
     event = event or {}
     force = event.get("force", False)
-
-    try:
-        config = get_config()
-
-        # Check if the event is a Telegram webhook update
-        # 1. From API Gateway/Function URL (body is a string)
-        body = event.get("body")
-        if body and isinstance(body, str):
-            try:
-                update = json.loads(body)
-                if _is_query_command(update, config.telegram_chat_id):
-                    logger.info("Received authorized /query from Telegram webhook.")
-                    force = True
-            except json.JSONDecodeError:
-                pass
-        # 2. Direct event (e.g. from Telegram Lambda integration or direct invoke)
-        elif _is_query_command(event, config.telegram_chat_id):
-            logger.info("Received authorized /query from Telegram direct event.")
-            force = True
-
-        service = create_service(config)
-        service.run(force=force)
-
-        return {"statusCode": 200, "body": json.dumps({"status": "ok"})}
-
-    except Exception as e:
-        logger.exception(f"Unhandled exception in lambda_handler: {e}")
-        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+    timer = PhaseTimer()
+    runtime = None
+
+    with run_metrics() as metrics:
+        try:
+            # Config, HTTP session and S3 client are reused by warm invocations
+            with timer.phase("runtime"):
+                runtime = get_runtime()
+            config = runtime.config
+
+            # Check if the event is a Telegram webhook update
+            # 1. From API Gateway/Function URL (body is a string)
+            body = event.get("body")
+            if body and isinstance(body, str):
+                try:
+                    update = json.loads(body)
+                    if _is_query_command(update, config.telegram_chat_id):
+                        logger.info("Received authorized /query from Telegram webhook.")
+                        force = True
+                except json.JSONDecodeError:
+                    pass
+            # 2. Direct event (e.g. from Telegram Lambda integration or direct invoke)
+            elif _is_query_command(event, config.telegram_chat_id):
+                logger.info("Received authorized /query from Telegram direct event.")
+                force = True
+
+            if event.get("action") == "compact_archive":
+                # Scheduled maintenance rather than a tracker run
+                from src.archive import compact_archive
+
+                with timer.phase("run"), metrics.timer("run_ms"):
+                    compact_archive(config, runtime.storage)
+            else:
+                with timer.phase("create_service"):
+                    service = create_service(config, runtime)
+                with timer.phase("run"), metrics.timer("run_ms"):
+                    service.run(force=force)
+
+            status_code, body = 200, {"status": "ok"}
+
+        except Exception as e:
+            logger.exception(f"Unhandled exception in lambda_handler: {e}")
+            metrics.incr("errors")
+            # Start from scratch next time in case a cached client is in a bad state
+            invalidate_runtime()
+            status_code, body = 500, {"error": str(e)}
+
+    if runtime is not None:
+        metrics.dimensions["Mode"] = "query" if force else "scheduled"
+        try:
+            runtime.metrics_sink.emit(metrics)
+        except Exception as e:
+            logger.error(f"Failed to emit run metrics: {e}")
+
+    if profiling_enabled():
+        body["profile"] = _profile_report(timer)
+        logger.info(f"Cold start profile: {json.dumps(body['profile'])}")
+    return {"statusCode": status_code, "body": json.dumps(body)}
 
 
 if __name__ == "__main__":
@@ -77,7 +134,7 @@ if __name__ == "__main__":
 
     storage = LocalStorage(base_dir=".")
     notifier = TelegramNotificationService(
-        config.telegram_token, config.telegram_chat_id
+        config.telegram_token, config.telegram_chat_id, api_url=config.telegram_api_url
     )
     service = ConcertTrackerService(config, storage, notifier)
 
@@ -0,0 +1,473 @@
+"""
+Append-only history of what the listing showed and when.
+
+Every scrape result is a snapshot: the listed events (or just the dates) and
+the time it was first and last seen. Identical consecutive snapshots only
+extend the time span of the previous one, so polling an unchanged page every
+minute costs no extra bytes. Snapshot contents are stored in compressed,
+content-addressed segments under ``<prefix>segments/`` and referenced from a
+single index at ``<prefix>index.bin``; a content seen before is never stored
+twice. compact() merges the segments of old snapshots, which compresses
+similar snapshots much better than one segment each.
+
+The index format is::
+
+    magic b"CSI" | version (u8) | count (u32) | crc32 of payload (u32) | payload
+
+where the payload is zlib-compressed and holds, for *count* snapshots ordered
+by time, the first and last time seen (i64 unix seconds), the segment (u32
+index into the segment names), offset and length (u32) of the content in the
+uncompressed segment, its digest (16 bytes each), and the segment names as
+NUL-separated ASCII. Time-range queries bisect the time columns and only read
+the segments of the matching snapshots.
+"""
+
+import argparse
+import bisect
+import datetime as dt
+import hashlib
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from src import metrics
+from src.config import Settings, get_config
+from src.events import Event, EventState
+from src.storage import (
+    CacheFormatError,
+    EventCache,
+    LocalStorage,
+    S3Storage,
+    Storage,
+    WriteConflictError,
+)
+
+logger = logging.getLogger()
+
+# Merged segments are cut at about this many uncompressed bytes
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+
+_DIGEST_SIZE = 16
+_CONTENT_HEADER = struct.Struct("<I")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """The listing as it was from *first_seen* until *last_seen*."""
+
+    first_seen: dt.datetime
+    last_seen: dt.datetime
+    events: tuple[Event, ...]
+
+    @property
+    def dates(self) -> list[dt.date]:
+        """The dates with tickets, like the scraper reports them."""
+        return [event.date for event in self.events if not event.sold_out]
+
+
+class _Entry(NamedTuple):
+    first_seen: int
+    last_seen: int
+    segment: str
+    offset: int
+    length: int
+    digest: bytes
+
+
+def _timestamp(moment: dt.datetime) -> int:
+    return int(moment.timestamp())
+
+
+def _datetime(timestamp: int) -> dt.datetime:
+    return dt.datetime.fromtimestamp(timestamp, dt.UTC)
+
+
+class SnapshotArchive:
+    """Records scrape results under *prefix* in *storage* and answers queries on them."""
+
+    MAGIC = b"CSI"
+    VERSION = 1
+    _HEADER = struct.Struct("<3sBII")
+    MAX_WRITE_ATTEMPTS = 5
+    # Decompressed segments kept around for queries
+    SEGMENT_CACHE_SIZE = 8
+
+    def __init__(self, storage: Storage, prefix: str = "archive/"):
+        self._storage = storage
+        self._prefix = prefix
+        self._version: str | None = None
+        self._entries: list[_Entry] = self._load()
+        self._segments: OrderedDict[str, bytes] = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Index format
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def encode(cls, entries: list[_Entry]) -> bytes:
+        names: dict[str, int] = {}
+        columns = [
+            array("q", (e.first_seen for e in entries)),
+            array("q", (e.last_seen for e in entries)),
+            array("I", (names.setdefault(e.segment, len(names)) for e in entries)),
+            array("I", (e.offset for e in entries)),
+            array("I", (e.length for e in entries)),
+        ]
+        if sys.byteorder == "big":
+            for column in columns:
+                column.byteswap()
+        body = b"".join(c.tobytes() for c in columns)
+        body += b"".join(e.digest for e in entries)
+        body += "\0".join(names).encode()
+        payload = zlib.compress(body)
+        header = cls._HEADER.pack(
+            cls.MAGIC, cls.VERSION, len(entries), zlib.crc32(payload)
+        )
+        return header + payload
+
+    @classmethod
+    def decode(cls, raw: bytes) -> list[_Entry]:
+        if len(raw) < cls._HEADER.size or not raw.startswith(cls.MAGIC):
+            raise CacheFormatError("Not a snapshot index")
+        _, version, count, checksum = cls._HEADER.unpack_from(raw)
+        if version != cls.VERSION:
+            raise CacheFormatError(f"Unsupported snapshot index version: {version}")
+        payload = raw[cls._HEADER.size :]
+        if zlib.crc32(payload) != checksum:
+            raise CacheFormatError("Snapshot index checksum mismatch")
+        body = zlib.decompress(payload)
+        columns: list[array] = []
+        offset = 0
+        for typecode in ("q", "q", "I", "I", "I"):
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(body[offset : offset + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+            offset += size
+        digests = body[offset : offset + _DIGEST_SIZE * count]
+        names = body[offset + _DIGEST_SIZE * count :].decode().split("\0")
+        firsts, lasts, segments, offsets, lengths = columns
+        return [
+            _Entry(
+                firsts[i],
+                lasts[i],
+                names[segments[i]],
+                offsets[i],
+                lengths[i],
+                digests[i * _DIGEST_SIZE : (i + 1) * _DIGEST_SIZE],
+            )
+            for i in range(count)
+        ]
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self._prefix}index.bin"
+
+    def _segment_key(self, name: str) -> str:
+        return f"{self._prefix}segments/{name}"
+
+    def _load(self) -> list[_Entry]:
+        raw, self._version = self._storage.read_versioned(self._index_key)
+        return self.decode(raw) if raw is not None else []
+
+    def reload(self) -> None:
+        """Re-read the index from storage."""
+        self._entries = self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _content(events: Iterable[Event]) -> bytes:
+        count, body = EventCache.pack((event, EventState.of(event)) for event in events)
+        return _CONTENT_HEADER.pack(count) + body
+
+    def _write_segment(self, contents: list[bytes]) -> tuple[str, list[int]]:
+        """Store *contents* as one segment; return its name and their offsets."""
+        offsets, position = [], 0
+        for content in contents:
+            offsets.append(position)
+            position += len(content)
+        raw = b"".join(contents)
+        # Content-addressed, so writing the same segment twice is harmless
+        name = hashlib.sha256(raw).hexdigest()[:32]
+        self._storage.write(self._segment_key(name), zlib.compress(raw, 9))
+        return name, offsets
+
+    def _update(self, apply: Callable[[list[_Entry]], bool]) -> bool:
+        """
+        Change a copy of the index with *apply* and write it back.
+
+        *apply* returns whether it changed anything. On a concurrent write the
+        index is reloaded and *apply* runs again on the other writer's version.
+        """
+        for attempt in range(1, self.MAX_WRITE_ATTEMPTS + 1):
+            entries = list(self._entries)
+            if not apply(entries):
+                return False
+            try:
+                self._version = self._storage.write_if_match(
+                    self._index_key, self.encode(entries), self._version
+                )
+            except WriteConflictError:
+                if attempt == self.MAX_WRITE_ATTEMPTS:
+                    raise
+                metrics.incr("cache_write_conflicts")
+                logger.info(
+                    f"Snapshot index changed concurrently, retrying (attempt {attempt})"
+                )
+                self.reload()
+                continue
+            self._entries = entries
+            return True
+        raise AssertionError("unreachable")
+
+    def record(self, events: Iterable[Event], at: dt.datetime) -> bool:
+        """
+        Record the listing *events* as seen at *at*.
+
+        Returns True if it differs from the previous snapshot, False if that
+        one was only extended to *at*.
+        """
+        content = self._content(events)
+        digest = hashlib.sha256(content).digest()[:_DIGEST_SIZE]
+        stamp = _timestamp(at)
+        changed = False
+
+        def apply(entries: list[_Entry]) -> bool:
+            nonlocal changed
+            if entries and entries[-1].digest == digest:
+                changed = False
+                last = entries[-1]
+                entries[-1] = last._replace(last_seen=max(last.last_seen, stamp))
+                return True
+            changed = True
+            # Times only go forward, even if clocks or overlapping runs disagree
+            first_seen = max(stamp, entries[-1].last_seen) if entries else stamp
+            known = next((e for e in reversed(entries) if e.digest == digest), None)
+            if known is not None:
+                segment, offset = known.segment, known.offset
+            else:
+                segment, (offset,) = self._write_segment([content])
+            entries.append(
+                _Entry(first_seen, first_seen, segment, offset, len(content), digest)
+            )
+            return True
+
+        self._update(apply)
+        metrics.incr("archive_snapshots_new" if changed else "archive_snapshots_same")
+        return changed
+
+    def touch(self, at: dt.datetime) -> None:
+        """Note that the listing was unchanged at *at*, e.g. after a 304."""
+        stamp = _timestamp(at)
+
+        def apply(entries: list[_Entry]) -> bool:
+            if not entries or entries[-1].last_seen >= stamp:
+                return False
+            entries[-1] = entries[-1]._replace(last_seen=stamp)
+            return True
+
+        self._update(apply)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _read_segment(self, name: str) -> bytes:
+        raw = self._segments.get(name)
+        if raw is not None:
+            self._segments.move_to_end(name)
+            return raw
+        stored = self._storage.read(self._segment_key(name))
+        if stored is None:
+            raise CacheFormatError(f"Snapshot segment {name} is missing")
+        raw = zlib.decompress(stored)
+        self._segments[name] = raw
+        if len(self._segments) > self.SEGMENT_CACHE_SIZE:
+            self._segments.popitem(last=False)
+        return raw
+
+    def _snapshot(self, entry: _Entry) -> Snapshot:
+        content = self._read_segment(entry.segment)[
+            entry.offset : entry.offset + entry.length
+        ]
+        (count,) = _CONTENT_HEADER.unpack_from(content)
+        entries = EventCache.unpack(count, content[_CONTENT_HEADER.size :])
+        return Snapshot(
+            _datetime(entry.first_seen),
+            _datetime(entry.last_seen),
+            tuple(event for event, _ in entries),
+        )
+
+    def snapshots(
+        self, start: dt.datetime | None = None, end: dt.datetime | None = None
+    ) -> Iterator[Snapshot]:
+        """Yield the snapshots seen between *start* and *end*, oldest first."""
+        low = 0
+        if start is not None:
+            low = bisect.bisect_left(
+                self._entries, _timestamp(start), key=lambda e: e.last_seen
+            )
+        high = len(self._entries)
+        if end is not None:
+            high = bisect.bisect_right(
+                self._entries, _timestamp(end), key=lambda e: e.first_seen
+            )
+        for entry in self._entries[low:high]:
+            yield self._snapshot(entry)
+
+    def at(self, moment: dt.datetime) -> Snapshot | None:
+        """Return the last snapshot first seen at or before *moment*."""
+        i = bisect.bisect_right(
+            self._entries, _timestamp(moment), key=lambda e: e.first_seen
+        )
+        return self._snapshot(self._entries[i - 1]) if i else None
+
+    def timeline(
+        self, key: str, start: dt.datetime | None = None, end: dt.datetime | None = None
+    ) -> list[tuple[dt.datetime, EventState]]:
+        """
+        Return when the event with Event.key *key* changed state, and to what.
+
+        The first entry is when it was first listed; a snapshot without it
+        counts as REMOVED. For a date tracked without event details, the key
+        is ``Event(date).key``.
+        """
+        changes: list[tuple[dt.datetime, EventState]] = []
+        for snapshot in self.snapshots(start, end):
+            found = next((e for e in snapshot.events if e.key == key), None)
+            if found is not None:
+                state = EventState.of(found)
+            elif changes:
+                state = EventState.REMOVED
+            else:
+                continue
+            if not changes or changes[-1][1] is not state:
+                changes.append((snapshot.first_seen, state))
+        return changes
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def _merge(
+        self, contents: dict[bytes, bytes], segment_size: int
+    ) -> dict[bytes, tuple[str, int]]:
+        """Write *contents* (by digest) to new segments; return where each went."""
+        batches: list[list[bytes]] = [[]]
+        size = 0
+        for digest, content in contents.items():
+            if batches[-1] and size + len(content) > segment_size:
+                batches.append([])
+                size = 0
+            batches[-1].append(digest)
+            size += len(content)
+        locations: dict[bytes, tuple[str, int]] = {}
+        for batch in batches:
+            name, offsets = self._write_segment([contents[d] for d in batch])
+            locations.update((d, (name, o)) for d, o in zip(batch, offsets))
+        return locations
+
+    def compact(
+        self, before: dt.datetime, segment_size: int = DEFAULT_SEGMENT_SIZE
+    ) -> int:
+        """
+        Merge the segments only holding snapshots last seen before *before*.
+
+        Segments already at least *segment_size* bytes (uncompressed) are left
+        alone. Returns the number of segments merged away.
+        """
+        cutoff = _timestamp(before)
+        merged: list[str] = []
+
+        def apply(entries: list[_Entry]) -> bool:
+            merged.clear()
+            sizes: dict[str, int] = {}
+            recent: set[str] = set()
+            for e in entries:
+                sizes[e.segment] = max(sizes.get(e.segment, 0), e.offset + e.length)
+                if e.last_seen >= cutoff:
+                    recent.add(e.segment)
+            merged.extend(
+                name
+                for name, size in sizes.items()
+                if name not in recent and size < segment_size
+            )
+            if len(merged) < 2:
+                return False
+            candidates = set(merged)
+            # Each distinct content once, in the order it was first seen
+            contents: dict[bytes, bytes] = {}
+            for e in entries:
+                if e.segment in candidates and e.digest not in contents:
+                    raw = self._read_segment(e.segment)
+                    contents[e.digest] = raw[e.offset : e.offset + e.length]
+            locations = self._merge(contents, segment_size)
+            for i, e in enumerate(entries):
+                if e.segment in candidates:
+                    segment, offset = locations[e.digest]
+                    entries[i] = e._replace(segment=segment, offset=offset)
+            return True
+
+        if not self._update(apply):
+            return 0
+        # A batch of one content is rewritten under its old, content-addressed name
+        referenced = {e.segment for e in self._entries}
+        removed = [name for name in merged if name not in referenced]
+        for name in removed:
+            self._segments.pop(name, None)
+            self._storage.delete(self._segment_key(name))
+        logger.info(f"Merged {len(removed)} snapshot segments")
+        return len(removed)
+
+
+def compact_archive(config: Settings, storage: Storage) -> int:
+    """Compact the archive of *config* and of every tracker configured."""
+    # src.trackers builds on src.service, which uses this module
+    from src.trackers import load_tracker_specs
+
+    if not config.archive_prefix:
+        logger.info("Snapshot archive disabled, nothing to compact")
+        return 0
+    before = dt.datetime.now(dt.UTC) - dt.timedelta(days=config.archive_compact_days)
+    prefixes = [config.archive_prefix] + [
+        spec.settings(config).archive_prefix
+        for spec in load_tracker_specs(storage, config.trackers_file)
+    ]
+    return sum(SnapshotArchive(storage, prefix).compact(before) for prefix in prefixes)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the snapshot archive.")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument(
+        "--storage-dir",
+        help="use the archive in this local directory instead of the S3 bucket",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    config = get_config()
+    storage: Storage
+    if args.storage_dir is not None:
+        storage = LocalStorage(base_dir=args.storage_dir)
+    else:
+        storage = S3Storage(config.bucket)
+    compact_archive(config, storage)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Seed or rebuild the date cache from saved listing pages instead of a crawl.
+
+Pages are read from directories, zip and tar archives (optionally compressed)
+and WARC files (``.warc`` or ``.warc.gz``), parsed in batches with parse_many
+on every core, and the dates of all of them are written to the cache at once::
+
+    uv run python -m src.backfill --storage-dir state/ saved-pages/ crawl.warc.gz
+
+Sources are streamed, so only one batch of pages is in memory at a time. By
+default the dates are merged into the stored cache; ``--replace`` overwrites
+it without reading it, e.g. to rebuild it after a format change.
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import tarfile
+import time
+import zipfile
+import zlib
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from io import BufferedIOBase
+from itertools import batched
+
+from src.config import get_config
+from src.scraper import parse_many
+from src.storage import DateCache, DateView, LocalStorage, S3Storage, Storage
+
+logger = logging.getLogger()
+
+# Pages parsed per parse_many call, which bounds the memory held at once.
+BATCH_SIZE = 256
+
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+_WARC_SUFFIXES = (".warc", ".warc.gz")
+
+
+@dataclass
+class BackfillStats:
+    """What a backfill read and wrote."""
+
+    pages: int = 0
+    bytes: int = 0
+    # Distinct dates found in the pages
+    dates: int = 0
+    # Dates that were not in the stored cache before
+    added: int = 0
+    seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+
+def _read_headers(stream: BufferedIOBase) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    for line in iter(stream.readline, b""):
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _dechunk(body: bytes) -> bytes:
+    parts: list[bytes] = []
+    pos = 0
+    while True:
+        end = body.index(b"\r\n", pos)
+        size = int(body[pos:end].split(b";", 1)[0], 16)
+        if size == 0:
+            return b"".join(parts)
+        parts.append(body[end + 2 : end + 2 + size])
+        pos = end + 2 + size + 2
+
+
+def _http_body(block: bytes) -> bytes | None:
+    """Return the body of a successful HTML response recorded in a WARC, or None."""
+    head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    parts = status_line.split()
+    if len(parts) < 2 or parts[1] != "200":
+        return None
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+    if "html" not in headers.get("content-type", "html"):
+        return None
+    if headers.get("transfer-encoding") == "chunked":
+        body = _dechunk(body)
+    encoding = headers.get("content-encoding", "identity")
+    if encoding in ("gzip", "x-gzip"):
+        body = gzip.decompress(body)
+    elif encoding != "identity":
+        logger.warning(f"Skipping response with unsupported encoding: {encoding}")
+        return None
+    return body
+
+
+def _iter_warc(stream: BufferedIOBase, name: str) -> Iterator[tuple[str, bytes]]:
+    while line := stream.readline():
+        if not line.strip():
+            continue
+        offset = stream.tell() - len(line)
+        if not line.startswith(b"WARC/"):
+            logger.error(
+                f"No WARC record at offset {offset} of {name}, skipping the rest"
+            )
+            return
+        headers = _read_headers(stream)
+        uri = headers.get("warc-target-uri", name)
+        length = int(headers.get("content-length", "0").strip() or 0)
+        block = stream.read(length)
+        if len(block) < length:
+            logger.error(f"Truncated WARC record at offset {offset} of {name}: {uri}")
+            return
+        if headers.get("warc-type") != "response" or not headers.get(
+            "content-type", ""
+        ).startswith("application/http"):
+            continue
+        try:
+            body = _http_body(block)
+        except (ValueError, EOFError, OSError, zlib.error) as e:
+            logger.warning(
+                f"Skipping malformed WARC record at offset {offset} of {name}: "
+                f"{uri}: {e}"
+            )
+            continue
+        if body is not None:
+            yield uri, body
+
+
+def _iter_zip(path: str) -> Iterator[tuple[str, bytes]]:
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            try:
+                body = archive.read(info)
+            except (zipfile.BadZipFile, EOFError, OSError, zlib.error) as e:
+                logger.warning(
+                    f"Skipping damaged member {info.filename} of {path}: {e}"
+                )
+                continue
+            yield f"{path}:{info.filename}", body
+
+
+def _iter_tar(path: str) -> Iterator[tuple[str, bytes]]:
+    # Stream mode reads members in order without seeking back
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            file = archive.extractfile(member) if member.isfile() else None
+            if file is not None:
+                yield f"{path}:{member.name}", file.read()
+
+
+def _iter_file(path: str) -> Iterator[tuple[str, bytes]]:
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        try:
+            yield from _iter_zip(path)
+        except (zipfile.BadZipFile, OSError) as e:
+            logger.error(f"Skipping unreadable zip archive {path}: {e}")
+    elif lower.endswith(_TAR_SUFFIXES):
+        try:
+            yield from _iter_tar(path)
+        except (tarfile.TarError, EOFError, OSError, zlib.error) as e:
+            # A stream can't skip past damage, so the rest of the archive is lost
+            logger.error(f"Stopped reading {path}: {e}")
+    elif lower.endswith(_WARC_SUFFIXES):
+        opener = gzip.open if lower.endswith(".gz") else open
+        try:
+            with opener(path, "rb") as stream:
+                yield from _iter_warc(stream, path)
+        except (EOFError, OSError, ValueError) as e:
+            # A damaged gzip member or header ends the file, not the backfill
+            logger.error(f"Stopped reading {path}: {e}")
+    else:
+        with open(path, "rb") as f:
+            yield path, f.read()
+
+
+def iter_pages(sources: Iterable[str]) -> Iterator[tuple[str, bytes]]:
+    """
+    Yield the (name, body) of every page saved in *sources*.
+
+    A source is a page, an archive or WARC file, or a directory, searched
+    recursively in name order for any of those. Hidden files are skipped.
+    """
+    for source in sources:
+        if not os.path.isdir(source):
+            yield from _iter_file(source)
+            continue
+        for root, dirs, files in os.walk(source):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if not name.startswith("."):
+                    yield from _iter_file(os.path.join(root, name))
+
+
+# ---------------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------------
+
+
+def backfill(
+    sources: Iterable[str],
+    storage: Storage,
+    key: str,
+    *,
+    backend: str = "stream",
+    replace: bool = False,
+    batch_size: int = BATCH_SIZE,
+    max_workers: int | None = None,
+) -> BackfillStats:
+    """
+    Parse the pages saved in *sources* and store their dates in the cache at *key*.
+
+    Like a run of the tracker, only the dates of events that weren't sold out
+    count. They are merged into the stored cache in one conditional write, or
+    with *replace* written over it. Progress is logged after every batch.
+    """
+    stats = BackfillStats()
+    ordinals: set[int] = set()
+    started = time.perf_counter()
+    for batch in batched(iter_pages(sources), batch_size):
+        bodies = [body for _, body in batch]
+        for page in parse_many(bodies, backend, max_workers=max_workers):
+            ordinals.update(page)
+        stats.pages += len(bodies)
+        stats.bytes += sum(map(len, bodies))
+        stats.seconds = time.perf_counter() - started
+        logger.info(
+            f"Parsed {stats.pages} pages ({stats.bytes / 1e6:.1f} MB), "
+            f"{len(ordinals)} dates so far: {stats.pages_per_second:.0f} pages/s, "
+            f"{stats.megabytes_per_second:.1f} MB/s"
+        )
+    stats.dates = len(ordinals)
+    dates = DateView(array("I", sorted(ordinals)))
+    if replace:
+        storage.write(key, DateCache.encode(dates))
+        stats.added = stats.dates
+    else:
+        cache = DateCache(storage, key)
+        stats.added = len(cache.update([*cache.dates, *dates]))
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        f"Backfilled {stats.dates} dates ({stats.added} new) from {stats.pages} "
+        f"pages into {key} in {stats.seconds:.2f} s"
+    )
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Fill the date cache from saved listing pages."
+    )
+    parser.add_argument(
+        "sources", nargs="+", help="pages, directories, zip, tar or WARC files"
+    )
+    parser.add_argument(
+        "--storage-dir",
+        help="write to the cache in this local directory instead of the S3 bucket",
+    )
+    parser.add_argument("--key", help="cache key (default: STORAGE_FILE)")
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="overwrite the stored cache instead of merging into it",
+    )
+    parser.add_argument("--workers", type=int, help="parser processes (default: cores)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    config = get_config()
+    storage: Storage
+    if args.storage_dir is not None:
+        storage = LocalStorage(base_dir=args.storage_dir)
+    else:
+        storage = S3Storage(config.bucket)
+    backfill(
+        args.sources,
+        storage,
+        args.key or config.storage_file,
+        backend=config.parser_backend,
+        replace=args.replace,
+        max_workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
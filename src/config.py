@@ -1,8 +1,7 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
-
-from dotenv import load_dotenv
+from urllib.parse import urlsplit, urlunsplit
 
 
 @dataclass
@@ -14,6 +13,80 @@ class Settings:
     url: str = (
         "https://bfz.hu/en/concerts-tickets/concerts-and-festivals/cocoa-concerts/"
     )
+    validators_file: str = "validators.json"
+    # Also track every event with its state and report changes, see src.events;
+    # only for a single listing page
+    track_events: bool = False
+    events_file: str = "events.bin"
+    # Dates parsed from up to parse_cache_size recently seen event lists, see
+    # src.storage.ParseCache; 0 disables it. Pages are then buffered rather
+    # than parsed while they download, so it only pays off for the bs4 and
+    # lxml backends and for crawls.
+    parse_cache_file: str = "parse_cache.json"
+    parse_cache_size: int = 0
+    # Keep every scrape result under this key prefix, see src.archive;
+    # empty disables the archive. Compaction merges snapshots older than
+    # archive_compact_days.
+    archive_prefix: str = ""
+    archive_compact_days: int = 7
+    # Dates found but not yet announced, see src.outbox
+    outbox_file: str = "outbox.bin"
+    # Chats to notify of new dates; telegram_chat_id is used when there are none
+    subscribers_file: str = "subscribers.json"
+    # Subscribers already sent dates still in the outbox, see src.subscribers
+    subscriber_progress_file: str = "subscriber_progress.json"
+    # Global cap on Telegram messages sent per second when notifying subscribers
+    notify_rate: float = 25.0
+    # Several listings tracked by one deployment, see src.trackers; when this
+    # key holds any, url(s) and the per-tracker state keys above are ignored
+    trackers_file: str = "trackers.json"
+    tracker_concurrency: int = 4
+    # Where per-run metrics go, one of "emf", "log" or "none", see src.metrics
+    metrics_sink: str = "emf"
+    # One of "stream", "bs4" or "lxml", see src.scraper.PARSER_BACKENDS
+    parser_backend: str = "stream"
+    # Pages scraped in one run; defaults to just *url*
+    urls: list[str] = field(default_factory=list)
+    fetch_concurrency: int = 8
+    # Minimum number of seconds between two requests to the same host
+    per_host_interval: float = 0.25
+    # Follow "next" links of a single-URL listing for up to this many pages
+    max_pages: int = 1
+    # Listing sorted newest first: stop crawling at pages older than the cache
+    newest_first: bool = False
+    # Seconds a warm invocation trusts its in-memory copy of a stored object
+    storage_cache_ttl: float = 300.0
+    # Daemon mode (src.daemon): seconds between polls, growing by poll_backoff
+    # while nothing changes and reset after new dates are found
+    poll_min_interval: float = 30.0
+    poll_max_interval: float = 900.0
+    poll_backoff: float = 1.5
+    poll_jitter: float = 0.1
+    # Typical ticket release times, e.g. "Mon 10:00-11:00" or "09:55-10:15",
+    # polled every poll_hot_interval seconds
+    release_windows: list[str] = field(default_factory=list)
+    poll_hot_interval: float = 10.0
+    poll_timezone: str = "Europe/Budapest"
+    telegram_api_url: str = "https://api.telegram.org"
+    # Base URL of a src.replay server standing in for both the listing site
+    # and the Telegram API, e.g. for offline tests and benchmarks
+    replay_url: str = ""
+
+    def __post_init__(self) -> None:
+        if not self.urls:
+            self.urls = [self.url]
+        if self.replay_url:
+            self.url = _rebase(self.url, self.replay_url)
+            self.urls = [_rebase(url, self.replay_url) for url in self.urls]
+            self.telegram_api_url = self.replay_url.rstrip("/")
+
+
+def _rebase(url: str, base: str) -> str:
+    """Return *url* with the scheme and host of *base*."""
+    parts, base_parts = urlsplit(url), urlsplit(base)
+    return urlunsplit(
+        parts._replace(scheme=base_parts.scheme, netloc=base_parts.netloc)
+    )
 
 
 class ConfigError(Exception):
@@ -26,7 +99,10 @@ def get_config(env_file: Optional[str] = ".env") -> Settings:
     """
     Load configuration from environment variables and .env file.
     """
-    if env_file:
+    if env_file and os.path.exists(env_file):
+        # Only needed locally; the Lambda environment has no .env file
+        from dotenv import load_dotenv
+
         load_dotenv(env_file)
 
     t_token = os.getenv("TELEGRAM_TOKEN")
@@ -46,11 +122,47 @@ def get_config(env_file: Optional[str] = ".env") -> Settings:
     if missing:
         raise ConfigError(f"Missing required configuration: {', '.join(missing)}")
 
+    urls = [u.strip() for u in os.getenv("URLS", "").split(",") if u.strip()]
+
     return Settings(
         telegram_token=t_token,  # type: ignore
         telegram_chat_id=t_chat_id,  # type: ignore
         bucket=bucket,  # type: ignore
         storage_file=os.getenv("STORAGE_FILE", "dates.json"),
+        validators_file=os.getenv("VALIDATORS_FILE", "validators.json"),
+        track_events=os.getenv("TRACK_EVENTS", "").lower() in ("1", "true", "yes"),
+        events_file=os.getenv("EVENTS_FILE", "events.bin"),
+        parse_cache_file=os.getenv("PARSE_CACHE_FILE", "parse_cache.json"),
+        parse_cache_size=int(os.getenv("PARSE_CACHE_SIZE", "0")),
+        archive_prefix=os.getenv("ARCHIVE_PREFIX", ""),
+        archive_compact_days=int(os.getenv("ARCHIVE_COMPACT_DAYS", "7")),
+        outbox_file=os.getenv("OUTBOX_FILE", "outbox.bin"),
+        subscribers_file=os.getenv("SUBSCRIBERS_FILE", "subscribers.json"),
+        subscriber_progress_file=os.getenv(
+            "SUBSCRIBER_PROGRESS_FILE", "subscriber_progress.json"
+        ),
+        notify_rate=float(os.getenv("NOTIFY_RATE", "25")),
+        trackers_file=os.getenv("TRACKERS_FILE", "trackers.json"),
+        tracker_concurrency=int(os.getenv("TRACKER_CONCURRENCY", "4")),
+        metrics_sink=os.getenv("METRICS_SINK", "emf"),
+        parser_backend=os.getenv("PARSER_BACKEND", "stream"),
+        urls=urls,
+        fetch_concurrency=int(os.getenv("FETCH_CONCURRENCY", "8")),
+        per_host_interval=float(os.getenv("PER_HOST_INTERVAL", "0.25")),
+        max_pages=int(os.getenv("MAX_PAGES", "1")),
+        newest_first=os.getenv("NEWEST_FIRST", "").lower() in ("1", "true", "yes"),
+        storage_cache_ttl=float(os.getenv("STORAGE_CACHE_TTL", "300")),
+        poll_min_interval=float(os.getenv("POLL_MIN_INTERVAL", "30")),
+        poll_max_interval=float(os.getenv("POLL_MAX_INTERVAL", "900")),
+        poll_backoff=float(os.getenv("POLL_BACKOFF", "1.5")),
+        poll_jitter=float(os.getenv("POLL_JITTER", "0.1")),
+        release_windows=[
+            w.strip() for w in os.getenv("RELEASE_WINDOWS", "").split(",") if w.strip()
+        ],
+        poll_hot_interval=float(os.getenv("POLL_HOT_INTERVAL", "10")),
+        poll_timezone=os.getenv("POLL_TIMEZONE", "Europe/Budapest"),
+        telegram_api_url=os.getenv("TELEGRAM_API_URL", "https://api.telegram.org"),
+        replay_url=os.getenv("REPLAY_URL", ""),
         url=os.getenv(
             "URL",
             "https://bfz.hu/en/concerts-tickets/concerts-and-festivals/cocoa-concerts/",
@@ -0,0 +1,114 @@
+import datetime as dt
+import html
+import logging
+import re
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urljoin
+
+import requests
+
+from src import metrics
+from src.scraper import FetchError, parse_html_content
+from src.storage import ParseCache
+
+logger = logging.getLogger()
+
+_LINK_TAG_RE = re.compile(r"<(?:a|link)\b[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(
+    r"""([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))"""
+)
+
+
+def find_next_page_url(html_content: str, base_url: str) -> str | None:
+    """
+    Return the absolute URL of the next listing page, or None on the last page.
+
+    Recognises ``rel="next"`` on ``<a>``/``<link>`` tags as well as pagination
+    links with a "next" class or one ending in it (e.g. ``pagination__next``).
+    """
+    for match in _LINK_TAG_RE.finditer(html_content):
+        attrs = {
+            name.lower(): html.unescape(dq or sq or bare)
+            for name, dq, sq, bare in _ATTR_RE.findall(match.group(0))
+        }
+        href = attrs.get("href")
+        if not href or href.startswith("#"):
+            continue
+        rel = attrs.get("rel", "").lower().split()
+        classes = attrs.get("class", "").lower().split()
+        if "next" in rel or any(
+            c == "next" or c.endswith(("-next", "_next")) for c in classes
+        ):
+            return urljoin(base_url, href)
+    return None
+
+
+def _get_page(url: str, session: requests.Session | None) -> str:
+    logger.info(f"Requesting URL: {url}")
+    metrics.incr("fetch_requests")
+    get = session.get if session is not None else requests.get
+    try:
+        with metrics.timer("fetch_ms"):
+            response = get(url, timeout=10)
+            response.raise_for_status()
+    except requests.RequestException as e:
+        logger.error(f"Network error while fetching URL {url}: {e}")
+        metrics.incr("fetch_errors")
+        raise FetchError(f"Failed to fetch {url}: {e}") from e
+    metrics.incr("fetch_bytes", len(response.content), metrics.BYTES)
+    return response.text
+
+
+def crawl_concert_dates(
+    start_url: str,
+    *,
+    session: requests.Session | None = None,
+    backend: str = "stream",
+    max_pages: int = 10,
+    stop_before: dt.date | None = None,
+    parse_cache: ParseCache | None = None,
+) -> Iterator[list[dt.date]]:
+    """
+    Lazily yield the dates of *start_url* and the pages linked as "next" from it.
+
+    The next page is requested in the background while the current one is
+    parsed and consumed. Crawling ends after *max_pages* pages, when the
+    consumer stops iterating, or, with *stop_before*, after the first page
+    whose dates are all older than that date (for listings sorted newest
+    first, where nothing past that point can be new). Pages found in *parse_cache*
+    are not parsed again. A page that cannot be fetched raises FetchError, as
+    the crawl would otherwise look complete without the pages after it.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    seen = {start_url}
+    url = start_url
+    # Each fetch runs in a copy of this context, so it records into the same run
+    pending: Future[str] | None = executor.submit(
+        copy_context().run, _get_page, url, session
+    )
+    try:
+        while pending is not None:
+            html_content = pending.result()
+            pending = None
+
+            next_url = find_next_page_url(html_content, url)
+            if next_url is not None and next_url not in seen and len(seen) < max_pages:
+                seen.add(next_url)
+                pending = executor.submit(
+                    copy_context().run, _get_page, next_url, session
+                )
+
+            dates = parse_html_content(
+                html_content, backend=backend, parse_cache=parse_cache
+            )
+            yield dates
+            if stop_before is not None and dates and max(dates) < stop_before:
+                logger.info(f"Only dates before {stop_before} on {url}, stopping")
+                return
+            url = next_url or url
+    finally:
+        if pending is not None:
+            pending.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,223 @@
+"""
+Long-running polling mode, as an alternative to the scheduled Lambda.
+
+The service, its HTTP session and its caches stay resident between runs, so a
+poll costs one (usually conditional) request instead of a cold start and a
+reload of every stored object. Run it with ``python -m src.daemon``; SIGINT
+or SIGTERM let the current run finish before exiting.
+"""
+
+import argparse
+import datetime as dt
+import logging
+import random
+import signal
+import threading
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from zoneinfo import ZoneInfo
+
+from src.config import Settings, get_config
+from src.metrics import MetricsSink, NullSink, run_metrics
+from src.runtime import Runtime
+from src.service import ConcertTrackerService, RunStatus, create_service
+from src.trackers import MultiTrackerService
+
+logger = logging.getLogger()
+
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+@dataclass(frozen=True)
+class ReleaseWindow:
+    """A daily (or weekly, with *weekday*) period in which tickets tend to go on sale."""
+
+    start: dt.time
+    end: dt.time
+    weekday: int | None = None
+
+    @classmethod
+    def parse(cls, spec: str) -> "ReleaseWindow":
+        """Parse ``"HH:MM-HH:MM"``, optionally preceded by a weekday like ``"Mon"``."""
+        day, _, times = spec.strip().rpartition(" ")
+        weekday = None
+        if day:
+            try:
+                weekday = _WEEKDAYS.index(day.strip().lower()[:3])
+            except ValueError:
+                raise ValueError(f"Unknown weekday in release window: {spec}")
+        try:
+            start, end = (dt.time.fromisoformat(t.strip()) for t in times.split("-"))
+        except ValueError:
+            raise ValueError(f"Invalid release window: {spec} (expected HH:MM-HH:MM)")
+        if end <= start:
+            raise ValueError(f"Release window ends before it starts: {spec}")
+        return cls(start, end, weekday)
+
+    def contains(self, moment: dt.datetime) -> bool:
+        if self.weekday is not None and moment.weekday() != self.weekday:
+            return False
+        return self.start <= moment.time() < self.end
+
+    def next_start(self, moment: dt.datetime) -> dt.datetime:
+        """Return the first start of the window after *moment*."""
+        for days in range(8):
+            day = moment.date() + dt.timedelta(days=days)
+            start = dt.datetime.combine(day, self.start, tzinfo=moment.tzinfo)
+            if start > moment and self.weekday in (None, start.weekday()):
+                return start
+        raise AssertionError("a weekly window always starts within 8 days")
+
+
+class AdaptiveScheduler:
+    """Picks the delay before the next poll from the outcome of the last one.
+
+    The interval grows by *backoff* after every run that found nothing new, up
+    to *max_interval*, and drops back to *min_interval* once new dates show
+    up, as more tend to follow. Inside a release window polls are at most
+    *hot_interval* apart, and no delay runs past the start of the next window.
+    Every delay is spread by +/- *jitter* (a fraction) so polls don't fall
+    into lockstep with the server.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_interval: float = 30.0,
+        max_interval: float = 900.0,
+        backoff: float = 1.5,
+        jitter: float = 0.1,
+        windows: Iterable[ReleaseWindow] = (),
+        hot_interval: float = 10.0,
+        rng: random.Random | None = None,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.windows = list(windows)
+        self.hot_interval = hot_interval
+        self._rng = rng or random.Random()
+        self._interval = min_interval
+
+    def next_delay(self, status: RunStatus, now: dt.datetime) -> float:
+        """Return the number of seconds to wait after a run that ended with *status*."""
+        if status is RunStatus.NEW_DATES:
+            self._interval = self.min_interval
+        else:
+            self._interval = min(self._interval * self.backoff, self.max_interval)
+        delay = self._interval
+        if any(w.contains(now) for w in self.windows):
+            delay = min(delay, self.hot_interval)
+        delay *= self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+        if self.windows:
+            upcoming = min(w.next_start(now) for w in self.windows)
+            delay = min(delay, (upcoming - now).total_seconds())
+        return max(delay, 0.0)
+
+
+class Daemon:
+    """Runs *service* over and over, waiting as long as *scheduler* says in between."""
+
+    def __init__(
+        self,
+        service: ConcertTrackerService | MultiTrackerService,
+        scheduler: AdaptiveScheduler,
+        *,
+        metrics_sink: MetricsSink | None = None,
+        clock: Callable[[], dt.datetime] = dt.datetime.now,
+    ):
+        self.service = service
+        self.scheduler = scheduler
+        self.metrics_sink = metrics_sink or NullSink()
+        self._clock = clock
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Ask the loop to exit once the current run, if any, has finished."""
+        self._stop.set()
+
+    def run_once(self) -> RunStatus:
+        with run_metrics({"Mode": "daemon"}) as metrics:
+            try:
+                with metrics.timer("run_ms"):
+                    status = self.service.run()
+            except Exception as e:
+                # A resident process has to survive whatever a single run runs into
+                logger.exception(f"Run failed: {e}")
+                metrics.incr("errors")
+                status = RunStatus.FAILED
+        try:
+            self.metrics_sink.emit(metrics)
+        except Exception as e:
+            logger.error(f"Failed to emit run metrics: {e}")
+        return status
+
+    def run_forever(self, max_runs: int | None = None) -> int:
+        """Poll until stop() is called (or *max_runs* runs) and return the run count."""
+        runs = 0
+        while not self._stop.is_set():
+            status = self.run_once()
+            runs += 1
+            if max_runs is not None and runs >= max_runs:
+                break
+            delay = self.scheduler.next_delay(status, self._clock())
+            logger.info(f"Run finished ({status}), next poll in {delay:.1f}s")
+            self._stop.wait(delay)
+        logger.info(f"Daemon stopped after {runs} runs")
+        return runs
+
+
+def create_daemon(
+    config: Settings, runtime: Runtime, storage_dir: str | None = None
+) -> Daemon:
+    """Build a daemon around the production service; *storage_dir* replaces S3."""
+    storage = None
+    if storage_dir is not None:
+        from src.storage import LocalStorage
+
+        storage = LocalStorage(base_dir=storage_dir)
+    zone = ZoneInfo(config.poll_timezone)
+    scheduler = AdaptiveScheduler(
+        min_interval=config.poll_min_interval,
+        max_interval=config.poll_max_interval,
+        backoff=config.poll_backoff,
+        jitter=config.poll_jitter,
+        windows=[ReleaseWindow.parse(w) for w in config.release_windows],
+        hot_interval=config.poll_hot_interval,
+    )
+    return Daemon(
+        create_service(config, runtime, storage),
+        scheduler,
+        metrics_sink=runtime.metrics_sink,
+        clock=lambda: dt.datetime.now(zone),
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Poll for new concert dates.")
+    parser.add_argument(
+        "--storage-dir",
+        help="keep state in this local directory instead of the S3 bucket",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    config = get_config()
+    runtime = Runtime(config)
+    daemon = create_daemon(config, runtime, args.storage_dir)
+
+    def shutdown(signum: int, frame: object) -> None:
+        logger.info(f"Received {signal.Signals(signum).name}, shutting down")
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        daemon.run_forever()
+    finally:
+        runtime.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import datetime as dt
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    """One concert as listed on the page.
+
+    *url* is the link of the event's page as it appears in the listing (often
+    relative) and *event_id* the id the site gives the event, when it has one.
+    """
+
+    date: dt.date
+    time: dt.time | None = None
+    title: str = ""
+    venue: str = ""
+    url: str = ""
+    sold_out: bool = False
+    event_id: str = ""
+
+    @property
+    def key(self) -> str:
+        """Identity of the event that stays the same when it sells out."""
+        if self.event_id:
+            return f"id:{self.event_id}"
+        time = self.time.strftime("%H:%M") if self.time is not None else ""
+        return f"{self.date.isoformat()} {time} {self.title.casefold()}"
+
+    def sort_key(self) -> tuple[dt.date, dt.time, str]:
+        return (self.date, self.time or dt.time.min, self.key)
+
+
+def available_dates(events: Iterable[Event]) -> list[dt.date]:
+    """Return the dates of the events that still have tickets, in listing order."""
+    return [event.date for event in events if not event.sold_out]
+
+
+@dataclass
+class EventChanges:
+    """What changed between two listings, compared event by event."""
+
+    added: list[Event] = field(default_factory=list)
+    removed: list[Event] = field(default_factory=list)
+    # Had tickets before, sold out now
+    sold_out: list[Event] = field(default_factory=list)
+    # Sold out before, tickets again now
+    available: list[Event] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.sold_out or self.available)
+
+    def select(self, wants: Callable[[dt.date], bool]) -> "EventChanges":
+        """Return the changes to events on the dates that *wants* accepts."""
+        return EventChanges(
+            added=[e for e in self.added if wants(e.date)],
+            removed=[e for e in self.removed if wants(e.date)],
+            sold_out=[e for e in self.sold_out if wants(e.date)],
+            available=[e for e in self.available if wants(e.date)],
+        )
+
+
+class EventState(IntEnum):
+    AVAILABLE = 0
+    SOLD_OUT = 1
+    # No longer listed; sites tend to drop sold-out concerts from the listing
+    REMOVED = 2
+
+    @classmethod
+    def of(cls, event: Event) -> "EventState":
+        return cls.SOLD_OUT if event.sold_out else cls.AVAILABLE
+
+
+class EventIndex:
+    """The last known state of every event seen, by Event.key.
+
+    Events that leave the listing stay in the index as REMOVED, so one that
+    comes back with tickets is reported as available again rather than new.
+    """
+
+    def __init__(self, entries: Iterable[tuple[Event, EventState]] = ()):
+        self._entries: dict[str, tuple[Event, EventState]] = {
+            event.key: (event, state) for event, state in entries
+        }
+        self._listed = sum(
+            state is not EventState.REMOVED for _, state in self._entries.values()
+        )
+
+    @classmethod
+    def of_listing(cls, events: Iterable[Event]) -> "EventIndex":
+        return cls((event, EventState.of(event)) for event in events)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[tuple[Event, EventState]]:
+        return iter(self._entries.values())
+
+    def state(self, event: Event) -> EventState | None:
+        """Return the last known state of *event*, None if it was never seen."""
+        entry = self._entries.get(event.key)
+        return entry[1] if entry is not None else None
+
+    def listed(self) -> list[Event]:
+        """Return the events that are still listed, ordered by date and time."""
+        return sorted(
+            (e for e, state in self if state is not EventState.REMOVED),
+            key=Event.sort_key,
+        )
+
+    def diff(self, events: Iterable[Event]) -> tuple[EventChanges, bool]:
+        """
+        Compare the listing *events* with the index.
+
+        Returns the changes and whether the index needs updating, which also
+        covers new details (e.g. another venue) that are no change of state.
+        Every listed event is a single lookup; the index itself is only
+        scanned for removals when fewer of its listed events were seen than
+        it holds.
+        """
+        # One event per key, the last one listed wins
+        current = {event.key: event for event in events}
+        changes = EventChanges()
+        stale = False
+        seen_listed = 0
+        for key, event in current.items():
+            entry = self._entries.get(key)
+            if entry is None:
+                changes.added.append(event)
+                stale = True
+                continue
+            previous, state = entry
+            if state is not EventState.REMOVED:
+                seen_listed += 1
+            new_state = EventState.of(event)
+            if new_state is EventState.AVAILABLE and state is not new_state:
+                changes.available.append(event)
+            elif new_state is EventState.SOLD_OUT and state is EventState.AVAILABLE:
+                changes.sold_out.append(event)
+            # A removed event listed again as sold out is no news
+            stale = stale or new_state is not state or event != previous
+        if seen_listed < self._listed:
+            changes.removed = [
+                event
+                for key, (event, state) in self._entries.items()
+                if state is not EventState.REMOVED and key not in current
+            ]
+            stale = True
+        for found in (
+            changes.added,
+            changes.removed,
+            changes.sold_out,
+            changes.available,
+        ):
+            found.sort(key=Event.sort_key)
+        return changes, stale
+
+    def updated(
+        self, events: Iterable[Event], prune_before: dt.date | None = None
+    ) -> "EventIndex":
+        """
+        Return the index after the listing *events*.
+
+        Events no longer listed are kept as REMOVED, unless they took place
+        before *prune_before*.
+        """
+        current = {event.key: event for event in events}
+        entries = [(event, EventState.of(event)) for event in current.values()]
+        entries.extend(
+            (event, EventState.REMOVED)
+            for key, (event, _) in self._entries.items()
+            if key not in current
+            and (prune_before is None or event.date >= prune_before)
+        )
+        return EventIndex(entries)
+
+
+def diff_events(old: Iterable[Event], new: Iterable[Event]) -> EventChanges:
+    """Compare two listings by event key and sold-out state."""
+    changes, _ = EventIndex.of_listing(old).diff(new)
+    return changes
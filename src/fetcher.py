@@ -0,0 +1,114 @@
+import asyncio
+import datetime as dt
+import logging
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+import requests
+
+from src.runtime import create_session
+from src.scraper import FetchError, fetch_concert_dates
+
+logger = logging.getLogger()
+
+
+class HostRateLimiter:
+    """Spaces out the start of requests to the same host by *min_interval* seconds."""
+
+    def __init__(self, min_interval: float):
+        self._min_interval = min_interval
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._next_start: dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        async with self._locks.setdefault(host, asyncio.Lock()):
+            delay = self._next_start.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_start[host] = time.monotonic() + self._min_interval
+
+
+async def fetch_all_async(
+    urls: Iterable[str],
+    *,
+    session: requests.Session,
+    backend: str = "stream",
+    max_concurrency: int = 8,
+    per_host_interval: float = 0.25,
+) -> list[dt.date]:
+    """
+    Fetch and parse all *urls* concurrently and merge their dates.
+
+    At most *max_concurrency* pages are in flight at once. The blocking
+    requests calls run in worker threads and share the connection pool of
+    *session*. Returns the sorted, de-duplicated union of all dates. If any
+    page fails, the union would be missing its dates, so an empty list is
+    returned instead, which callers treat as a failed scrape.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = HostRateLimiter(per_host_interval)
+
+    def fetch_page(url: str) -> list[dt.date] | None:
+        try:
+            dates = fetch_concert_dates(
+                url, backend=backend, session=session, raise_errors=True
+            )
+        except FetchError:
+            return None
+        return dates or []
+
+    # A dedicated pool, as the default executor may have fewer threads than pages
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+
+        async def fetch_one(url: str) -> list[dt.date] | None:
+            async with semaphore:
+                await limiter.wait(url)
+                # Unlike asyncio.to_thread, run_in_executor doesn't carry the context
+                return await loop.run_in_executor(
+                    executor, copy_context().run, fetch_page, url
+                )
+
+        unique_urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(fetch_one(url) for url in unique_urls))
+    failed = [url for url, dates in zip(unique_urls, results) if dates is None]
+    if failed:
+        logger.error(
+            f"Failed to fetch {len(failed)} of {len(unique_urls)} pages "
+            f"({', '.join(failed)}), discarding the partial listing"
+        )
+        return []
+    merged = sorted({date for dates in results if dates for date in dates})
+    logger.info(f"Fetched {len(unique_urls)} pages, {len(merged)} distinct dates")
+    return merged
+
+
+def fetch_all(
+    urls: Iterable[str],
+    *,
+    session: requests.Session | None = None,
+    backend: str = "stream",
+    max_concurrency: int = 8,
+    per_host_interval: float = 0.25,
+) -> list[dt.date]:
+    """Synchronous wrapper around fetch_all_async."""
+    own_session = session is None
+    if session is None:
+        session = create_session(pool_size=max_concurrency)
+    try:
+        return asyncio.run(
+            fetch_all_async(
+                urls,
+                session=session,
+                backend=backend,
+                max_concurrency=max_concurrency,
+                per_host_interval=per_host_interval,
+            )
+        )
+    finally:
+        if own_session:
+            session.close()
@@ -0,0 +1,168 @@
+"""
+Per-run counters and timers, emitted as one structured record per invocation.
+
+Code on the hot path calls the module-level incr() and timer() helpers, which
+record into the RunMetrics of the current run_metrics() block and do nothing
+outside of one. Worker threads see the current run when they are started
+through contextvars.copy_context(). This module only depends on the standard
+library, like src.profiling.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Any, override
+
+logger = logging.getLogger()
+
+MILLISECONDS = "Milliseconds"
+COUNT = "Count"
+BYTES = "Bytes"
+
+
+class RunMetrics:
+    """Thread-safe accumulator of named metric values and their units."""
+
+    def __init__(self, dimensions: dict[str, str] | None = None):
+        self.dimensions = dict(dimensions or {})
+        self.values: dict[str, float] = {}
+        self.units: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1, unit: str = COUNT) -> None:
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + value
+            self.units[name] = unit
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Add the wall-clock time spent in the block to *name*, in milliseconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.incr(name, (time.perf_counter() - start) * 1e3, MILLISECONDS)
+
+    def as_dict(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self.values)
+
+    def to_emf(self, namespace: str) -> dict[str, Any]:
+        """Return the metrics as a CloudWatch Embedded Metric Format record."""
+        with self._lock:
+            definitions = [
+                {"Name": name, "Unit": self.units[name]} for name in sorted(self.values)
+            ]
+            record: dict[str, Any] = {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1e3),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": namespace,
+                            "Dimensions": [sorted(self.dimensions)],
+                            "Metrics": definitions,
+                        }
+                    ],
+                },
+                **self.dimensions,
+                **self.values,
+            }
+        return record
+
+
+_current: ContextVar[RunMetrics | None] = ContextVar("run_metrics", default=None)
+
+
+@contextmanager
+def run_metrics(dimensions: dict[str, str] | None = None) -> Iterator[RunMetrics]:
+    """Collect the metrics recorded in this block into a fresh RunMetrics."""
+    metrics = RunMetrics(dimensions)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def current() -> RunMetrics | None:
+    return _current.get()
+
+
+def incr(name: str, value: float = 1, unit: str = COUNT) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.incr(name, value, unit)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.timer(name):
+        yield
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+
+
+class MetricsSink(ABC):
+    """Where the metrics of a finished run are sent."""
+
+    @abstractmethod
+    def emit(self, metrics: RunMetrics) -> None:
+        pass
+
+
+class EMFSink(MetricsSink):
+    """Prints EMF records, which CloudWatch turns into metrics from Lambda logs."""
+
+    def __init__(self, namespace: str = "CocoaTracker", stream: IO[str] | None = None):
+        self.namespace = namespace
+        self.stream = stream
+
+    @override
+    def emit(self, metrics: RunMetrics) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(metrics.to_emf(self.namespace)) + "\n")
+        stream.flush()
+
+
+class LogSink(MetricsSink):
+    """Logs the metrics as one JSON line, for local runs."""
+
+    @override
+    def emit(self, metrics: RunMetrics) -> None:
+        logger.info(f"Run metrics: {json.dumps(metrics.as_dict(), sort_keys=True)}")
+
+
+class NullSink(MetricsSink):
+    @override
+    def emit(self, metrics: RunMetrics) -> None:
+        pass
+
+
+# Metrics sinks by name, see Settings.metrics_sink.
+METRICS_SINKS: dict[str, Callable[[], MetricsSink]] = {
+    "emf": EMFSink,
+    "log": LogSink,
+    "none": NullSink,
+}
+
+
+def get_metrics_sink(name: str) -> MetricsSink:
+    try:
+        return METRICS_SINKS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown metrics sink: {name} (expected one of {', '.join(METRICS_SINKS)})"
+        )
@@ -1,37 +1,217 @@
 import datetime as dt
 import logging
+import re
 from abc import ABC, abstractmethod
 from typing import override
 
 import requests
 
+from src.events import Event, EventChanges
+
 logger = logging.getLogger()
 
+# Longest text Telegram accepts in a single message.
+MAX_MESSAGE_LENGTH = 4096
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+class NotificationError(Exception):
+    """Raised when a message could not be delivered.
+
+    *retry_after* is the number of seconds the service asked us to wait
+    before trying again, if it said so. *retryable* is False when sending
+    the same message again cannot succeed right away (e.g. a bad request).
+    """
+
+    def __init__(
+        self, message: str, retry_after: float | None = None, retryable: bool = True
+    ):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+def format_message(dates: list[dt.date]) -> str:
+    formatted_dates: str = "\n".join(
+        [f"- {date.strftime('%Y-%m-%d')}" for date in dates]
+    )
+    return f"""*Van hely kakaókoncertre!* 🚀
+Dátumok:
+{formatted_dates}"""
+
+
+def batch_dates(
+    dates: list[dt.date], max_length: int = MAX_MESSAGE_LENGTH
+) -> list[list[dt.date]]:
+    """Split *dates* into as few messages as fit within *max_length* characters."""
+    header_length = len(format_message([]))
+    batches: list[list[dt.date]] = []
+    batch: list[dt.date] = []
+    length = header_length
+    for date in dates:
+        # "- YYYY-MM-DD", preceded by a newline unless it is the first line
+        line_length = len(f"- {date.strftime('%Y-%m-%d')}") + (1 if batch else 0)
+        if batch and length + line_length > max_length:
+            batches.append(batch)
+            batch, length = [], header_length
+            line_length -= 1
+        batch.append(date)
+        length += line_length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+CHANGES_HEADER = "*Változás a kakaókoncerteknél*"
+AVAILABLE_HEADER = "*Újra van jegy kakaókoncertre!* 🎟"
+
+# Sections of a change report, in the order they are listed.
+_CHANGE_SECTIONS = (
+    ("available", "Újra van jegy:"),
+    ("added", "Új koncertek:"),
+    ("sold_out", "Elfogyott:"),
+    ("removed", "Lekerült a műsorról:"),
+)
+
+_MARKDOWN_SPECIAL_RE = re.compile(r"([_*`\[])")
+
+
+def _escape_markdown(text: str) -> str:
+    return _MARKDOWN_SPECIAL_RE.sub(r"\\\1", text)
+
+
+def format_event(event: Event) -> str:
+    parts = [event.date.strftime("%Y-%m-%d")]
+    if event.time is not None:
+        parts.append(event.time.strftime("%H:%M"))
+    if event.title:
+        parts.append(_escape_markdown(event.title))
+    if event.venue:
+        parts.append(f"({_escape_markdown(event.venue)})")
+    line = f"- {' '.join(parts)}"
+    if event.url:
+        line += f" [link]({event.url})"
+    return line
+
+
+def _paginate(header: str, lines: list[str], max_length: int) -> list[str]:
+    """Join *lines* under *header* into messages of at most *max_length* characters."""
+    messages: list[str] = []
+    message = header
+    for line in lines:
+        if message != header and len(message) + 1 + len(line) > max_length:
+            messages.append(message)
+            message = header
+        message += f"\n{line}"
+    if lines:
+        messages.append(message)
+    return messages
+
+
+def format_changes(
+    changes: EventChanges, max_length: int = MAX_MESSAGE_LENGTH
+) -> list[str]:
+    """Render *changes* as messages of at most *max_length* characters each."""
+    lines: list[str] = []
+    for name, title in _CHANGE_SECTIONS:
+        events = getattr(changes, name)
+        if events:
+            lines.append(title)
+            lines.extend(format_event(event) for event in events)
+    return _paginate(CHANGES_HEADER, lines, max_length)
+
+
+def format_available(
+    events: list[Event], max_length: int = MAX_MESSAGE_LENGTH
+) -> list[str]:
+    """Render the alert for *events* that have tickets again."""
+    return _paginate(
+        AVAILABLE_HEADER, [format_event(event) for event in events], max_length
+    )
+
 
 class NotificationService(ABC):
     @abstractmethod
     def send_notification(self, dates: list[dt.date]) -> None:
         pass
 
+    def deliver(self, dates: list[dt.date]) -> None:
+        """
+        Send *dates* as one message, raising NotificationError if that failed.
+
+        The default implementation cannot tell and always reports success.
+        """
+        self.send_notification(dates)
+
+    def send_changes(self, changes: EventChanges) -> None:
+        """
+        Report changes to the listed events, logging rather than raising errors.
+
+        Services that only know about dates ignore them.
+        """
+
+    def send_available(self, events: list[Event]) -> bool:
+        """
+        Alert that *events* have tickets again; return whether the alert went out.
+
+        Errors are logged rather than raised. Services that only know about
+        dates don't send it, so the dates are announced like new ones instead.
+        """
+        return False
+
     def _format_message(self, dates: list[dt.date]) -> str:
-        formatted_dates: str = "\n".join(
-            [f"- {date.strftime('%Y-%m-%d')}" for date in dates]
-        )
-        return f"""*Van hely kakaókoncertre!* 🚀
-Dátumok:
-{formatted_dates}"""
+        return format_message(dates)
 
 
 class TelegramNotificationService(NotificationService):
-    def __init__(self, token: str, chat_id: str):
+    def __init__(
+        self,
+        token: str,
+        chat_id: str,
+        session: requests.Session | None = None,
+        api_url: str = TELEGRAM_API_URL,
+    ):
         self.token: str = token
         self.chat_id: str = chat_id
+        self.session = session
+        self.api_url = api_url
 
     @override
     def send_notification(self, dates: list[dt.date]) -> None:
         logger.info(f"Preparing to send Telegram message for {len(dates)} dates")
-        message = self._format_message(dates)
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        for batch in batch_dates(dates):
+            try:
+                self.deliver(batch)
+            except Exception as e:
+                logger.error(f"Failed to send Telegram message: {e}")
+
+    @override
+    def deliver(self, dates: list[dt.date]) -> None:
+        self.send_text(self._format_message(dates))
+
+    @override
+    def send_changes(self, changes: EventChanges) -> None:
+        for message in format_changes(changes):
+            try:
+                self.send_text(message)
+            except NotificationError as e:
+                logger.error(f"Failed to send change report: {e}")
+
+    @override
+    def send_available(self, events: list[Event]) -> bool:
+        sent = True
+        for message in format_available(events):
+            try:
+                self.send_text(message)
+            except NotificationError as e:
+                logger.error(f"Failed to send availability alert: {e}")
+                sent = False
+        return sent
+
+    def send_text(self, message: str) -> None:
+        """Send *message* as is, raising NotificationError if that failed."""
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
 
         data = {
             "chat_id": self.chat_id,
@@ -39,12 +219,34 @@ class TelegramNotificationService(NotificationService):
             "parse_mode": "Markdown",
         }
 
+        post = self.session.post if self.session is not None else requests.post
         try:
-            response = requests.post(
+            response = post(
                 url,
                 json=data,
                 headers={"Content-Type": "application/json"},
             )
-            logger.info(f"Telegram response status: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Failed to send Telegram message: {e}")
+        except requests.RequestException as e:
+            raise NotificationError(f"Failed to send Telegram message: {e}") from e
+        logger.info(f"Telegram response status: {response.status_code}")
+        if response.status_code == 429:
+            raise NotificationError(
+                "Telegram rate limit hit", retry_after=_retry_after(response)
+            )
+        if response.status_code >= 400:
+            raise NotificationError(
+                f"Telegram rejected the message: {response.status_code}",
+                retryable=response.status_code >= 500,
+            )
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    # Telegram puts it in the body, proxies in between may only set the header
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
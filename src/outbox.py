@@ -0,0 +1,232 @@
+import datetime as dt
+import logging
+import secrets
+import struct
+import time
+import zlib
+from array import array
+from collections.abc import Callable, Iterable
+
+from src import metrics
+from src.notifications import NotificationError, NotificationService, batch_dates
+from src.storage import (
+    CacheFormatError,
+    DateCache,
+    DateView,
+    Storage,
+    WriteConflictError,
+)
+
+logger = logging.getLogger()
+
+
+class NotificationOutbox:
+    """Dates that still have to be announced, persisted via a Storage backend.
+
+    Dates stay in the outbox until their delivery has been acknowledged, so a
+    failed or interrupted send is retried by a later run. Each date records
+    which runs queued it, so a run that lost the claim on a date only drops
+    its own hold and the run that won still finds it. Stored as::
+
+        magic b"NOB" | version (u8) | count (u32) | crc32 of payload (u32) | payload
+
+    where the payload holds *count* pairs of a day ordinal and the token of a
+    run holding it (u32 each), little-endian. Outboxes stored like a DateCache
+    are still read, their dates held by no run in particular. Writes are
+    conditional and retried on top of the other writer's version.
+    """
+
+    MAGIC = b"NOB"
+    VERSION = 1
+    _HEADER = struct.Struct("<3sBII")
+    _PAIR = struct.Struct("<II")
+    # Holds the dates of outboxes written before runs were told apart
+    _NO_RUN = 0
+    MAX_WRITE_ATTEMPTS = 5
+
+    def __init__(self, storage: Storage, key: str):
+        self._storage = storage
+        self._key = key
+        self._token = secrets.randbelow(2**32 - 1) + 1
+        self._version: str | None = None
+        self._entries: dict[int, set[int]] = self._load()
+
+    @classmethod
+    def encode(cls, entries: dict[int, set[int]]) -> bytes:
+        pairs = sorted((o, token) for o, tokens in entries.items() for token in tokens)
+        payload = b"".join(cls._PAIR.pack(*pair) for pair in pairs)
+        header = cls._HEADER.pack(
+            cls.MAGIC, cls.VERSION, len(pairs), zlib.crc32(payload)
+        )
+        return header + payload
+
+    @classmethod
+    def decode(cls, raw: bytes) -> dict[int, set[int]]:
+        if not raw.startswith(cls.MAGIC):
+            return {d.toordinal(): {cls._NO_RUN} for d in DateCache.decode(raw)}
+        if len(raw) < cls._HEADER.size:
+            raise CacheFormatError("Outbox is truncated")
+        _, version, count, checksum = cls._HEADER.unpack_from(raw)
+        if version != cls.VERSION:
+            raise CacheFormatError(f"Unsupported outbox version: {version}")
+        payload = raw[cls._HEADER.size :]
+        if len(payload) != count * cls._PAIR.size or zlib.crc32(payload) != checksum:
+            raise CacheFormatError("Outbox checksum mismatch")
+        entries: dict[int, set[int]] = {}
+        for ordinal, token in cls._PAIR.iter_unpack(payload):
+            entries.setdefault(ordinal, set()).add(token)
+        return entries
+
+    def _load(self) -> dict[int, set[int]]:
+        raw, self._version = self._storage.read_versioned(self._key)
+        return self.decode(raw) if raw is not None else {}
+
+    def _update(self, apply: Callable[[dict[int, set[int]]], None]) -> None:
+        """
+        Change a copy of the entries with *apply* and write them back.
+
+        On a concurrent write the outbox is reloaded and *apply* runs again on
+        the other writer's version.
+        """
+        for attempt in range(1, self.MAX_WRITE_ATTEMPTS + 1):
+            entries = {o: set(tokens) for o, tokens in self._entries.items()}
+            apply(entries)
+            if entries == self._entries:
+                return
+            try:
+                self._version = self._storage.write_if_match(
+                    self._key, self.encode(entries), self._version
+                )
+            except WriteConflictError:
+                if attempt == self.MAX_WRITE_ATTEMPTS:
+                    raise
+                metrics.incr("cache_write_conflicts")
+                logger.info(
+                    f"Outbox changed concurrently, retrying (attempt {attempt})"
+                )
+                self.reload()
+                continue
+            self._entries = entries
+            return
+
+    @property
+    def pending(self) -> DateView:
+        return DateView(array("I", sorted(self._entries)))
+
+    def reload(self) -> None:
+        """Pick up dates enqueued or acknowledged by other runs."""
+        self._entries = self._load()
+
+    def enqueue(self, dates: Iterable[dt.date]) -> list[dt.date]:
+        """Add *dates*, held by this run; return those that were not pending already."""
+        ordinals = {d.toordinal() for d in dates}
+        added: list[int] = []
+
+        def apply(entries: dict[int, set[int]]) -> None:
+            added[:] = sorted(o for o in ordinals if o not in entries)
+            for o in ordinals:
+                entries.setdefault(o, set()).add(self._token)
+
+        self._update(apply)
+        return [dt.date.fromordinal(o) for o in added]
+
+    def release(self, dates: Iterable[dt.date]) -> None:
+        """
+        Drop this run's hold on *dates*, e.g. after another run claimed them.
+
+        A date is only removed once no run holds it anymore.
+        """
+        ordinals = {d.toordinal() for d in dates}
+
+        def apply(entries: dict[int, set[int]]) -> None:
+            for o in ordinals:
+                tokens = entries.get(o)
+                if tokens is not None and self._token in tokens:
+                    tokens.discard(self._token)
+                    if not tokens:
+                        del entries[o]
+
+        self._update(apply)
+
+    def acknowledge(self, dates: Iterable[dt.date]) -> None:
+        """Remove *dates* once delivered, whichever runs held them."""
+        ordinals = {d.toordinal() for d in dates}
+
+        def apply(entries: dict[int, set[int]]) -> None:
+            for o in ordinals:
+                entries.pop(o, None)
+
+        self._update(apply)
+
+
+class NotificationDispatcher:
+    """Delivers the dates in an outbox, coalesced into as few messages as possible.
+
+    Each message is tried up to *max_attempts* times with exponential backoff
+    starting at *backoff* seconds, or after the delay the service asked for
+    when it rate limits us. A wait longer than *max_delay* seconds, or running
+    out of attempts, ends the dispatch and leaves the rest for the next run.
+    A message the service rejects for good (e.g. a bad request) would block
+    the outbox forever, so its dates are dropped with an error instead.
+    """
+
+    def __init__(
+        self,
+        notifier: NotificationService,
+        outbox: NotificationOutbox,
+        *,
+        max_attempts: int = 4,
+        backoff: float = 1.0,
+        max_delay: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.notifier = notifier
+        self.outbox = outbox
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self._sleep = sleep
+
+    def dispatch(self) -> list[dt.date]:
+        """Send everything pending and return the dates that were delivered."""
+        self.outbox.reload()
+        delivered: list[dt.date] = []
+        for batch in batch_dates(list(self.outbox.pending)):
+            error = self._deliver(batch)
+            if error is None:
+                self.outbox.acknowledge(batch)
+                delivered.extend(batch)
+                metrics.incr("notifications_sent")
+            elif error.retryable:
+                break
+            else:
+                logger.error(f"Dropping undeliverable dates {batch}: {error}")
+                self.outbox.acknowledge(batch)
+                metrics.incr("notifications_dropped")
+        pending = len(self.outbox.pending)
+        if pending:
+            logger.warning(f"{pending} dates left in the outbox for the next run")
+        return delivered
+
+    def _deliver(self, batch: list[dt.date]) -> NotificationError | None:
+        """Send *batch*, retrying; return the last error if it never went out."""
+        error = NotificationError("Not attempted")
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.notifier.deliver(batch)
+                return None
+            except NotificationError as e:
+                error = e
+                metrics.incr("notification_errors")
+                delay = e.retry_after
+                if delay is None:
+                    delay = self.backoff * 2 ** (attempt - 1)
+                logger.warning(f"Notification attempt {attempt} failed: {e}")
+                if (
+                    not e.retryable
+                    or attempt == self.max_attempts
+                    or delay > self.max_delay
+                ):
+                    return e
+                self._sleep(delay)
+        return error
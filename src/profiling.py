@@ -0,0 +1,105 @@
+"""
+Opt-in cold-start profiling for the Lambda handler.
+
+Set ``COLD_START_PROFILE=1`` to record per-module import times (self and
+cumulative, like ``python -X importtime``) and the duration of each handler
+phase. This module only depends on the standard library so it can be loaded
+before anything else.
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any
+
+PROFILE_ENV_VAR = "COLD_START_PROFILE"
+
+
+def profiling_enabled() -> bool:
+    return os.getenv(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes")
+
+
+class ImportProfiler:
+    """Records how long every first-time import takes while installed.
+
+    Imports in other threads (e.g. the fetcher's workers) are timed too, each
+    thread nesting its imports separately.
+    """
+
+    def __init__(self) -> None:
+        # (module name, self seconds, cumulative seconds) in completion order
+        self.records: list[tuple[str, float, float]] = []
+        self._original_import = builtins.__import__
+        # Per thread, the time spent in nested imports of each open import frame
+        self._local = threading.local()
+
+    def install(self) -> None:
+        builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        builtins.__import__ = self._original_import
+
+    def _import(
+        self,
+        name: str,
+        globals: Mapping[str, object] | None = None,
+        locals: Mapping[str, object] | None = None,
+        fromlist: Sequence[str] | None = (),
+        level: int = 0,
+    ) -> ModuleType:
+        # Same signature as builtins.__import__, which it replaces
+        if level:
+            package = str((globals or {}).get("__package__") or "")
+            absolute = importlib.util.resolve_name("." * level + name, package)
+        else:
+            absolute = name
+        if absolute in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        children: list[float] | None = getattr(self._local, "children", None)
+        if children is None:
+            children = self._local.children = []
+        children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = children.pop()
+            if children:
+                children[-1] += cumulative
+            self.records.append((absolute, cumulative - nested, cumulative))
+
+    def slowest(self, limit: int = 20) -> list[dict[str, Any]]:
+        """Return the *limit* imports with the highest cumulative time."""
+        ranked = sorted(self.records, key=lambda r: r[2], reverse=True)[:limit]
+        return [
+            {"module": name, "self_ms": self_s * 1e3, "cumulative_ms": cum_s * 1e3}
+            for name, self_s, cum_s in ranked
+        ]
+
+
+class PhaseTimer:
+    """Accumulates wall-clock durations of named phases."""
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def as_dict(self) -> dict[str, float]:
+        return {name: seconds * 1e3 for name, seconds in self.phases.items()}
@@ -0,0 +1,300 @@
+"""
+A local stand-in for the BFZ website and the Telegram Bot API.
+
+It serves recorded listing pages with ETags, answering conditional requests
+with 304 like the real site, and accepts sendMessage calls like Telegram,
+optionally with added latency and 429 responses. Scraping and notifying can
+then be tested and benchmarked offline and deterministically. Setting
+REPLAY_URL points the tracker at it (see Settings.replay_url)::
+
+    uv run python -m src.replay record --pages replay/ https://bfz.hu/en/...
+    uv run python -m src.replay serve --pages replay/ --port 8080 --latency 0.05
+    REPLAY_URL=http://127.0.0.1:8080 uv run python -m src.daemon --storage-dir state/
+
+Pages are stored by URL path: the page of a path ending in a slash goes to
+``index.html`` in the matching directory, any other path to a file of that
+name. Query strings are not part of the key.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger()
+
+_SEND_MESSAGE_SUFFIX = "/sendMessage"
+
+
+@dataclass(frozen=True)
+class SentMessage:
+    """A message the emulated Telegram API accepted."""
+
+    token: str
+    chat_id: str
+    text: str
+
+
+def _page_file(directory: str, path: str) -> str:
+    relative = path.lstrip("/")
+    if not relative or relative.endswith("/"):
+        relative += "index.html"
+    return os.path.join(directory, *relative.split("/"))
+
+
+def load_pages(directory: str) -> dict[str, bytes]:
+    """Read the pages stored in *directory*, keyed by URL path."""
+    pages: dict[str, bytes] = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            file = os.path.join(root, name)
+            path = "/" + os.path.relpath(file, directory).replace(os.sep, "/")
+            if name == "index.html":
+                path = path.removesuffix("index.html")
+            with open(file, "rb") as f:
+                pages[path] = f.read()
+    return pages
+
+
+def record_pages(
+    urls: Iterable[str], directory: str, session: requests.Session | None = None
+) -> list[str]:
+    """Download *urls* into *directory* for replaying; return the files written."""
+    get = session.get if session is not None else requests.get
+    written = []
+    for url in urls:
+        response = get(url, timeout=30)
+        response.raise_for_status()
+        file = _page_file(directory, urlsplit(url).path)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        with open(file, "wb") as f:
+            f.write(response.content)
+        logger.info(f"Recorded {url} to {file}")
+        written.append(file)
+    return written
+
+
+class ReplayServer:
+    """Serves *pages* (keyed by URL path) and emulates Telegram's sendMessage.
+
+    Every response is delayed by *latency* seconds. With *telegram_rate* set,
+    messages beyond that many per second are refused with 429 and a
+    *retry_after* hint, like Telegram's flood control; fail_telegram() queues
+    specific error responses. Accepted messages are kept in ``messages``.
+    Use it as a context manager, or call start() and stop().
+    """
+
+    def __init__(
+        self,
+        pages: Mapping[str, str | bytes] | None = None,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        telegram_rate: float | None = None,
+        retry_after: int = 1,
+    ):
+        self.latency = latency
+        self.telegram_rate = telegram_rate
+        self.retry_after = retry_after
+        self.messages: list[SentMessage] = []
+        # (method, path, status) of every request served
+        self.requests: list[tuple[str, str, int]] = []
+        self._pages: dict[str, tuple[bytes, str]] = {}
+        self._failures: deque[int] = deque()
+        self._sent_at: deque[float] = deque()
+        self._lock = threading.Lock()
+        for path, body in (pages or {}).items():
+            self.set_page(path, body)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_directory(cls, directory: str, **kwargs: Any) -> "ReplayServer":
+        return cls(load_pages(directory), **kwargs)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    def set_page(self, path: str, body: str | bytes) -> None:
+        """Serve *body* at *path* from now on, under a new ETag."""
+        data = body.encode() if isinstance(body, str) else body
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        with self._lock:
+            self._pages[path] = (data, etag)
+
+    def fail_telegram(self, *statuses: int) -> None:
+        """Answer the next sendMessage calls with these error *statuses*."""
+        with self._lock:
+            self._failures.extend(statuses)
+
+    def reset(self) -> None:
+        """Forget the messages and requests seen, and any pending failures."""
+        with self._lock:
+            self.messages.clear()
+            self.requests.clear()
+            self._failures.clear()
+            self._sent_at.clear()
+
+    def start(self) -> str:
+        """Serve in a background thread and return the base URL."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until stop() is called."""
+        # A short poll interval keeps stop() quick
+        self._server.serve_forever(poll_interval=0.05)
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    def _page(self, path: str, if_none_match: str | None) -> tuple[int, dict, bytes]:
+        with self._lock:
+            page = self._pages.get(urlsplit(path).path)
+        if page is None:
+            return 404, {}, b""
+        body, etag = page
+        if if_none_match == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "text/html; charset=utf-8"}, body
+
+    def _telegram_error(self, status: int) -> tuple[int, dict, bytes]:
+        reply: dict[str, Any] = {"ok": False, "error_code": status}
+        if status == 429:
+            reply["description"] = f"Too Many Requests: retry after {self.retry_after}"
+            reply["parameters"] = {"retry_after": self.retry_after}
+        else:
+            reply["description"] = "Error"
+        return status, {"Content-Type": "application/json"}, json.dumps(reply).encode()
+
+    def _send_message(self, path: str, raw: bytes) -> tuple[int, dict, bytes]:
+        token = path.removeprefix("/bot").removesuffix(_SEND_MESSAGE_SUFFIX)
+        try:
+            data = json.loads(raw)
+            chat_id, text = str(data["chat_id"]), data["text"]
+        except (ValueError, KeyError, TypeError):
+            return self._telegram_error(400)
+        with self._lock:
+            if self._failures:
+                return self._telegram_error(self._failures.popleft())
+            if self.telegram_rate is not None:
+                now = time.monotonic()
+                while self._sent_at and now - self._sent_at[0] >= 1.0:
+                    self._sent_at.popleft()
+                if len(self._sent_at) >= self.telegram_rate:
+                    return self._telegram_error(429)
+                self._sent_at.append(now)
+            self.messages.append(SentMessage(token, chat_id, text))
+            message_id = len(self.messages)
+        reply = {
+            "ok": True,
+            "result": {"message_id": message_id, "chat": {"id": chat_id}, "text": text},
+        }
+        return 200, {"Content-Type": "application/json"}, json.dumps(reply).encode()
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, status: int, headers: dict, body: bytes) -> None:
+                if replay.latency:
+                    time.sleep(replay.latency)
+                with replay._lock:
+                    replay.requests.append((self.command, self.path, status))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                self._respond(
+                    *replay._page(self.path, self.headers.get("If-None-Match"))
+                )
+
+            def do_POST(self) -> None:
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.startswith("/bot") and self.path.endswith(
+                    _SEND_MESSAGE_SUFFIX
+                ):
+                    self._respond(*replay._send_message(self.path, raw))
+                else:
+                    self._respond(404, {}, b"")
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded pages offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="download pages for replaying")
+    record.add_argument("--pages", required=True, help="directory to store them in")
+    record.add_argument("urls", nargs="+")
+    serve = commands.add_parser("serve", help="serve recorded pages and a fake bot API")
+    serve.add_argument("--pages", required=True, help="directory of recorded pages")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds")
+    serve.add_argument(
+        "--telegram-rate", type=float, help="messages per second before 429s"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "record":
+        record_pages(args.urls, args.pages)
+        return
+    server = ReplayServer.from_directory(
+        args.pages,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        telegram_rate=args.telegram_rate,
+    )
+    logger.info(f"Replaying {args.pages} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import logging
+import os
+from functools import cached_property
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.config import Settings, get_config
+from src.metrics import MetricsSink, get_metrics_sink
+from src.storage import S3Storage, TieredStorage
+
+logger = logging.getLogger()
+
+
+def create_session(pool_size: int = 10, retries: int = 3) -> requests.Session:
+    """
+    Return a keep-alive session with a connection pool of *pool_size* per host.
+
+    Idempotent requests are retried on connection errors and 5xx responses
+    with exponential backoff; POSTs are never retried automatically.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class Runtime:
+    """Objects that are expensive to build and safe to reuse across invocations."""
+
+    def __init__(self, config: Settings):
+        self.config = config
+        self.session = create_session(pool_size=config.fetch_concurrency)
+
+    @cached_property
+    def s3_client(self) -> Any:
+        import boto3  # type: ignore[import-untyped]  # lazy, as in S3Storage
+
+        return boto3.client("s3")
+
+    @cached_property
+    def metrics_sink(self) -> MetricsSink:
+        return get_metrics_sink(self.config.metrics_sink)
+
+    @cached_property
+    def storage(self) -> TieredStorage:
+        """The S3 bucket behind a memory and /tmp cache that outlive invocations."""
+        import tempfile
+
+        return TieredStorage(
+            S3Storage(self.config.bucket, client=self.s3_client),
+            cache_dir=os.path.join(tempfile.gettempdir(), "cocoa-tracker-cache"),
+            ttl=self.config.storage_cache_ttl,
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_runtime: Runtime | None = None
+
+
+def get_runtime() -> Runtime:
+    """Return the process-wide Runtime, creating it on first use."""
+    global _runtime
+    if _runtime is None:
+        logger.info("Initializing runtime")
+        _runtime = Runtime(get_config())
+    return _runtime
+
+
+def invalidate_runtime() -> None:
+    """Drop the cached Runtime so the next get_runtime() call builds a fresh one."""
+    global _runtime
+    if _runtime is not None:
+        _runtime.close()
+        _runtime = None
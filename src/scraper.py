@@ -1,54 +1,704 @@
+import codecs
 import datetime as dt
+import hashlib
 import logging
+import os
+import re
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import replace
+from functools import cache
+from html.parser import HTMLParser
+from itertools import repeat
+from typing import Any, override
+from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
 
+from src import metrics
+from src.events import Event, available_dates
 from src.functions import get_month_number, get_year
+from src.storage import ParseCache, ValidatorCache
 
 logger = logging.getLogger()
 
+# Size of the chunks pulled from the response body when streaming.
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class FetchError(Exception):
+    """A listing page could not be downloaded or parsed."""
+
+
+# Elements that never have a closing tag and therefore never go on the stack.
+_VOID_ELEMENTS = frozenset(
+    {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    }
+)
+
+# The ``div`` classes inside an ``article.event`` that we need to read.
+_EVENT_FIELDS = ("event__fn", "year", "month", "day", "time")
+# Classes read from whichever element carries them.
+_DETAIL_FIELDS = ("event__title", "event__venue")
+# Class of the element holding the whole event list, however it is grouped
+# inside. The stream parser stops once it closes; without one it reads to the end.
+_EVENT_LIST_CLASS = "block--event-list"
+
+
+def _event_time(text: str | None) -> dt.time | None:
+    try:
+        return dt.time.fromisoformat(text) if text else None
+    except ValueError:
+        return None
+
+
+def _make_event(texts: dict[str, str], url: str, event_id: str) -> Event | None:
+    """Turn the raw texts of an article into an Event, or None if it has no valid date."""
+    event_name = texts["event__fn"]
+    year, month, day = texts.get("year"), texts.get("month"), texts.get("day")
+    try:
+        date_obj = dt.date(
+            get_year(year) if year is not None else 0,
+            get_month_number(month) if month is not None else 0,
+            int(day) if day is not None else 0,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to parse date for event '{event_name}': {e}")
+        metrics.incr("events_failed")
+        return None
+    sold_out = "sold out" in event_name.lower()
+    if sold_out:
+        metrics.incr("events_sold_out")
+    # Called once per event, so don't even format the message unless it is shown
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Added date: {date_obj} for event: {event_name}")
+    return Event(
+        date=date_obj,
+        time=_event_time(texts.get("time")),
+        title=texts.get("event__title", ""),
+        venue=texts.get("event__venue", ""),
+        url=url,
+        sold_out=sold_out,
+        event_id=event_id,
+    )
+
+
+def _parse_bs4(html_content: str) -> list[Event]:
+    from bs4 import BeautifulSoup  # heavy import, only paid when this backend is used
 
-def parse_html_content(html_content: str) -> list[dt.date]:
     soup = BeautifulSoup(html_content, "html.parser")
     articles = soup.find_all("article", class_="event")
     logger.info(f"Found {len(articles)} articles")
+    metrics.incr("articles_seen", len(articles))
 
-    dates: list[dt.date] = []
+    events: list[Event] = []
     for article in articles:
-        event_fn_div = article.find("div", class_="event__fn")
-        if not event_fn_div:
+        texts: dict[str, str] = {}
+        for name in _EVENT_FIELDS:
+            div = article.find("div", class_=name)
+            if div:
+                texts[name] = div.get_text(strip=True)
+        if "event__fn" not in texts:
             logger.debug("No event__fn div found, skipping article.")
+            metrics.incr("articles_skipped")
             continue
-        event_name = event_fn_div.get_text(strip=True)
-        if "sold out" in event_name.lower():
-            continue
-        year_div = article.find("div", class_="year")
-        month_div = article.find("div", class_="month")
-        day_div = article.find("div", class_="day")
-        try:
-            year = get_year(year_div.get_text(strip=True)) if year_div else 0
-            month = get_month_number(month_div.get_text(strip=True)) if month_div else 0
-            day = int(day_div.get_text(strip=True)) if day_div else 0
-            date_obj = dt.date(year, month, day)
-            dates.append(date_obj)
-            logger.info(f"Added date: {date_obj} for event: {event_name}")
-        except Exception as e:
-            logger.warning(f"Failed to parse date for event '{event_name}': {e}")
+        for name in _DETAIL_FIELDS:
+            element = article.find(class_=name)
+            if element:
+                texts[name] = element.get_text(strip=True)
+        title = article.find(class_="event__title")
+        link = title.find("a", href=True) if title else None
+        # Neither attribute is multi-valued, so bs4 gives plain strings for them
+        url = str(link["href"]) if link else ""
+        event = _make_event(texts, url, str(article.get("data-event-id", "")))
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def _has_class(name: str) -> str:
+    # XPath equivalent of the CSS class selector ``.name``
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+@cache
+def _lxml_queries() -> dict[str, Callable[..., Any]]:
+    """Compile the lxml queries once, on first use of the backend."""
+    from lxml import etree  # type: ignore[import-untyped]
+
+    queries = {
+        name: etree.XPath(f"(.//div[{_has_class(name)}])[1]") for name in _EVENT_FIELDS
+    }
+    for name in _DETAIL_FIELDS:
+        queries[name] = etree.XPath(f"(.//*[{_has_class(name)}])[1]")
+    queries["article"] = etree.XPath(f"//article[{_has_class('event')}]")
+    queries["text"] = etree.XPath(".//text()")
+    queries["url"] = etree.XPath(
+        f"string((.//*[{_has_class('event__title')}])[1]//a[@href][1]/@href)"
+    )
+    return queries
+
+
+def _parse_lxml(html_content: str) -> list[Event]:
+    import lxml.html  # type: ignore[import-untyped]  # optional, only for this backend
+
+    queries = _lxml_queries()
+    get_text = queries["text"]
+    articles = queries["article"](lxml.html.document_fromstring(html_content))
+    logger.info(f"Found {len(articles)} articles")
+    metrics.incr("articles_seen", len(articles))
+
+    events: list[Event] = []
+    for article in articles:
+        texts: dict[str, str] = {}
+        for name in _EVENT_FIELDS:
+            for div in queries[name](article):
+                texts[name] = "".join(t.strip() for t in get_text(div))
+        if "event__fn" not in texts:
+            logger.debug("No event__fn div found, skipping article.")
+            metrics.incr("articles_skipped")
             continue
+        for name in _DETAIL_FIELDS:
+            for element in queries[name](article):
+                texts[name] = "".join(t.strip() for t in get_text(element))
+        event = _make_event(
+            texts, queries["url"](article), article.get("data-event-id", "")
+        )
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def _parse_stream(html_content: str) -> list[Event]:
+    return list(iter_html_events([html_content]))
+
+
+# Parser backends by name. All of them return identical events for the same page.
+EVENT_PARSER_BACKENDS: dict[str, Callable[[str], list[Event]]] = {
+    "bs4": _parse_bs4,
+    "lxml": _parse_lxml,
+    "stream": _parse_stream,
+}
+
+
+def _dates_parser(
+    parse_events: Callable[[str], list[Event]],
+) -> Callable[[str], list[dt.date]]:
+    def parse(html_content: str) -> list[dt.date]:
+        return available_dates(parse_events(html_content))
+
+    return parse
+
+
+# The same backends, returning the dates of the events that aren't sold out.
+PARSER_BACKENDS: dict[str, Callable[[str], list[dt.date]]] = {
+    name: _dates_parser(parse) for name, parse in EVENT_PARSER_BACKENDS.items()
+}
+
+DEFAULT_PARSER_BACKEND = "bs4"
+
+
+def get_parser_backend(name: str) -> Callable[[str], list[dt.date]]:
+    try:
+        return PARSER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown parser backend: {name} (expected one of {', '.join(PARSER_BACKENDS)})"
+        )
+
+
+def get_event_parser_backend(name: str) -> Callable[[str], list[Event]]:
+    get_parser_backend(name)  # same error for unknown names
+    return EVENT_PARSER_BACKENDS[name]
+
+
+# Bump when a parser change makes previously cached results stale.
+_FINGERPRINT_VERSION = b"1"
+
+_EVENT_START_RE = re.compile(
+    r"""<article\b[^>]*\bclass\s*=\s*["']?[^"'>]*(?<![\w-])event(?![\w-])""",
+    re.IGNORECASE,
+)
+_ARTICLE_END_RE = re.compile(r"</article\s*>", re.IGNORECASE)
+_VOLATILE_RE = re.compile(
+    r"<!--.*?-->|<script\b.*?</script\s*>|<style\b.*?</style\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_TAG_RE = re.compile(r"\s*<(/?)([a-zA-Z][-\w]*)([^>]*)>\s*")
+_CLASS_RE = re.compile(
+    r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE
+)
+
+
+def _canonical_tag(match: re.Match[str]) -> str:
+    closing, name, attrs = match.groups()
+    class_match = _CLASS_RE.search(attrs)
+    if class_match is None:
+        return f"<{closing}{name.lower()}>"
+    classes = " ".join((class_match[1] or class_match[2] or class_match[3]).split())
+    return f'<{closing}{name.lower()} class="{classes}">'
+
+
+def event_list_fingerprint(html_content: str) -> str:
+    """
+    Return a hash of the part of a listing page that the parsers read.
+
+    Only the markup from the first ``article.event`` to the end of the last
+    article is hashed. Within it, comments, scripts and styles are dropped and
+    every tag is reduced to its name and classes, so CSRF tokens, timestamps
+    and session ids in attributes don't change the fingerprint. Whitespace
+    around tags is ignored, like it is by the parsers.
+    """
+    start = _EVENT_START_RE.search(html_content)
+    if start is None:
+        fragment = ""
+    else:
+        end = start.start()
+        for end_match in _ARTICLE_END_RE.finditer(html_content, start.start()):
+            end = end_match.end()
+        if "<article" in html_content[end:].lower():
+            # An article left open runs to the end of the document
+            end = len(html_content)
+        fragment = html_content[start.start() : end]
+    normalized = _TAG_RE.sub(_canonical_tag, _VOLATILE_RE.sub("", fragment))
+    digest = hashlib.sha256(_FINGERPRINT_VERSION)
+    digest.update(normalized.encode("utf-8", errors="replace"))
+    return digest.hexdigest()
+
+
+def _parse_cached(
+    html_content: str,
+    parse: Callable[[str], list[dt.date]],
+    parse_cache: ParseCache | None,
+) -> list[dt.date]:
+    if parse_cache is None:
+        with metrics.timer("parse_ms"):
+            return parse(html_content)
+    fingerprint = event_list_fingerprint(html_content)
+    dates = parse_cache.get(fingerprint)
+    if dates is not None:
+        logger.info("Event list seen before, reusing its parsed dates")
+        metrics.incr("parse_cache_hits")
+        return dates
+    metrics.incr("parse_cache_misses")
+    with metrics.timer("parse_ms"):
+        dates = parse(html_content)
+    parse_cache.put(fingerprint, dates)
+    return dates
+
+
+def parse_html_content(
+    html_content: str,
+    backend: str = DEFAULT_PARSER_BACKEND,
+    parse_cache: ParseCache | None = None,
+) -> list[dt.date]:
+    """
+    Parse the concert dates out of a listing page with the given *backend*.
+
+    With *parse_cache*, a page whose event list was parsed before is looked up
+    by its fingerprint instead of being parsed again.
+    """
+    dates = _parse_cached(html_content, get_parser_backend(backend), parse_cache)
     logger.info(f"Returning {len(dates)} dates")
     return dates
 
 
-def fetch_concert_dates(url: str) -> list[dt.date]:
+def parse_events(
+    html_content: str, backend: str = DEFAULT_PARSER_BACKEND
+) -> list[Event]:
+    """Parse every event on a listing page, sold out or not."""
+    with metrics.timer("parse_ms"):
+        events = get_event_parser_backend(backend)(html_content)
+    logger.info(f"Returning {len(events)} events")
+    return events
+
+
+# Batches smaller than this are parsed in-process, since starting worker
+# processes costs more than parsing a few pages.
+PARALLEL_MIN_BATCH = 8
+
+
+def _parse_ordinals(document: str | bytes, backend: str, encoding: str) -> array:
+    if isinstance(document, bytes):
+        document = document.decode(encoding, errors="replace")
+    dates = get_parser_backend(backend)(document)
+    return array("I", [date.toordinal() for date in dates])
+
+
+def _parse_ordinals_in_worker(
+    document: str | bytes, backend: str, encoding: str
+) -> bytes:
+    # Raw array bytes pickle far smaller and faster than a list of dates
+    return _parse_ordinals(document, backend, encoding).tobytes()
+
+
+def _from_bytes(raw: bytes) -> array:
+    ordinals = array("I")
+    ordinals.frombytes(raw)
+    return ordinals
+
+
+def parse_many(
+    documents: Sequence[str | bytes],
+    backend: str = DEFAULT_PARSER_BACKEND,
+    *,
+    encoding: str = "utf-8",
+    max_workers: int | None = None,
+    min_batch: int = PARALLEL_MIN_BATCH,
+) -> list[array]:
+    """
+    Parse the concert dates out of many listing pages, one process per core.
+
+    *documents* are page texts or raw bodies in *encoding*. Returns one
+    ``array("I")`` of day ordinals per document, in listing order, as
+    parse_html_content would (``dt.date.fromordinal`` turns them back into
+    dates). Batches of fewer than *min_batch* documents, or with a single
+    worker, are parsed in this process; only then are the parsers' metrics
+    recorded.
+    """
+    get_parser_backend(backend)  # fail on unknown names before starting workers
+    workers = min(max_workers or os.process_cpu_count() or 1, len(documents))
+    with metrics.timer("parse_ms"):
+        if workers < 2 or len(documents) < min_batch:
+            return [_parse_ordinals(d, backend, encoding) for d in documents]
+        # Only backfills get here, so keep these off the import path
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Workers fork from a server that has imported this module, so the
+        # parsers and the month table are loaded once and shared between them,
+        # and forking stays safe while this process runs threads.
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        chunksize = max(1, len(documents) // (workers * 4))
+        logger.info(f"Parsing {len(documents)} pages with {workers} workers")
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            results = executor.map(
+                _parse_ordinals_in_worker,
+                documents,
+                repeat(backend),
+                repeat(encoding),
+                chunksize=chunksize,
+            )
+            return [_from_bytes(raw) for raw in results]
+
+
+class _EventStreamParser(HTMLParser):
+    """Incremental ``article.event`` extractor that never builds a document tree.
+
+    Only a stack of open tag names is kept. Completed events are collected in
+    ``events`` and ``finished`` is set once the ``.block--event-list`` element
+    has been closed, so callers can stop feeding the rest of the page. Events
+    grouped into several containers inside it (e.g. one per month) are all
+    read; a page without it is read to the end.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.events: list[Event] = []
+        self.articles_seen = 0
+        self.finished = False
+        self._stack: list[str] = []
+        # Stack depth of the event list container, once it has been opened
+        self._list_depth: int | None = None
+        self._article_depth: int | None = None
+        # Field names and stack depths of the elements whose text is being captured
+        self._captures: list[tuple[str, int]] = []
+        self._fields: dict[str, list[str]] = {}
+        self._text: list[str] = []
+        self._url = ""
+        self._event_id = ""
+
+    def _flush_text(self) -> None:
+        # Mirrors get_text(strip=True): every text node is stripped, empty ones dropped
+        if self._captures and self._text:
+            node = "".join(self._text).strip()
+            if node:
+                for name, _ in self._captures:
+                    self._fields[name].append(node)
+        self._text.clear()
+
+    @override
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self.finished:
+            return
+        self._flush_text()
+        if tag in _VOID_ELEMENTS:
+            return
+        classes = next((v or "" for k, v in attrs if k == "class"), "").split()
+        depth = len(self._stack)
+        if _EVENT_LIST_CLASS in classes and self._list_depth is None:
+            self._list_depth = depth
+        if tag == "article" and "event" in classes and self._article_depth is None:
+            self._article_depth = depth
+            self._fields = {}
+            self._url = ""
+            self._event_id = next(
+                (v or "" for k, v in attrs if k == "data-event-id"), ""
+            )
+            self.articles_seen += 1
+        elif self._article_depth is not None:
+            # Like article.find(), only the first matching element of each kind counts
+            names = _EVENT_FIELDS if tag == "div" else ()
+            for name in (*names, *_DETAIL_FIELDS):
+                if name in classes and name not in self._fields:
+                    self._fields[name] = []
+                    self._captures.append((name, depth))
+            if (
+                tag == "a"
+                and not self._url
+                and any(name == "event__title" for name, _ in self._captures)
+            ):
+                self._url = next((v or "" for k, v in attrs if k == "href"), "")
+        self._stack.append(tag)
+
+    @override
+    def handle_endtag(self, tag: str) -> None:
+        if self.finished:
+            return
+        self._flush_text()
+        if tag in _VOID_ELEMENTS or tag not in self._stack:
+            return
+        # Pop up to the matching tag, implicitly closing anything left open inside it
+        while self._stack.pop() != tag:
+            pass
+        depth = len(self._stack)
+        if self._captures:
+            self._captures = [c for c in self._captures if c[1] < depth]
+        if self._article_depth is not None and depth <= self._article_depth:
+            self._article_depth = None
+            self._emit_article()
+        if self._list_depth is not None and depth <= self._list_depth:
+            self.finished = True
+
+    @override
+    def handle_data(self, data: str) -> None:
+        if self._captures:
+            self._text.append(data)
+
+    def _emit_article(self) -> None:
+        fields = {name: "".join(parts) for name, parts in self._fields.items()}
+        if "event__fn" not in fields:
+            logger.debug("No event__fn div found, skipping article.")
+            metrics.incr("articles_skipped")
+            return
+        event = _make_event(fields, self._url, self._event_id)
+        if event is not None:
+            self.events.append(event)
+
+
+def iter_html_events(
+    chunks: Iterable[str | bytes], encoding: str = "utf-8"
+) -> Iterator[Event]:
+    """
+    Yield the events of an HTML document delivered in *chunks*.
+
+    Produces the same events as parse_events, but consumes the input
+    incrementally and stops pulling chunks as soon as the event list has ended.
+    """
+    parser = _EventStreamParser()
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        yield from parser.events
+        parser.events.clear()
+        if parser.finished:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        yield from parser.events
+    logger.info(f"Found {parser.articles_seen} articles")
+    metrics.incr("articles_seen", parser.articles_seen)
+
+
+def iter_html_dates(
+    chunks: Iterable[str | bytes], encoding: str = "utf-8"
+) -> Iterator[dt.date]:
+    """
+    Yield concert dates from an HTML document delivered in *chunks*.
+
+    Produces the same dates as parse_html_content, but consumes the input
+    incrementally and stops pulling chunks as soon as the event list has ended.
+    """
+    for event in iter_html_events(chunks, encoding):
+        if not event.sold_out:
+            yield event.date
+
+
+def fetch_concert_dates(
+    url: str,
+    validators: ValidatorCache | None = None,
+    backend: str = "stream",
+    session: requests.Session | None = None,
+    parse_cache: ParseCache | None = None,
+    raise_errors: bool = False,
+) -> list[dt.date] | None:
+    """
+    Fetch and parse the concert dates listed at *url*.
+
+    With *validators* the request is made conditional and None is returned
+    when the page has not changed since the last committed run (either a 304
+    or a body with the same hash). Errors are logged and result in an empty
+    list, or with *raise_errors* in FetchError. The "stream" *backend* parses
+    the body while it is downloaded, hashing it on the way, so an unchanged
+    body is parsed and then discarded; every other backend parses it once
+    complete, and only if its hash changed. A *session* lets callers reuse
+    pooled connections across requests. With *parse_cache* the body is always
+    buffered, so that an event list parsed before can be looked up instead of
+    parsed.
+    """
+    parse = get_parser_backend(backend)
+
+    def parse_body(chunks: Iterable[bytes], encoding: str) -> list[dt.date]:
+        if backend == "stream" and parse_cache is None:
+            # Parsed while the body downloads, so this includes transfer time
+            with metrics.timer("parse_ms"):
+                return list(iter_html_dates(chunks, encoding))
+        body = b"".join(chunks)
+        return _parse_cached(
+            body.decode(encoding, errors="replace"), parse, parse_cache
+        )
+
+    dates = _fetch(
+        url,
+        validators,
+        session,
+        parse_body,
+        raise_errors,
+        streaming=backend == "stream" and parse_cache is None,
+    )
+    if dates is not None:
+        logger.info(f"Returning {len(dates)} dates")
+    return dates
+
+
+def fetch_concert_events(
+    url: str,
+    validators: ValidatorCache | None = None,
+    backend: str = "stream",
+    session: requests.Session | None = None,
+) -> list[Event] | None:
+    """
+    Like fetch_concert_dates, but return every event, sold out or not.
+
+    Event URLs are made absolute, relative to *url*.
+    """
+    parse = get_event_parser_backend(backend)
+
+    def parse_body(chunks: Iterable[bytes], encoding: str) -> list[Event]:
+        with metrics.timer("parse_ms"):
+            if backend == "stream":
+                return list(iter_html_events(chunks, encoding))
+            return parse(b"".join(chunks).decode(encoding, errors="replace"))
+
+    events = _fetch(url, validators, session, parse_body, streaming=backend == "stream")
+    if events is None:
+        return None
+    logger.info(f"Returning {len(events)} events")
+    return [replace(e, url=urljoin(url, e.url)) if e.url else e for e in events]
+
+
+def _fetch[T](
+    url: str,
+    validators: ValidatorCache | None,
+    session: requests.Session | None,
+    parse_body: Callable[[Iterable[bytes], str], list[T]],
+    raise_errors: bool = False,
+    *,
+    streaming: bool = False,
+) -> list[T] | None:
     logger.info(f"Requesting URL: {url}")
+    headers = validators.request_headers(url) if validators is not None else {}
+    metrics.incr("fetch_requests")
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        logger.error(f"Network error while fetching URL {url}: {e}")
-        return []
+        with metrics.timer("fetch_ms"):
+            return _fetch_and_parse(
+                url, validators, session, headers, parse_body, streaming
+            )
     except Exception as e:
-        logger.error(f"Unexpected error while fetching URL {url}: {e}")
+        if isinstance(e, requests.RequestException):
+            logger.error(f"Network error while fetching URL {url}: {e}")
+        else:
+            logger.error(f"Unexpected error while fetching URL {url}: {e}")
+        metrics.incr("fetch_errors")
+        if raise_errors:
+            raise FetchError(f"Failed to fetch {url}: {e}") from e
         return []
-    return parse_html_content(response.text)
+
+
+def _counted(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    for chunk in chunks:
+        metrics.incr("fetch_bytes", len(chunk), metrics.BYTES)
+        yield chunk
+
+
+def _hashed(chunks: Iterable[bytes], digest: "hashlib._Hash") -> Iterator[bytes]:
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+def _fetch_and_parse[T](
+    url: str,
+    validators: ValidatorCache | None,
+    session: requests.Session | None,
+    headers: dict[str, str],
+    parse_body: Callable[[Iterable[bytes], str], list[T]],
+    streaming: bool = False,
+) -> list[T] | None:
+    get = session.get if session is not None else requests.get
+    response = get(url, timeout=10, stream=True, headers=headers)
+    # Time to the response headers, including DNS and TLS on a new connection
+    metrics.incr(
+        "fetch_ttfb_ms", response.elapsed.total_seconds() * 1e3, metrics.MILLISECONDS
+    )
+    # Closing the response drops the connection without reading the rest of the body
+    with response:
+        if response.status_code == 304:
+            logger.info(f"Page not modified since last run: {url}")
+            metrics.incr("fetch_not_modified")
+            return None
+        response.raise_for_status()
+        chunks: Iterable[bytes] = _counted(
+            response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        )
+        encoding = response.encoding or "utf-8"
+        if validators is None:
+            return parse_body(chunks, encoding)
+        digest = hashlib.sha256()
+        if streaming:
+            # Hashed as the parser pulls the chunks, so the body isn't buffered
+            hashed = _hashed(chunks, digest)
+            parsed = parse_body(hashed, encoding)
+            # The parser stops at the end of the event list, the hash needs the rest
+            for _ in hashed:
+                pass
+        else:
+            body = b"".join(_hashed(chunks, digest))
+        content_hash = digest.hexdigest()
+        validators.stage(
+            url,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_hash=content_hash,
+        )
+        if content_hash == validators.content_hash(url):
+            logger.info(f"Page content unchanged since last run: {url}")
+            metrics.incr("fetch_unchanged")
+            return None
+        return parsed if streaming else parse_body([body], encoding)
@@ -1,54 +1,450 @@
+import datetime as dt
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from dataclasses import replace
+from enum import StrEnum
+from functools import cached_property
+from typing import TYPE_CHECKING
 
+import requests
+
+from src import metrics
+from src.archive import SnapshotArchive
 from src.config import Settings
+from src.events import Event, EventChanges, available_dates
 from src.notifications import NotificationService, TelegramNotificationService
-from src.scraper import fetch_concert_dates
-from src.storage import DateCache, S3Storage, Storage
+from src.outbox import NotificationDispatcher, NotificationOutbox
+from src.runtime import Runtime
+from src.scraper import FetchError, fetch_concert_dates, fetch_concert_events
+from src.storage import (
+    DateCache,
+    EventCache,
+    ParseCache,
+    S3Storage,
+    Storage,
+    ValidatorCache,
+)
+from src.subscribers import (
+    DeliveryProgress,
+    FanOutNotificationService,
+    SubscriberRegistry,
+)
+
+if TYPE_CHECKING:
+    from src.trackers import MultiTrackerService
 
 logger = logging.getLogger(__name__)
 
 
+class RunStatus(StrEnum):
+    """What a run found, so callers such as src.daemon can adapt to it."""
+
+    NEW_DATES = "new_dates"
+    NO_NEW_DATES = "no_new_dates"
+    # The page was not modified since the last run, nothing was parsed
+    UNCHANGED = "unchanged"
+    # Scraping failed or the page listed no dates
+    FAILED = "failed"
+    # A forced run (e.g. /query), which only reports the dates
+    FORCED = "forced"
+
+
+# Stored objects loaded by ConcertTrackerService.load_state()
+_STATE = ("cache", "outbox", "events", "archive")
+
+
 class ConcertTrackerService:
     def __init__(
         self,
         config: Settings,
         storage: Storage,
         notification_service: NotificationService,
+        session: requests.Session | None = None,
+        admin_notification_service: NotificationService | None = None,
     ):
         self.config = config
-        self.cache = DateCache(storage, config.storage_file)
+        self.storage = storage
+        self.session = session
+        # Needed for the (conditional) request, the rest loads during it
+        with metrics.timer("cache_load_ms"):
+            self.validators = ValidatorCache(storage, config.validators_file)
+            self.parse_cache = (
+                ParseCache(storage, config.parse_cache_file, config.parse_cache_size)
+                if config.parse_cache_size
+                else None
+            )
         self.notification_service = notification_service
+        # Answers forced runs (/query), which must not go out to every subscriber
+        self.admin_notification_service = (
+            admin_notification_service or notification_service
+        )
+        self.tracks_events = config.track_events
+        if self.tracks_events and (len(config.urls) > 1 or config.max_pages > 1):
+            logger.warning("Event tracking needs a single listing page, disabled")
+            self.tracks_events = False
+        self._state_lock = threading.Lock()
+
+    def load_state(self) -> None:
+        """
+        Load the stored state a run needs besides the validators, concurrently.
+
+        Happens on first use otherwise; run() calls it while the page downloads.
+        """
+        with self._state_lock, ThreadPoolExecutor(len(_STATE)) as executor:
+            futures = [
+                executor.submit(copy_context().run, getattr, self, name)
+                for name in _STATE
+            ]
+            for future in futures:
+                future.result()
+
+    @cached_property
+    def cache(self) -> DateCache:
+        with metrics.timer("cache_load_ms"):
+            return DateCache(self.storage, self.config.storage_file)
+
+    @cached_property
+    def outbox(self) -> NotificationOutbox:
+        with metrics.timer("cache_load_ms"):
+            return NotificationOutbox(self.storage, self.config.outbox_file)
+
+    @cached_property
+    def dispatcher(self) -> NotificationDispatcher:
+        return NotificationDispatcher(self.notification_service, self.outbox)
+
+    @cached_property
+    def events(self) -> EventCache | None:
+        if not self.tracks_events:
+            return None
+        with metrics.timer("cache_load_ms"):
+            return EventCache(self.storage, self.config.events_file)
+
+    @cached_property
+    def archive(self) -> SnapshotArchive | None:
+        if not self.config.archive_prefix:
+            return None
+        try:
+            with metrics.timer("cache_load_ms"):
+                return SnapshotArchive(self.storage, self.config.archive_prefix)
+        except Exception as e:
+            # Like any archiving error, this must not fail the run; see _save()
+            logger.warning(f"Failed to load the archive, not archiving: {e}")
+            return None
+
+    def _scrape(self, force: bool | str) -> list[dt.date] | None:
+        """Return the dates currently listed, or None if nothing changed."""
+        if len(self.config.urls) > 1:
+            from src.fetcher import fetch_all  # pulls in asyncio, only needed here
+
+            # Validators are per page, but the cache holds the union of all pages,
+            # so a partly unchanged set of pages still has to be fetched in full
+            return fetch_all(
+                self.config.urls,
+                session=self.session,
+                backend=self.config.parser_backend,
+                max_concurrency=self.config.fetch_concurrency,
+                per_host_interval=self.config.per_host_interval,
+            )
+        if self.config.max_pages > 1:
+            return self._crawl(force)
+        # Force mode must always see the page, so it never sends a conditional request
+        return fetch_concert_dates(
+            self.config.urls[0],
+            validators=None if force else self.validators,
+            backend=self.config.parser_backend,
+            session=self.session,
+            parse_cache=self.parse_cache,
+        )
+
+    def _crawl(self, force: bool | str) -> list[dt.date]:
+        from src.crawler import crawl_concert_dates
 
-    def run(self, force: bool | str = False) -> None:
+        # Runs next to run()'s load_state(), which must load the cache once
+        self.load_state()
+        cached = self.cache.dates
+        stop_before = None
+        if self.config.newest_first and cached and not force:
+            stop_before = cached[-1]
+        try:
+            dates = [
+                date
+                for page in crawl_concert_dates(
+                    self.config.urls[0],
+                    session=self.session,
+                    backend=self.config.parser_backend,
+                    max_pages=self.config.max_pages,
+                    stop_before=stop_before,
+                    parse_cache=self.parse_cache,
+                )
+                for date in page
+            ]
+        except FetchError:
+            # The dates of the pages not read would look removed, so fail the run
+            return []
+        if stop_before is not None and dates:
+            # The older pages were not read, keep what the cache knows about them
+            dates.extend(self.cache.dates_before(min(dates)))
+        return dates
+
+    def _fetch(
+        self, force: bool | str
+    ) -> tuple[list[Event] | None, list[dt.date] | None]:
+        """Return the events (when tracked) and dates listed, None if unchanged."""
+        if not self.tracks_events or force:
+            return None, self._scrape(force)
+        events = fetch_concert_events(
+            self.config.urls[0],
+            validators=self.validators,
+            backend=self.config.parser_backend,
+            session=self.session,
+        )
+        return events, None if events is None else available_dates(events)
+
+    def run(self, force: bool | str = False) -> RunStatus:
+        """
+        Scrape the listing, record what is new and send the notifications.
+
+        The stored state loads in a worker thread while the page downloads.
+        Once the new dates are claimed and queued, they are delivered while
+        the validators, the parse cache and the archive are written back.
+        """
         logger.info("Starting concert tracker run")
-        current_dates = fetch_concert_dates(self.config.url)
+        if force:
+            # Cached dates are all a forced run (e.g. /query) needs, so don't scrape
+            cached_dates = list(self.cache.dates)
+            if cached_dates:
+                logger.info(f"Force mode enabled. Sending dates: {cached_dates}")
+                self.admin_notification_service.send_notification(cached_dates)
+                return RunStatus.FORCED
+
+        with ThreadPoolExecutor(2) as executor:
+            loading = executor.submit(copy_context().run, self.load_state)
+            try:
+                with metrics.timer("scrape_ms"):
+                    events, current_dates = self._fetch(force)
+            finally:
+                loading.result()
+            metrics.incr("dates_scraped", len(current_dates or []))
+            # Parse results only depend on the page, keep them even if the rest fails
+            saving = (
+                executor.submit(copy_context().run, self.parse_cache.save)
+                if self.parse_cache is not None
+                else None
+            )
+            try:
+                if force:
+                    if current_dates:
+                        logger.info(
+                            f"Force mode enabled. Sending dates: {current_dates}"
+                        )
+                        self.admin_notification_service.send_notification(current_dates)
+                    else:
+                        logger.info("No dates found or error during scraping")
+                    return RunStatus.FORCED
 
-        if not current_dates:
+                status, report = self._record(events, current_dates)
+                # Delivery doesn't depend on the remaining writes, so they overlap
+                saved = executor.submit(
+                    copy_context().run, self._save, status, events, current_dates
+                )
+                try:
+                    self._notify(report)
+                finally:
+                    wait([saved])
+                saved.result()
+                return status
+            finally:
+                if saving is not None:
+                    saving.result()
+
+    def _record(
+        self, events: list[Event] | None, current_dates: list[dt.date] | None
+    ) -> tuple[RunStatus, EventChanges | None]:
+        """Record what was scraped; return the status and the change report to send."""
+        if current_dates is None:
+            logger.info("Page unchanged since last run, no new dates")
+            return RunStatus.UNCHANGED, None
+        if not (events if events is not None else current_dates):
             logger.info("No dates found or error during scraping")
-            # If force is true, we might still want to proceed with cached dates if we want to test notification
-            if not force:
-                return
+            return RunStatus.FAILED, None
+        changes = None
+        reopened: set[dt.date] = set()
+        unsent: list[dt.date] = []
+        if events is not None:
+            with metrics.timer("cache_save_ms"):
+                changes = self._record_event_changes(events)
+            if changes is not None and changes.available:
+                # Tickets coming back go fast, so this is sent before anything else
+                with metrics.timer("notify_ms"):
+                    alerted = self.notification_service.send_available(
+                        changes.available
+                    )
+                if alerted:
+                    reopened = _reopened_dates(changes)
+                else:
+                    unsent = sorted({e.date for e in changes.available})
+        with metrics.timer("cache_save_ms"):
+            # Dates not known yet go through the outbox with the new ones anyway
+            unsent = [date for date in unsent if date in self.cache.dates]
+            new_dates = (
+                self._record_new_dates(current_dates, reopened) if current_dates else []
+            )
+            if unsent:
+                # Announced like new dates instead, and retried until delivered
+                logger.warning(f"Availability alert not sent, queueing {unsent}")
+                self.outbox.enqueue(unsent)
+        status = RunStatus.NEW_DATES if new_dates or unsent else RunStatus.NO_NEW_DATES
+        if changes is None:
+            return status, None
+        # New dates went out through the outbox already
+        announced = set(new_dates)
+        report = replace(
+            changes,
+            added=[e for e in changes.added if e.date not in announced],
+            available=[],
+        )
+        return status, report or None
 
-        if force:
-            dates_to_send = self.cache.dates if self.cache.dates else current_dates
-            logger.info(f"Force mode enabled. Sending dates: {dates_to_send}")
-            if dates_to_send:
-                self.notification_service.send_notification(dates_to_send)
+    def _notify(self, report: EventChanges | None) -> None:
+        with metrics.timer("notify_ms"):
+            if report:
+                self.notification_service.send_changes(report)
+            # Also retries whatever earlier runs failed to deliver
+            self.dispatcher.dispatch()
+
+    def _save(
+        self,
+        status: RunStatus,
+        events: list[Event] | None,
+        current_dates: list[dt.date] | None,
+    ) -> None:
+        if status is RunStatus.FAILED:
             return
+        with metrics.timer("cache_save_ms"):
+            self.validators.commit()
+        if self.archive is not None:
+            self._archive(events, current_dates)
+        elif self.config.archive_prefix:
+            # Loading failed, so try again on the next run
+            del self.archive
 
-        new_dates = self.cache.find_new_dates(current_dates)
+    def _archive(
+        self, events: list[Event] | None, current_dates: list[dt.date] | None
+    ) -> None:
+        """Add what was listed to the archive; history is not worth failing a run for."""
+        assert self.archive is not None
+        now = dt.datetime.now(dt.UTC)
+        try:
+            with metrics.timer("archive_ms"):
+                if current_dates is None:
+                    self.archive.touch(now)
+                elif events is not None:
+                    self.archive.record(events, now)
+                else:
+                    self.archive.record([Event(date) for date in current_dates], now)
+        except Exception as e:
+            logger.error(f"Failed to archive the listing: {e}")
 
+    def _record_new_dates(
+        self, current_dates: list[dt.date], reopened: set[dt.date] | None = None
+    ) -> list[dt.date]:
+        """Record *current_dates* and queue the new ones, except those *reopened*."""
+        new_dates = self.cache.find_new_dates(current_dates)
+        # Known events with tickets again, alerted as such
+        candidates = [date for date in new_dates if date not in (reopened or ())]
+        # Queued before they are claimed, so a crash in between can't lose them.
+        # They stay in the outbox until Telegram has acknowledged them.
+        if candidates:
+            self.outbox.enqueue(candidates)
         if new_dates:
-            logger.info(f"New dates found: {new_dates}. Sending notifications.")
-            self.notification_service.send_notification(new_dates)
-            self.cache.update(current_dates)
+            # Claiming makes sure overlapping runs don't both announce a date
+            claimed = set(self.cache.update(current_dates))
+            lost = [date for date in candidates if date not in claimed]
+            if lost:
+                # Announced by the run that claimed them, which holds them too
+                self.outbox.release(lost)
+            candidates = [date for date in candidates if date in claimed]
+        metrics.incr("dates_new", len(candidates))
+        if candidates:
+            logger.info(f"New dates found: {candidates}. Queued notifications.")
         else:
             logger.info("No new dates found, nothing to send")
+        return candidates
+
+    def _record_event_changes(self, events: list[Event]) -> EventChanges | None:
+        """Update the event cache and return the changes worth reporting, if any."""
+        assert self.events is not None
+        first_run = not len(self.events.index)
+        changes = self.events.update(events)
+        if first_run:
+            logger.info(f"Event cache initialized with {len(events)} events")
+            return None
+        # Sold-out concerts are only news once they have tickets, and past
+        # concerts dropping off the listing are not news at all
+        today = dt.date.today()
+        changes.added = [e for e in changes.added if not e.sold_out]
+        changes.removed = [e for e in changes.removed if e.date >= today]
+        metrics.incr("events_sold_out_changes", len(changes.sold_out))
+        metrics.incr("events_available_again", len(changes.available))
+        if not changes:
+            return None
+        logger.info(
+            f"Event changes: {len(changes.added)} added, {len(changes.available)} "
+            f"available again, {len(changes.sold_out)} sold out, "
+            f"{len(changes.removed)} removed"
+        )
+        return changes
+
 
+def _reopened_dates(changes: EventChanges | None) -> set[dt.date]:
+    """Dates that only have known events coming back, rather than new ones."""
+    if changes is None:
+        return set()
+    return {e.date for e in changes.available} - {e.date for e in changes.added}
 
-def create_service(config: Settings) -> ConcertTrackerService:
-    storage = S3Storage(config.bucket)
-    notification_service = TelegramNotificationService(
-        config.telegram_token, config.telegram_chat_id
+
+def create_service(
+    config: Settings, runtime: Runtime | None = None, storage: Storage | None = None
+) -> "ConcertTrackerService | MultiTrackerService":
+    """
+    Build the production service, reusing the clients held by *runtime*.
+
+    State is kept in the bucket of *config*, unless another *storage* is given.
+    When trackers are configured there, a MultiTrackerService runs them all.
+    """
+    # src.trackers builds on this module
+    from src.trackers import create_multi_tracker_service, load_tracker_specs
+
+    session = runtime.session if runtime is not None else None
+    if storage is None:
+        storage = runtime.storage if runtime is not None else S3Storage(config.bucket)
+    specs = load_tracker_specs(storage, config.trackers_file)
+    if specs:
+        return create_multi_tracker_service(config, specs, storage, session)
+    admin_notification_service = TelegramNotificationService(
+        config.telegram_token,
+        config.telegram_chat_id,
+        session=session,
+        api_url=config.telegram_api_url,
+    )
+    subscribers = SubscriberRegistry(storage, config.subscribers_file).subscribers
+    notification_service: NotificationService = admin_notification_service
+    if subscribers:
+        notification_service = FanOutNotificationService(
+            config.telegram_token,
+            subscribers,
+            session=session,
+            messages_per_second=config.notify_rate,
+            max_concurrency=config.fetch_concurrency,
+            api_url=config.telegram_api_url,
+            progress=DeliveryProgress(storage, config.subscriber_progress_file),
+        )
+    return ConcertTrackerService(
+        config,
+        storage,
+        notification_service,
+        session=session,
+        admin_notification_service=admin_notification_service,
     )
-    return ConcertTrackerService(config, storage, notification_service)
@@ -1,8 +1,24 @@
 import datetime as dt
+import hashlib
 import json
+import logging
 import os
+import struct
+import sys
+import threading
+import time
+import zlib
 from abc import ABC, abstractmethod
-from typing import override
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, NamedTuple, overload, override
+
+from src import metrics
+from src.events import Event, EventChanges, EventIndex, EventState
+
+logger = logging.getLogger()
 
 # ---------------------------------------------------------------------------
 # Abstract storage backend
@@ -20,15 +36,65 @@ class Storage(ABC):
     def write(self, key: str, data: bytes) -> None:
         """Write *data* to *key*, overwriting any previous value."""
 
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove *key*; removing a key that does not exist is not an error."""
+
+    def read_versioned(self, key: str) -> tuple[bytes | None, str | None]:
+        """
+        Return the bytes at *key* together with a version token for them.
+
+        Pass the token to write_if_match() to only overwrite that exact version.
+        The default implementation uses a hash of the content as the token.
+        """
+        data = self.read(key)
+        return data, _content_version(data)
+
+    def write_if_match(self, key: str, data: bytes, version: str | None) -> str:
+        """
+        Write *data* to *key* only if it still holds *version*.
+
+        A *version* of None means the key must not exist yet. Raises
+        WriteConflictError otherwise and returns the version of the new data.
+        The default implementation is not atomic; backends that can check and
+        write in one step override it.
+        """
+        if self.read_versioned(key)[1] != version:
+            raise WriteConflictError(f"{key} was modified concurrently")
+        self.write(key, data)
+        return _content_version(data)  # type: ignore[return-value]
+
+    def read_if_modified(
+        self, key: str, version: str | None
+    ) -> tuple[bytes | None, str | None] | None:
+        """
+        Like read_versioned(), but return None if *key* still holds *version*.
+
+        A *version* of None stands for a key that did not exist. Backends that
+        can revalidate without transferring the content override this.
+        """
+        data, current = self.read_versioned(key)
+        return None if current == version else (data, current)
+
+
+class WriteConflictError(Exception):
+    """Raised when a conditional write finds that the key has changed."""
+
+
+def _content_version(data: bytes | None) -> str | None:
+    return hashlib.sha256(data).hexdigest() if data is not None else None
+
 
 class S3Storage(Storage):
     """Production backend - reads and writes objects in an S3 bucket."""
 
-    def __init__(self, bucket: str):
-        import boto3  # imported lazily so the module works without boto3 in tests
+    def __init__(self, bucket: str, client: Any = None):
+        if client is None:
+            import boto3  # imported lazily so the module works without boto3 in tests
 
+            client = boto3.client("s3")
         self._bucket: str = bucket
-        self._s3 = boto3.client("s3")
+        self._s3 = client
 
     @override
     def read(self, key: str) -> bytes | None:
@@ -42,12 +108,59 @@ class S3Storage(Storage):
     def write(self, key: str, data: bytes) -> None:
         self._s3.put_object(Bucket=self._bucket, Key=key, Body=data)
 
+    @override
+    def delete(self, key: str) -> None:
+        self._s3.delete_object(Bucket=self._bucket, Key=key)
+
+    @override
+    def read_versioned(self, key: str) -> tuple[bytes | None, str | None]:
+        try:
+            obj = self._s3.get_object(Bucket=self._bucket, Key=key)
+            return obj["Body"].read(), obj["ETag"]
+        except self._s3.exceptions.NoSuchKey:
+            return None, None
+
+    @override
+    def read_if_modified(
+        self, key: str, version: str | None
+    ) -> tuple[bytes | None, str | None] | None:
+        if version is None:
+            data, etag = self.read_versioned(key)
+            return None if data is None else (data, etag)
+        try:
+            obj = self._s3.get_object(Bucket=self._bucket, Key=key, IfNoneMatch=version)
+        except self._s3.exceptions.NoSuchKey:
+            return None, None
+        except self._s3.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("304", "NotModified"):
+                return None
+            raise
+        return obj["Body"].read(), obj["ETag"]
+
+    @override
+    def write_if_match(self, key: str, data: bytes, version: str | None) -> str:
+        # S3 checks the precondition and writes atomically, the version is the ETag
+        condition = (
+            {"IfMatch": version} if version is not None else {"IfNoneMatch": "*"}
+        )
+        try:
+            response = self._s3.put_object(
+                Bucket=self._bucket, Key=key, Body=data, **condition
+            )
+        except self._s3.exceptions.ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise WriteConflictError(f"{key} was modified concurrently") from e
+            raise
+        return response["ETag"]
+
 
 class LocalStorage(Storage):
     """Local-filesystem backend - useful for unit tests and local development."""
 
     def __init__(self, base_dir: str = "."):
         self._base_dir = base_dir
+        self._lock = threading.Lock()
 
     def _path(self, key: str) -> str:
         return os.path.join(self._base_dir, key)
@@ -67,57 +180,784 @@ class LocalStorage(Storage):
         with open(path, "wb") as f:
             f.write(data)
 
+    @override
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    @override
+    def write_if_match(self, key: str, data: bytes, version: str | None) -> str:
+        # Only serializes writers within this process, which is enough for local runs
+        with self._lock:
+            return super().write_if_match(key, data, version)
+
+
+class InMemoryStorage(Storage):
+    """Thread-safe in-process backend with atomic conditional writes.
+
+    Mirrors S3's conditional put semantics, which makes it a stand-in for
+    exercising concurrent writers in tests.
+    """
+
+    def __init__(self) -> None:
+        self._objects: dict[str, tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @override
+    def read(self, key: str) -> bytes | None:
+        return self.read_versioned(key)[0]
+
+    @override
+    def write(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._put(key, data)
+
+    @override
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._objects.pop(key, None)
+
+    @override
+    def read_versioned(self, key: str) -> tuple[bytes | None, str | None]:
+        with self._lock:
+            return self._objects.get(key, (None, None))
+
+    @override
+    def write_if_match(self, key: str, data: bytes, version: str | None) -> str:
+        with self._lock:
+            if self._objects.get(key, (None, None))[1] != version:
+                raise WriteConflictError(f"{key} was modified concurrently")
+            return self._put(key, data)
+
+    def _put(self, key: str, data: bytes) -> str:
+        self._writes += 1
+        version = str(self._writes)
+        self._objects[key] = (bytes(data), version)
+        return version
+
+
+class _CacheEntry(NamedTuple):
+    data: bytes | None
+    version: str | None
+    # time.monotonic() of the last time the backing store confirmed this entry
+    checked_at: float
+
+
+class TieredStorage(Storage):
+    """Read-through cache in front of any other Storage.
+
+    Reads are served from an in-process LRU while an entry is younger than
+    *ttl* seconds. Older entries, and entries only found in the on-disk tier
+    under *cache_dir*, are revalidated against the backing store by version
+    (an ETag for S3), which skips transferring unchanged content. Writes go
+    through to the backing store and refresh both tiers.
+
+    Within *ttl* a read may miss a change made by another process. This is
+    safe for DateCache, whose conditional writes detect and merge it.
+    """
+
+    def __init__(
+        self,
+        backing: Storage,
+        *,
+        cache_dir: str | None = None,
+        ttl: float = 300.0,
+        max_entries: int = 64,
+        max_bytes: int = 8 * 1024 * 1024,
+    ):
+        self._backing = backing
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._memory: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _memory_get(self, key: str) -> _CacheEntry | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key: str, entry: _CacheEntry) -> None:
+        size = len(entry.data or b"")
+        with self._lock:
+            self._memory_discard(key)
+            if size > self._max_bytes:
+                return
+            self._memory[key] = entry
+            self._memory_bytes += size
+            while (
+                len(self._memory) > self._max_entries
+                or self._memory_bytes > self._max_bytes
+            ):
+                self._memory_discard(next(iter(self._memory)))
+
+    def _memory_discard(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry.data or b"")
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _disk_path(self, key: str) -> str | None:
+        if self._cache_dir is None:
+            return None
+        return os.path.join(self._cache_dir, hashlib.sha256(key.encode()).hexdigest())
+
+    def _disk_get(self, key: str) -> _CacheEntry | None:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                version, _, data = f.read().partition(b"\n")
+        except OSError:
+            return None
+        # Never fresh: entries from disk are always revalidated before use
+        return _CacheEntry(data, version.decode(), float("-inf"))
+
+    def _disk_put(self, key: str, data: bytes | None, version: str | None) -> None:
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            if data is None or version is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(version.encode() + b"\n" + data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # The disk tier is only an optimisation
+            logger.warning(f"Could not update disk cache for {key}: {e}")
+
+    def _store(self, key: str, data: bytes | None, version: str | None) -> None:
+        self._memory_put(key, _CacheEntry(data, version, time.monotonic()))
+        self._disk_put(key, data, version)
+
+    def invalidate(self, key: str) -> None:
+        """Drop *key* from both tiers."""
+        with self._lock:
+            self._memory_discard(key)
+        self._disk_put(key, None, None)
+
+    # ------------------------------------------------------------------
+    # Storage API
+    # ------------------------------------------------------------------
+
+    @override
+    def read(self, key: str) -> bytes | None:
+        return self.read_versioned(key)[0]
+
+    @override
+    def read_versioned(self, key: str) -> tuple[bytes | None, str | None]:
+        entry = self._memory_get(key)
+        if entry is not None and time.monotonic() - entry.checked_at < self._ttl:
+            return entry.data, entry.version
+        entry = entry or self._disk_get(key)
+        if entry is None:
+            data, version = self._backing.read_versioned(key)
+        else:
+            fresh = self._backing.read_if_modified(key, entry.version)
+            data, version = (entry.data, entry.version) if fresh is None else fresh
+        self._store(key, data, version)
+        return data, version
+
+    @override
+    def read_if_modified(
+        self, key: str, version: str | None
+    ) -> tuple[bytes | None, str | None] | None:
+        data, current = self.read_versioned(key)
+        return None if current == version else (data, current)
+
+    @override
+    def write(self, key: str, data: bytes) -> None:
+        # A blind write does not tell us the new version, so the next read refetches
+        self.invalidate(key)
+        self._backing.write(key, data)
+
+    @override
+    def delete(self, key: str) -> None:
+        self.invalidate(key)
+        self._backing.delete(key)
+
+    @override
+    def write_if_match(self, key: str, data: bytes, version: str | None) -> str:
+        try:
+            new_version = self._backing.write_if_match(key, data, version)
+        except WriteConflictError:
+            self.invalidate(key)
+            raise
+        self._store(key, data, new_version)
+        return new_version
+
 
 # ---------------------------------------------------------------------------
 # Date cache
 # ---------------------------------------------------------------------------
 
 
+class CacheFormatError(Exception):
+    """Raised when a stored cache cannot be decoded."""
+
+
+class DateView(Sequence[dt.date]):
+    """Read-only, zero-copy view of a slice of a sorted array of day ordinals.
+
+    Compares equal to any sequence holding the same dates in the same order,
+    so it can be used wherever a sorted list of dates was expected.
+    """
+
+    __slots__ = ("_ordinals", "_start", "_stop")
+
+    def __init__(self, ordinals: array, start: int = 0, stop: int | None = None):
+        self._ordinals = ordinals
+        self._start = start
+        self._stop = len(ordinals) if stop is None else stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> dt.date: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "DateView": ...
+
+    def __getitem__(self, index: int | slice) -> "dt.date | DateView":
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("DateView slices do not support a step")
+            return DateView(
+                self._ordinals, self._start + start, self._start + max(start, stop)
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("DateView index out of range")
+        return dt.date.fromordinal(self._ordinals[self._start + index])
+
+    def __iter__(self) -> Iterator[dt.date]:
+        fromordinal = dt.date.fromordinal
+        for i in range(self._start, self._stop):
+            yield fromordinal(self._ordinals[i])
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, dt.date):
+            return False
+        ordinal = value.toordinal()
+        i = bisect_left(self._ordinals, ordinal, self._start, self._stop)
+        return i < self._stop and self._ordinals[i] == ordinal
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, DateView):
+            return self.ordinals() == other.ordinals()
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"DateView({list(self)!r})"
+
+    def ordinals(self) -> array:
+        """Return a copy of the underlying day ordinals."""
+        return self._ordinals[self._start : self._stop]
+
+
 class DateCache:
-    """Persists a list of dates as JSON via a Storage backend and detects new ones."""
+    """Persists a set of dates via a Storage backend and detects new ones.
+
+    The dates are kept in memory as a sorted, de-duplicated ``array("I")`` of
+    day ordinals, which is also their on-disk payload::
+
+        magic b"CDC" | version (u8) | count (u32) | crc32 of payload (u32) | payload
+
+    all little-endian. Caches written in the original JSON format are still
+    read and are converted to the binary format on the next save.
+
+    Writes are conditional on the version that was loaded, so concurrent runs
+    sharing the same key never silently overwrite each other's changes.
+    """
+
+    MAGIC = b"CDC"
+    VERSION = 1
+    _HEADER = struct.Struct("<3sBII")
+    # How many times update() re-reads and merges after losing a write race
+    MAX_WRITE_ATTEMPTS = 5
 
     def __init__(self, storage: Storage, key: str):
         self._storage = storage
         self._key = key
-        self._dates: list[dt.date] = self._load()
+        # Encoded form and version of what is currently in storage
+        self._stored: bytes | None = None
+        self._version: str | None = None
+        self._index: array = self._load()
 
     # ------------------------------------------------------------------
     # Persistence helpers
     # ------------------------------------------------------------------
 
     @staticmethod
-    def _dates_to_strings(dates: list[dt.date]) -> list[str]:
-        return [d.isoformat() for d in dates]
+    def _to_index(dates: Iterable[dt.date]) -> array:
+        return array("I", sorted({d.toordinal() for d in dates}))
 
-    @staticmethod
-    def _strings_to_dates(strings: list[str]) -> list[dt.date]:
-        return [dt.date.fromisoformat(s) for s in strings]
+    @classmethod
+    def _encode_index(cls, index: array) -> bytes:
+        if sys.byteorder == "big":
+            index = index[:]
+            index.byteswap()
+        payload = index.tobytes()
+        header = cls._HEADER.pack(
+            cls.MAGIC, cls.VERSION, len(index), zlib.crc32(payload)
+        )
+        return header + payload
 
-    def _load(self) -> list[dt.date]:
-        raw = self._storage.read(self._key)
+    @classmethod
+    def _decode_index(cls, raw: bytes) -> array:
+        if not raw.startswith(cls.MAGIC):
+            return cls._to_index(dt.date.fromisoformat(s) for s in json.loads(raw))
+        if len(raw) < cls._HEADER.size:
+            raise CacheFormatError("Date cache is truncated")
+        _, version, count, checksum = cls._HEADER.unpack_from(raw)
+        if version != cls.VERSION:
+            raise CacheFormatError(f"Unsupported date cache version: {version}")
+        payload = raw[cls._HEADER.size :]
+        if len(payload) != count * 4 or zlib.crc32(payload) != checksum:
+            raise CacheFormatError("Date cache checksum mismatch")
+        index = array("I")
+        index.frombytes(payload)
+        if sys.byteorder == "big":
+            index.byteswap()
+        return index
+
+    @classmethod
+    def encode(cls, dates: Iterable[dt.date]) -> bytes:
+        """Encode *dates* in the binary format."""
+        return cls._encode_index(cls._to_index(dates))
+
+    @classmethod
+    def decode(cls, raw: bytes) -> list[dt.date]:
+        """Decode either the binary format or the legacy JSON list of ISO dates."""
+        return list(DateView(cls._decode_index(raw)))
+
+    def _load(self) -> array:
+        raw, self._version = self._storage.read_versioned(self._key)
         if raw is None:
-            return []
-        return self._strings_to_dates(json.loads(raw))
+            self._stored = self.encode([])
+            return array("I")
+        self._stored = raw if raw.startswith(self.MAGIC) else None
+        return self._decode_index(raw)
+
+    def reload(self) -> None:
+        """Re-read the dates from storage, dropping any unsaved changes."""
+        self._index = self._load()
 
     def save(self) -> None:
-        """Persist the current date list back to storage."""
-        self._storage.write(
-            self._key, json.dumps(self._dates_to_strings(self._dates)).encode()
-        )
+        """
+        Persist the current dates back to storage, unless nothing changed.
+
+        Raises WriteConflictError if the stored cache changed since it was loaded.
+        """
+        data = self._encode_index(self._index)
+        if data == self._stored:
+            return
+        self._version = self._storage.write_if_match(self._key, data, self._version)
+        self._stored = data
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
     @property
-    def dates(self) -> list[dt.date]:
-        return list(self._dates)
+    def dates(self) -> DateView:
+        """All cached dates in ascending order, as a read-only view."""
+        return DateView(self._index)
+
+    def find_new_dates(self, current_dates: Iterable[dt.date]) -> list[dt.date]:
+        """Return the sorted, distinct dates in *current_dates* that are not cached."""
+        index = self._index
+        size = len(index)
+        new: list[dt.date] = []
+        lo = 0
+        for ordinal in sorted({d.toordinal() for d in current_dates}):
+            # Candidates are sorted, so each search starts where the last one ended
+            lo = bisect_left(index, ordinal, lo)
+            if lo == size or index[lo] != ordinal:
+                new.append(dt.date.fromordinal(ordinal))
+        return new
+
+    def dates_after(self, date: dt.date) -> DateView:
+        """Return the cached dates strictly after *date*."""
+        return DateView(self._index, bisect_right(self._index, date.toordinal()))
+
+    def dates_before(self, date: dt.date) -> DateView:
+        """Return the cached dates strictly before *date*."""
+        return DateView(self._index, 0, bisect_left(self._index, date.toordinal()))
+
+    def dates_between(self, start: dt.date, end: dt.date) -> DateView:
+        """Return the cached dates from *start* to *end*, both inclusive."""
+        index = self._index
+        lo = bisect_left(index, start.toordinal())
+        hi = bisect_right(index, end.toordinal(), lo)
+        return DateView(index, lo, max(lo, hi))
 
-    def find_new_dates(self, current_dates: list[dt.date]) -> list[dt.date]:
-        """Return dates in *current_dates* that are not already cached."""
-        return sorted(list(set(current_dates) - set(self._dates)))
+    def dates_in_month(self, year: int, month: int) -> DateView:
+        """Return the cached dates that fall in *month* of *year*."""
+        first = dt.date(year, month, 1)
+        next_month = dt.date(year + month // 12, month % 12 + 1, 1)
+        return self.dates_between(first, next_month - dt.timedelta(days=1))
 
-    def update(self, dates: list[dt.date]) -> None:
-        """Replace the cached dates and persist them to storage."""
-        self._dates = list(dates)
+    def update(self, dates: Iterable[dt.date]) -> list[dt.date]:
+        """
+        Replace the cached dates and persist them to storage.
+
+        If another writer changed the cache in the meantime, the dates this
+        call adds and removes are applied on top of theirs and the write is
+        retried, up to MAX_WRITE_ATTEMPTS times. Returns the dates that this
+        call added to the stored cache, i.e. the ones no concurrent run has
+        already claimed.
+        """
+        base = set(self._index)
+        wanted = {d.toordinal() for d in dates}
+        added, removed = wanted - base, base - wanted
+        theirs = base
+        for attempt in range(1, self.MAX_WRITE_ATTEMPTS):
+            try:
+                return self._save_merged(theirs, added, removed)
+            except WriteConflictError:
+                metrics.incr("cache_write_conflicts")
+                logger.info(
+                    f"Date cache changed concurrently, merging (attempt {attempt})"
+                )
+                theirs = set(self._load())
+        return self._save_merged(theirs, added, removed)
+
+    def _save_merged(
+        self, theirs: set[int], added: set[int], removed: set[int]
+    ) -> list[dt.date]:
+        # A fresh array, so views handed out earlier keep showing the old dates
+        self._index = array("I", sorted((theirs - removed) | added))
         self.save()
+        return [dt.date.fromordinal(o) for o in sorted(added - theirs)]
+
+
+class EventCache:
+    """Persists the state of every event seen and reports what changed since.
+
+    Events are identified by Event.key, so two concerts on one day are told
+    apart and an event selling out is a change of state rather than a removal.
+    Events that left the listing are kept as REMOVED until their date has
+    passed (see EventIndex). They are stored column by column, which keeps
+    repeated titles and venues to a single copy and compresses well::
+
+        magic b"CEV" | version (u8) | count (u32) | crc32 of payload (u32) | payload
+
+    where the payload is zlib-compressed and holds, for *count* events, the
+    day ordinals (u32), minutes past midnight (i16, -1 without a time), flags
+    (u8, bit 0 = sold out, bit 1 = removed), four u32 columns indexing the
+    title, venue, url and event id into a string table, and that table as
+    NUL-separated UTF-8. Version 1 had no removed events. Writes are
+    conditional like DateCache's, and skipped when no event changed.
+    """
+
+    MAGIC = b"CEV"
+    VERSION = 2
+    _HEADER = struct.Struct("<3sBII")
+    _STRING_COLUMNS = ("title", "venue", "url", "event_id")
+    _SOLD_OUT = 0x01
+    _REMOVED = 0x02
+    MAX_WRITE_ATTEMPTS = 5
+
+    def __init__(self, storage: Storage, key: str):
+        self._storage = storage
+        self._key = key
+        self._stored: bytes | None = None
+        self._version: str | None = None
+        self._index: EventIndex = self._load()
+
+    @classmethod
+    def pack(cls, entries: Iterable[tuple[Event, EventState]]) -> tuple[int, bytes]:
+        """Return the number of entries and their uncompressed columns."""
+        # One entry per key, the last one wins
+        by_key = {event.key: (event, state) for event, state in entries}
+        ordered = sorted(by_key.values(), key=lambda entry: entry[0].sort_key())
+        events = [event for event, _ in ordered]
+        strings: dict[str, int] = {}
+        columns: list[array] = [
+            array("I", (e.date.toordinal() for e in events)),
+            array(
+                "h",
+                (e.time.hour * 60 + e.time.minute if e.time else -1 for e in events),
+            ),
+            array(
+                "B",
+                (
+                    (cls._SOLD_OUT if event.sold_out else 0)
+                    | (cls._REMOVED if state is EventState.REMOVED else 0)
+                    for event, state in ordered
+                ),
+            ),
+        ]
+        for name in cls._STRING_COLUMNS:
+            columns.append(
+                array(
+                    "I",
+                    (
+                        strings.setdefault(
+                            getattr(e, name).replace("\0", ""), len(strings)
+                        )
+                        for e in events
+                    ),
+                )
+            )
+        if sys.byteorder == "big":
+            for column in columns:
+                column.byteswap()
+        body = b"".join(c.tobytes() for c in columns)
+        return len(events), body + "\0".join(strings).encode()
+
+    @classmethod
+    def unpack(cls, count: int, body: bytes) -> list[tuple[Event, EventState]]:
+        """Inverse of pack()."""
+        columns: list[array] = []
+        offset = 0
+        for typecode in ("I", "h", "B", *("I" for _ in cls._STRING_COLUMNS)):
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(body[offset : offset + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+            offset += size
+        strings = body[offset:].decode().split("\0")
+        ordinals, minutes, flags, titles, venues, urls, ids = columns
+        entries = []
+        for i in range(count):
+            event = Event(
+                date=dt.date.fromordinal(ordinals[i]),
+                time=dt.time(*divmod(minutes[i], 60)) if minutes[i] >= 0 else None,
+                title=strings[titles[i]],
+                venue=strings[venues[i]],
+                url=strings[urls[i]],
+                sold_out=bool(flags[i] & cls._SOLD_OUT),
+                event_id=strings[ids[i]],
+            )
+            removed = flags[i] & cls._REMOVED
+            entries.append(
+                (event, EventState.REMOVED if removed else EventState.of(event))
+            )
+        return entries
+
+    @classmethod
+    def encode(cls, entries: Iterable[tuple[Event, EventState]]) -> bytes:
+        count, body = cls.pack(entries)
+        payload = zlib.compress(body)
+        header = cls._HEADER.pack(cls.MAGIC, cls.VERSION, count, zlib.crc32(payload))
+        return header + payload
+
+    @classmethod
+    def decode(cls, raw: bytes) -> list[tuple[Event, EventState]]:
+        if len(raw) < cls._HEADER.size or not raw.startswith(cls.MAGIC):
+            raise CacheFormatError("Not an event cache")
+        _, version, count, checksum = cls._HEADER.unpack_from(raw)
+        if version not in (1, cls.VERSION):
+            raise CacheFormatError(f"Unsupported event cache version: {version}")
+        payload = raw[cls._HEADER.size :]
+        if zlib.crc32(payload) != checksum:
+            raise CacheFormatError("Event cache checksum mismatch")
+        return cls.unpack(count, zlib.decompress(payload))
+
+    def _load(self) -> EventIndex:
+        raw, self._version = self._storage.read_versioned(self._key)
+        if raw is None:
+            self._stored = self.encode([])
+            return EventIndex()
+        self._stored = raw
+        return EventIndex(self.decode(raw))
+
+    def reload(self) -> None:
+        """Re-read the events from storage."""
+        self._index = self._load()
+
+    @property
+    def index(self) -> EventIndex:
+        """Every event known, with its last state."""
+        return self._index
+
+    @property
+    def events(self) -> tuple[Event, ...]:
+        """The events still listed, ordered by date and time."""
+        return tuple(self._index.listed())
+
+    def diff(self, events: Iterable[Event]) -> EventChanges:
+        """Compare the cached events with the current *events*."""
+        changes, _ = self._index.diff(events)
+        return changes
+
+    def update(self, events: Iterable[Event]) -> EventChanges:
+        """
+        Record the listing *events* and persist the new states.
+
+        Returns the changes relative to what was stored. If another writer
+        updated the cache in the meantime, the changes are recomputed against
+        theirs, so overlapping runs report every change only once.
+        """
+        current = list(events)
+        for attempt in range(1, self.MAX_WRITE_ATTEMPTS):
+            try:
+                return self._save(current)
+            except WriteConflictError:
+                metrics.incr("cache_write_conflicts")
+                logger.info(
+                    f"Event cache changed concurrently, retrying (attempt {attempt})"
+                )
+                self.reload()
+        return self._save(current)
+
+    def _save(self, events: list[Event]) -> EventChanges:
+        changes, stale = self._index.diff(events)
+        if not stale:
+            return changes
+        # Removed events only matter while they could still come back
+        index = self._index.updated(events, prune_before=dt.date.today())
+        data = self.encode(index)
+        if data != self._stored:
+            self._version = self._storage.write_if_match(self._key, data, self._version)
+            self._stored = data
+        self._index = index
+        return changes
+
+
+# ---------------------------------------------------------------------------
+# HTTP validator cache
+# ---------------------------------------------------------------------------
+
+
+class ValidatorCache:
+    """Persists per-URL HTTP cache validators (ETag, Last-Modified, body hash).
+
+    New validators are only staged while a run is in progress and written back
+    by commit(), so a run that fails half way re-fetches the page next time.
+    """
+
+    def __init__(self, storage: Storage, key: str):
+        self._storage = storage
+        self._key = key
+        self._entries: dict[str, dict[str, str]] = self._load()
+        self._pending: dict[str, dict[str, str]] = {}
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        raw = self._storage.read(self._key)
+        if raw is None:
+            return {}
+        return json.loads(raw)
+
+    def request_headers(self, url: str) -> dict[str, str]:
+        """Return the conditional request headers for *url*."""
+        entry = self._entries.get(url, {})
+        headers: dict[str, str] = {}
+        if "etag" in entry:
+            headers["If-None-Match"] = entry["etag"]
+        if "last_modified" in entry:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def content_hash(self, url: str) -> str | None:
+        """Return the hash of the last committed body of *url*, if any."""
+        return self._entries.get(url, {}).get("content_hash")
+
+    def stage(
+        self,
+        url: str,
+        *,
+        etag: str | None,
+        last_modified: str | None,
+        content_hash: str,
+    ) -> None:
+        """Remember the validators of a fresh response until commit() is called."""
+        entry = {"content_hash": content_hash}
+        if etag:
+            entry["etag"] = etag
+        if last_modified:
+            entry["last_modified"] = last_modified
+        self._pending[url] = entry
+
+    def commit(self) -> None:
+        """Persist the staged validators; a no-op when nothing was staged."""
+        if not self._pending:
+            return
+        self._entries.update(self._pending)
+        self._pending.clear()
+        self._storage.write(self._key, json.dumps(self._entries).encode())
+
+
+class ParseCache:
+    """Maps fingerprints of listing pages to the dates parsed from them.
+
+    Pages whose event list has not materially changed get the same
+    fingerprint (see src.scraper.event_list_fingerprint), so they don't have to
+    be parsed again even when the server ignores conditional requests. At most
+    *max_entries* results are kept; the least recently used are evicted first.
+    """
+
+    def __init__(self, storage: Storage, key: str, max_entries: int = 16):
+        self._storage = storage
+        self._key = key
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list[int]] = self._load()
+        self._dirty = False
+        # Pages of a crawl are parsed in worker threads
+        self._lock = threading.Lock()
+
+    def _load(self) -> OrderedDict[str, list[int]]:
+        raw = self._storage.read(self._key)
+        if raw is None:
+            return OrderedDict()
+        return OrderedDict(json.loads(raw))
+
+    def get(self, fingerprint: str) -> list[dt.date] | None:
+        """Return the dates parsed from a page with *fingerprint*, if known."""
+        with self._lock:
+            ordinals = self._entries.get(fingerprint)
+            if ordinals is None:
+                return None
+            if next(reversed(self._entries)) != fingerprint:
+                # Only persisted when the order changes, a repeated hit is free
+                self._entries.move_to_end(fingerprint)
+                self._dirty = True
+        return [dt.date.fromordinal(o) for o in ordinals]
+
+    def put(self, fingerprint: str, dates: Iterable[dt.date]) -> None:
+        with self._lock:
+            self._entries[fingerprint] = [d.toordinal() for d in dates]
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self) -> None:
+        """Persist the cache; a no-op when nothing changed since it was loaded."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(list(self._entries.items())).encode()
+            self._dirty = False
+        self._storage.write(self._key, data)
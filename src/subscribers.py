@@ -0,0 +1,395 @@
+import datetime as dt
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, override
+
+import requests
+
+from src.events import Event, EventChanges
+from src.notifications import (
+    TELEGRAM_API_URL,
+    NotificationError,
+    NotificationService,
+    TelegramNotificationService,
+    batch_dates,
+    format_available,
+    format_changes,
+    format_message,
+)
+from src.storage import Storage
+
+logger = logging.getLogger()
+
+
+@dataclass(frozen=True)
+class Subscriber:
+    """A Telegram chat and the dates it wants to hear about.
+
+    *weekdays* uses date.weekday() numbering (Monday is 0); None means every
+    day. *start* and *end* bound the dates, both inclusive, when set.
+    """
+
+    chat_id: str
+    weekdays: frozenset[int] | None = None
+    start: dt.date | None = None
+    end: dt.date | None = None
+
+    def wants(self, date: dt.date) -> bool:
+        if self.weekdays is not None and date.weekday() not in self.weekdays:
+            return False
+        if self.start is not None and date < self.start:
+            return False
+        return self.end is None or date <= self.end
+
+    def select(self, dates: Iterable[dt.date]) -> list[dt.date]:
+        return [date for date in dates if self.wants(date)]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "chat_id": self.chat_id,
+            "weekdays": sorted(self.weekdays) if self.weekdays is not None else None,
+            "start": self.start.isoformat() if self.start else None,
+            "end": self.end.isoformat() if self.end else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Subscriber":
+        weekdays = data.get("weekdays")
+        start, end = data.get("start"), data.get("end")
+        return cls(
+            chat_id=str(data["chat_id"]),
+            weekdays=frozenset(weekdays) if weekdays is not None else None,
+            start=dt.date.fromisoformat(start) if start else None,
+            end=dt.date.fromisoformat(end) if end else None,
+        )
+
+
+class SubscriberRegistry:
+    """Persists the subscribers, keyed by chat id, via a Storage backend."""
+
+    def __init__(self, storage: Storage, key: str):
+        self._storage = storage
+        self._key = key
+        self._subscribers: dict[str, Subscriber] = self._load()
+
+    def _load(self) -> dict[str, Subscriber]:
+        raw = self._storage.read(self._key)
+        if raw is None:
+            return {}
+        subscribers = (Subscriber.from_dict(item) for item in json.loads(raw))
+        return {s.chat_id: s for s in subscribers}
+
+    @property
+    def subscribers(self) -> list[Subscriber]:
+        return list(self._subscribers.values())
+
+    def add(self, subscriber: Subscriber) -> None:
+        """Add *subscriber*, replacing an existing one with the same chat id."""
+        self._subscribers[subscriber.chat_id] = subscriber
+
+    def remove(self, chat_id: str) -> None:
+        self._subscribers.pop(chat_id, None)
+
+    def save(self) -> None:
+        data = [s.to_dict() for s in self._subscribers.values()]
+        self._storage.write(self._key, json.dumps(data).encode())
+
+
+@dataclass
+class DeliveryResult:
+    """What happened when notifying one subscriber."""
+
+    chat_id: str
+    # Dates that reached the chat; empty if none matched its filters
+    delivered: list[dt.date] = field(default_factory=list)
+    # Why (the rest of) the dates could not be delivered, and whether and
+    # when that is worth retrying, as told by the NotificationError
+    error: str | None = None
+    retryable: bool = True
+    retry_after: float | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class DeliveryProgress:
+    """Which subscribers already got the dates that are still being announced.
+
+    A send that only reached some subscribers is retried, and this keeps the
+    retry from notifying the others twice. Persisted as JSON via a Storage
+    backend, or only kept in memory without one.
+    """
+
+    def __init__(self, storage: Storage | None = None, key: str = ""):
+        self._storage = storage
+        self._key = key
+        self._delivered: dict[str, set[dt.date]] = self._load()
+
+    def _load(self) -> dict[str, set[dt.date]]:
+        raw = self._storage.read(self._key) if self._storage is not None else None
+        if raw is None:
+            return {}
+        return {
+            chat_id: {dt.date.fromisoformat(d) for d in dates}
+            for chat_id, dates in json.loads(raw).items()
+        }
+
+    def reload(self) -> None:
+        if self._storage is not None:
+            self._delivered = self._load()
+
+    def pending(self, chat_id: str, dates: Iterable[dt.date]) -> list[dt.date]:
+        """Return the *dates* that the chat *chat_id* has not been sent yet."""
+        delivered = self._delivered.get(chat_id, set())
+        return [date for date in dates if date not in delivered]
+
+    def record(self, results: Iterable[DeliveryResult]) -> None:
+        for result in results:
+            if result.delivered:
+                self._delivered.setdefault(result.chat_id, set()).update(
+                    result.delivered
+                )
+        self._save()
+
+    def forget(self, dates: Iterable[dt.date]) -> None:
+        """Drop *dates* once every subscriber has them, or nobody will get them."""
+        done = set(dates)
+        changed = False
+        for chat_id, delivered in list(self._delivered.items()):
+            if delivered & done:
+                changed = True
+                delivered -= done
+                if not delivered:
+                    del self._delivered[chat_id]
+        if changed:
+            self._save()
+
+    def _save(self) -> None:
+        if self._storage is None:
+            return
+        data = {
+            chat_id: sorted(d.isoformat() for d in dates)
+            for chat_id, dates in self._delivered.items()
+        }
+        self._storage.write(self._key, json.dumps(data).encode())
+
+
+class MessageRateLimiter:
+    """Spaces out messages to at most *messages_per_second*, across threads.
+
+    Unlike src.fetcher.HostRateLimiter it is not bound to an event loop, so
+    senders running in different threads (e.g. concurrent trackers) can share
+    one budget.
+    """
+
+    def __init__(self, messages_per_second: float):
+        self._interval = 1 / messages_per_second
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next free slot and return the seconds to wait until it."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._interval
+        return start - now
+
+
+class FanOutNotificationService(NotificationService):
+    """Sends each subscriber the dates that match its filters, concurrently.
+
+    Up to *max_concurrency* requests are in flight over the shared *session*,
+    and a global limiter keeps the bot under *messages_per_second* (Telegram
+    allows about 30). A message that is rate limited or fails is retried up
+    to *max_attempts* times, after the delay Telegram asks for or with
+    exponential backoff from *backoff* seconds. Services that share a
+    *rate_limiter* also share its budget. The outcome for every recipient of
+    the last send is kept in ``last_results``, and *progress* remembers who
+    got the dates of a send that has to be retried.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        subscribers: Iterable[Subscriber],
+        *,
+        session: requests.Session | None = None,
+        messages_per_second: float = 25.0,
+        max_concurrency: int = 16,
+        max_attempts: int = 3,
+        backoff: float = 1.0,
+        max_delay: float = 30.0,
+        rate_limiter: MessageRateLimiter | None = None,
+        api_url: str = TELEGRAM_API_URL,
+        progress: DeliveryProgress | None = None,
+    ):
+        self.token = token
+        self.api_url = api_url
+        self.subscribers = list(subscribers)
+        self.session = session
+        self.messages_per_second = messages_per_second
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.rate_limiter = rate_limiter
+        self.progress = progress or DeliveryProgress()
+        self.last_results: list[DeliveryResult] = []
+
+    @override
+    def send_notification(self, dates: list[dt.date]) -> None:
+        try:
+            self.deliver(dates)
+        except NotificationError as e:
+            logger.error(f"Failed to notify subscribers: {e}")
+
+    @override
+    def deliver(self, dates: list[dt.date]) -> None:
+        """
+        Notify all subscribers of *dates*.
+
+        Raises NotificationError unless every subscriber was reached. It is
+        only retryable if some subscriber's failure was, and the subscribers
+        that did get the dates are skipped when the send is retried.
+        """
+        import asyncio  # kept off the cold path, like the rest of the fetch stack
+
+        self.progress.reload()
+        self.last_results = asyncio.run(self.deliver_async(dates))
+        failed = [r for r in self.last_results if not r.ok]
+        if not failed:
+            self.progress.forget(dates)
+            return
+        logger.error(
+            f"Could not notify {len(failed)} of {len(self.last_results)} subscribers: "
+            f"{', '.join(r.chat_id for r in failed)}"
+        )
+        retryable = any(r.retryable for r in failed)
+        if retryable:
+            self.progress.record(self.last_results)
+        else:
+            self.progress.forget(dates)
+        raise NotificationError(
+            failed[0].error or "No subscriber reached",
+            retry_after=max(
+                (r.retry_after for r in failed if r.retryable and r.retry_after),
+                default=None,
+            ),
+            retryable=retryable,
+        )
+
+    @override
+    def send_changes(self, changes: EventChanges) -> None:
+        """Send every subscriber a report of the changes on the dates it wants."""
+        self._send_report(
+            lambda subscriber: format_changes(changes.select(subscriber.wants)),
+            "the change report",
+        )
+
+    @override
+    def send_available(self, events: list[Event]) -> bool:
+        """
+        Alert every subscriber to the events on its dates that have tickets again.
+
+        Only reports success if every subscriber got it, since the dates are
+        announced to all of them otherwise.
+        """
+        return self._send_report(
+            lambda subscriber: format_available(
+                [event for event in events if subscriber.wants(event.date)]
+            ),
+            "the availability alert",
+        )
+
+    def _send_report(
+        self, render: Callable[[Subscriber], list[str]], description: str
+    ) -> bool:
+        """Send every subscriber its messages; return whether all of them got them."""
+        import asyncio
+
+        self.last_results = asyncio.run(
+            self._fan_out(
+                lambda subscriber: [(text, []) for text in render(subscriber)]
+            )
+        )
+        failed = [r for r in self.last_results if not r.ok]
+        if failed:
+            logger.error(
+                f"Could not send {description} to {len(failed)} subscribers: "
+                f"{', '.join(r.chat_id for r in failed)}"
+            )
+        return not failed
+
+    async def deliver_async(self, dates: list[dt.date]) -> list[DeliveryResult]:
+        return await self._fan_out(
+            lambda subscriber: [
+                (format_message(batch), batch)
+                for batch in batch_dates(
+                    self.progress.pending(subscriber.chat_id, subscriber.select(dates))
+                )
+            ]
+        )
+
+    async def _fan_out(
+        self, messages: Callable[[Subscriber], list[tuple[str, list[dt.date]]]]
+    ) -> list[DeliveryResult]:
+        """Send each subscriber its *messages*, given as (text, dates covered) pairs."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = self.rate_limiter or MessageRateLimiter(self.messages_per_second)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+
+            async def send(notifier: TelegramNotificationService, text: str) -> None:
+                for attempt in range(1, self.max_attempts + 1):
+                    async with semaphore:
+                        await asyncio.sleep(limiter.reserve())
+                        try:
+                            await loop.run_in_executor(
+                                executor, notifier.send_text, text
+                            )
+                            return
+                        except NotificationError as e:
+                            delay = e.retry_after
+                            if delay is None:
+                                delay = self.backoff * 2 ** (attempt - 1)
+                            if (
+                                not e.retryable
+                                or attempt == self.max_attempts
+                                or delay > self.max_delay
+                            ):
+                                raise
+                    await asyncio.sleep(delay)
+
+            async def notify(subscriber: Subscriber) -> DeliveryResult:
+                result = DeliveryResult(subscriber.chat_id)
+                notifier = TelegramNotificationService(
+                    self.token,
+                    subscriber.chat_id,
+                    session=self.session,
+                    api_url=self.api_url,
+                )
+                for text, dates in messages(subscriber):
+                    try:
+                        await send(notifier, text)
+                    except NotificationError as e:
+                        result.error = str(e)
+                        result.retryable = e.retryable
+                        result.retry_after = e.retry_after
+                        break
+                    result.delivered.extend(dates)
+                return result
+
+            results = await asyncio.gather(*(notify(s) for s in self.subscribers))
+        delivered = sum(1 for r in results if r.delivered)
+        logger.info(f"Notified {delivered} of {len(results)} subscribers")
+        return results
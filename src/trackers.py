@@ -0,0 +1,202 @@
+import datetime as dt
+import json
+import logging
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, replace
+from typing import Any
+
+import requests
+
+from src import metrics
+from src.config import Settings
+from src.notifications import NotificationService, TelegramNotificationService
+from src.service import ConcertTrackerService, RunStatus
+from src.storage import Storage
+from src.subscribers import (
+    DeliveryProgress,
+    FanOutNotificationService,
+    MessageRateLimiter,
+    Subscriber,
+)
+
+logger = logging.getLogger()
+
+
+@dataclass(frozen=True)
+class TrackerSpec:
+    """One listing (or series of listings) to track and who to tell about it.
+
+    Each tracker keeps its state under ``trackers/<name>/`` in the shared
+    storage. *recipients* are Telegram chat ids, defaulting to the admin chat;
+    *weekdays*, *start* and *end* filter the dates they are sent, like the
+    fields of a Subscriber.
+    """
+
+    name: str
+    urls: tuple[str, ...]
+    recipients: tuple[str, ...] = ()
+    weekdays: frozenset[int] | None = None
+    start: dt.date | None = None
+    end: dt.date | None = None
+
+    def __post_init__(self) -> None:
+        if not self.name or "/" in self.name:
+            raise ValueError(f"Invalid tracker name: {self.name!r}")
+        if not self.urls:
+            raise ValueError(f"Tracker {self.name} has no URL")
+
+    @property
+    def key_prefix(self) -> str:
+        return f"trackers/{self.name}/"
+
+    def settings(self, base: Settings) -> Settings:
+        """Return *base* pointed at this tracker's pages and storage keys."""
+        prefix = self.key_prefix
+        return replace(
+            base,
+            url=self.urls[0],
+            urls=list(self.urls),
+            storage_file=prefix + "dates.bin",
+            validators_file=prefix + "validators.json",
+            outbox_file=prefix + "outbox.bin",
+            subscriber_progress_file=prefix + "subscriber_progress.json",
+            events_file=prefix + "events.bin",
+            parse_cache_file=prefix + "parse_cache.json",
+            archive_prefix=prefix + "archive/" if base.archive_prefix else "",
+        )
+
+    def subscribers(self, default_chat_id: str) -> list[Subscriber]:
+        return [
+            Subscriber(chat_id, self.weekdays, self.start, self.end)
+            for chat_id in self.recipients or (default_chat_id,)
+        ]
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TrackerSpec":
+        urls = data.get("urls") or [data["url"]]
+        # Filters are stored like a Subscriber's
+        filters = Subscriber.from_dict({"chat_id": "", **data})
+        return cls(
+            name=data["name"],
+            urls=tuple(urls),
+            recipients=tuple(str(r) for r in data.get("recipients", [])),
+            weekdays=filters.weekdays,
+            start=filters.start,
+            end=filters.end,
+        )
+
+
+def load_tracker_specs(storage: Storage, key: str) -> list[TrackerSpec]:
+    """Read the tracker list stored at *key*; empty when there is none."""
+    raw = storage.read(key)
+    if raw is None:
+        return []
+    specs = [TrackerSpec.from_dict(item) for item in json.loads(raw)]
+    names = [spec.name for spec in specs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate tracker names: {', '.join(duplicates)}")
+    return specs
+
+
+# The most telling status of any tracker wins, e.g. for src.daemon's scheduler.
+_STATUS_PRIORITY = (
+    RunStatus.NEW_DATES,
+    RunStatus.FORCED,
+    RunStatus.NO_NEW_DATES,
+    RunStatus.UNCHANGED,
+    RunStatus.FAILED,
+)
+
+
+class MultiTrackerService:
+    """Runs several trackers concurrently, isolating their failures.
+
+    Each tracker is a ConcertTrackerService built on first use by its factory,
+    in the worker thread that runs it, and kept for later runs. A tracker that
+    fails to build or run is logged and reported as FAILED; the others are
+    unaffected. Per-tracker outcomes of the last run are in ``last_results``.
+    """
+
+    def __init__(
+        self,
+        factories: dict[str, Callable[[], ConcertTrackerService]],
+        max_concurrency: int = 4,
+    ):
+        self.factories = factories
+        self.max_concurrency = max_concurrency
+        self.services: dict[str, ConcertTrackerService] = {}
+        self.last_results: dict[str, RunStatus] = {}
+
+    def _run_one(self, name: str, force: bool | str) -> RunStatus:
+        try:
+            service = self.services.get(name)
+            if service is None:
+                service = self.services[name] = self.factories[name]()
+            return service.run(force=force)
+        except Exception as e:
+            logger.exception(f"Tracker {name} failed: {e}")
+            metrics.incr("tracker_errors")
+            return RunStatus.FAILED
+
+    def run(self, force: bool | str = False) -> RunStatus:
+        workers = max(1, min(self.max_concurrency, len(self.factories)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each tracker records into the metrics of the current run
+            futures = {
+                name: executor.submit(copy_context().run, self._run_one, name, force)
+                for name in self.factories
+            }
+        self.last_results = {name: f.result() for name, f in futures.items()}
+        logger.info(f"Tracker results: {self.last_results}")
+        return min(
+            self.last_results.values(),
+            key=_STATUS_PRIORITY.index,
+            default=RunStatus.FAILED,
+        )
+
+
+def create_multi_tracker_service(
+    config: Settings,
+    specs: Iterable[TrackerSpec],
+    storage: Storage,
+    session: requests.Session | None = None,
+) -> MultiTrackerService:
+    """Build a tracker per spec, all sharing *storage*, *session* and the bot's rate limit."""
+    admin_notification_service = TelegramNotificationService(
+        config.telegram_token,
+        config.telegram_chat_id,
+        session=session,
+        api_url=config.telegram_api_url,
+    )
+    rate_limiter = MessageRateLimiter(config.notify_rate)
+
+    def factory(spec: TrackerSpec) -> Callable[[], ConcertTrackerService]:
+        def build() -> ConcertTrackerService:
+            settings = spec.settings(config)
+            notifier: NotificationService = FanOutNotificationService(
+                config.telegram_token,
+                spec.subscribers(config.telegram_chat_id),
+                session=session,
+                messages_per_second=config.notify_rate,
+                max_concurrency=config.fetch_concurrency,
+                api_url=config.telegram_api_url,
+                rate_limiter=rate_limiter,
+                progress=DeliveryProgress(storage, settings.subscriber_progress_file),
+            )
+            return ConcertTrackerService(
+                settings,
+                storage,
+                notifier,
+                session=session,
+                admin_notification_service=admin_notification_service,
+            )
+
+        return build
+
+    return MultiTrackerService(
+        {spec.name: factory(spec) for spec in specs},
+        max_concurrency=config.tracker_concurrency,
+    )
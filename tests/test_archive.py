@@ -0,0 +1,133 @@
+import datetime as dt
+from dataclasses import replace
+
+import pytest
+
+from src.archive import SnapshotArchive
+from src.events import Event, EventState
+from src.storage import CacheFormatError, InMemoryStorage
+
+START = dt.datetime(2025, 3, 1, 10, 0, tzinfo=dt.UTC)
+MINUTE = dt.timedelta(minutes=1)
+
+CONCERT = Event(dt.date(2025, 4, 1), dt.time(10), "Cocoa", "Hall", event_id="1")
+OTHER = Event(dt.date(2025, 4, 8), dt.time(10), "Cocoa", "Hall", event_id="2")
+
+
+def _segments(storage):
+    return [key for key in storage._objects if "/segments/" in key]
+
+
+@pytest.fixture
+def storage():
+    return InMemoryStorage()
+
+
+def test_identical_snapshots_extend_the_previous_one(storage):
+    archive = SnapshotArchive(storage)
+
+    assert archive.record([CONCERT], START)
+    for minute in range(1, 60):
+        assert not archive.record([CONCERT], START + minute * MINUTE)
+    archive.touch(START + 60 * MINUTE)
+
+    (snapshot,) = SnapshotArchive(storage).snapshots()
+    assert snapshot.first_seen == START
+    assert snapshot.last_seen == START + 60 * MINUTE
+    assert snapshot.events == (CONCERT,)
+    assert len(_segments(storage)) == 1
+
+
+def test_repeated_content_is_stored_once(storage):
+    archive = SnapshotArchive(storage)
+
+    archive.record([CONCERT], START)
+    archive.record([CONCERT, OTHER], START + MINUTE)
+    archive.record([CONCERT], START + 2 * MINUTE)
+
+    assert len(archive) == 3
+    assert len(_segments(storage)) == 2
+
+
+def test_time_range_queries(storage):
+    archive = SnapshotArchive(storage)
+    for i in range(10):
+        archive.record([Event(dt.date(2025, 4, 1 + i))], START + i * MINUTE)
+
+    found = list(archive.snapshots(START + 3 * MINUTE, START + 5 * MINUTE))
+
+    assert [s.dates for s in found] == [[dt.date(2025, 4, 1 + i)] for i in (3, 4, 5)]
+    assert archive.at(START + MINUTE + dt.timedelta(seconds=30)).dates == [
+        dt.date(2025, 4, 2)
+    ]
+    assert archive.at(START - MINUTE) is None
+
+
+def test_timeline_answers_when_an_event_appeared_and_sold_out(storage):
+    archive = SnapshotArchive(storage)
+    sold_out = replace(CONCERT, sold_out=True)
+    listings = [[OTHER], [OTHER, CONCERT], [OTHER, sold_out], [OTHER]]
+    for i, listing in enumerate(listings):
+        archive.record(listing, START + i * MINUTE)
+
+    assert archive.timeline(CONCERT.key) == [
+        (START + MINUTE, EventState.AVAILABLE),
+        (START + 2 * MINUTE, EventState.SOLD_OUT),
+        (START + 3 * MINUTE, EventState.REMOVED),
+    ]
+
+
+def test_compaction_merges_old_segments(storage):
+    archive = SnapshotArchive(storage)
+    for i in range(20):
+        archive.record([CONCERT, Event(dt.date(2025, 5, 1 + i))], START + i * MINUTE)
+    before = [s.events for s in archive.snapshots()]
+
+    merged = archive.compact(before=START + 15 * MINUTE)
+
+    assert merged == 15
+    # One merged segment for the old snapshots, the recent ones untouched
+    assert len(_segments(storage)) == 6
+    reloaded = SnapshotArchive(storage)
+    assert [s.events for s in reloaded.snapshots()] == before
+    assert reloaded.compact(before=START + 15 * MINUTE) == 0
+
+
+def test_compaction_keeps_segments_rewritten_under_the_same_name(storage):
+    archive = SnapshotArchive(storage)
+    archive.record([CONCERT], START)
+    archive.record([OTHER], START + MINUTE)
+    # Too small for both contents, so each batch holds one and keeps its name
+    segment_size = max(e.length for e in archive._entries) + 1
+
+    assert archive.compact(before=START + 10 * MINUTE, segment_size=segment_size) == 0
+
+    assert len(_segments(storage)) == 2
+    assert [s.events for s in SnapshotArchive(storage).snapshots()] == [
+        (CONCERT,),
+        (OTHER,),
+    ]
+
+
+def test_concurrent_writers_both_land(storage):
+    first = SnapshotArchive(storage)
+    second = SnapshotArchive(storage)
+
+    first.record([CONCERT], START)
+    second.record([OTHER], START + MINUTE)
+
+    assert [s.events for s in SnapshotArchive(storage).snapshots()] == [
+        (CONCERT,),
+        (OTHER,),
+    ]
+
+
+def test_rejects_corrupt_index(storage):
+    archive = SnapshotArchive(storage)
+    archive.record([CONCERT], START)
+    data = bytearray(storage.read("archive/index.bin"))
+    data[-1] ^= 0xFF
+    storage.write("archive/index.bin", bytes(data))
+
+    with pytest.raises(CacheFormatError, match="checksum"):
+        SnapshotArchive(storage)
@@ -0,0 +1,211 @@
+import datetime as dt
+import gzip
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.backfill import backfill, iter_pages, main
+from src.storage import DateCache, InMemoryStorage, LocalStorage
+
+SAMPLE_PAGE = (Path(__file__).parent / "assets" / "sample_page.html").read_bytes()
+SAMPLE_DATE = dt.date(2025, 10, 11)
+
+
+def _page(*dates: dt.date) -> bytes:
+    articles = "".join(
+        f'<article class="event"><div class="day">{d.day}</div>'
+        f'<div class="month">{d:%B}</div><div class="year">{d.year}</div>'
+        '<div class="event__fn"><a>Buy tickets</a></div></article>'
+        for d in dates
+    )
+    return f"<html><body><div>{articles}</div></body></html>".encode()
+
+
+def _warc_record(warc_type: str, uri: str, http: bytes) -> bytes:
+    headers = (
+        f"WARC/1.0\r\nWARC-Type: {warc_type}\r\nWARC-Target-URI: {uri}\r\n"
+        f"Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(http)}\r\n\r\n"
+    )
+    return headers.encode() + http + b"\r\n\r\n"
+
+
+def _http(status: str, body: bytes, **headers: str) -> bytes:
+    lines = [f"HTTP/1.1 {status}", "Content-Type: text/html; charset=utf-8"]
+    lines += [f"{name.replace('_', '-')}: {value}" for name, value in headers.items()]
+    return "\r\n".join(lines).encode() + b"\r\n\r\n" + body
+
+
+@pytest.fixture
+def sources(tmp_path):
+    pages = tmp_path / "pages"
+    (pages / "older").mkdir(parents=True)
+    (pages / "index.html").write_bytes(SAMPLE_PAGE)
+    (pages / "older" / "index.html").write_bytes(_page(dt.date(2024, 3, 2)))
+    (pages / ".hidden").write_bytes(_page(dt.date(2000, 1, 1)))
+
+    with zipfile.ZipFile(tmp_path / "pages.zip", "w") as archive:
+        archive.writestr("a/index.html", _page(dt.date(2024, 4, 6)))
+
+    tar_page = _page(dt.date(2024, 5, 4))
+    with tarfile.open(tmp_path / "pages.tar.gz", "w:gz") as archive:
+        info = tarfile.TarInfo("b/index.html")
+        info.size = len(tar_page)
+        archive.addfile(info, io.BytesIO(tar_page))
+
+    chunked = _page(dt.date(2024, 6, 1))
+    chunked = b"%x\r\n%s\r\n0\r\n\r\n" % (len(chunked), chunked)
+    with gzip.open(tmp_path / "crawl.warc.gz", "wb") as warc:
+        warc.write(_warc_record("request", "https://bfz.hu/", b"GET / HTTP/1.1"))
+        warc.write(
+            _warc_record("response", "https://bfz.hu/1", _http("200 OK", SAMPLE_PAGE))
+        )
+        warc.write(
+            _warc_record(
+                "response",
+                "https://bfz.hu/2",
+                _http("200 OK", chunked, Transfer_Encoding="chunked"),
+            )
+        )
+        warc.write(
+            _warc_record(
+                "response",
+                "https://bfz.hu/3",
+                _http(
+                    "200 OK",
+                    gzip.compress(_page(dt.date(2024, 7, 6))),
+                    Content_Encoding="gzip",
+                ),
+            )
+        )
+        warc.write(
+            _warc_record(
+                "response",
+                "https://bfz.hu/4",
+                _http("404 Not Found", _page(dt.date(2000, 1, 1))),
+            )
+        )
+    return [
+        str(tmp_path / name)
+        for name in ("pages", "pages.zip", "pages.tar.gz", "crawl.warc.gz")
+    ]
+
+
+def test_iter_pages_reads_every_kind_of_source(sources):
+    names = [name for name, _ in iter_pages(sources)]
+
+    assert names == [
+        f"{sources[0]}/index.html",
+        f"{sources[0]}/older/index.html",
+        f"{sources[1]}:a/index.html",
+        f"{sources[2]}:b/index.html",
+        "https://bfz.hu/1",
+        "https://bfz.hu/2",
+        "https://bfz.hu/3",
+    ]
+
+
+def test_backfill_merges_into_the_cache_in_one_write(sources):
+    storage = InMemoryStorage()
+    DateCache(storage, "dates.bin").update([dt.date(2023, 1, 1)])
+    writes = storage._writes
+
+    stats = backfill(sources, storage, "dates.bin", batch_size=2)
+
+    assert storage._writes == writes + 1
+    assert DateCache(storage, "dates.bin").dates == [
+        dt.date(2023, 1, 1),
+        dt.date(2024, 3, 2),
+        dt.date(2024, 4, 6),
+        dt.date(2024, 5, 4),
+        dt.date(2024, 6, 1),
+        dt.date(2024, 7, 6),
+        SAMPLE_DATE,
+    ]
+    assert (stats.pages, stats.dates, stats.added) == (7, 6, 6)
+    assert stats.bytes > 0
+
+
+def test_backfill_replace_overwrites_an_unreadable_cache(tmp_path):
+    (tmp_path / "page.html").write_bytes(SAMPLE_PAGE)
+    storage = InMemoryStorage()
+    storage.write("dates.bin", b"CDC\xff garbage")
+
+    backfill([str(tmp_path)], storage, "dates.bin", replace=True)
+
+    assert DateCache(storage, "dates.bin").dates == [SAMPLE_DATE]
+
+
+def test_main_backfills_local_storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "token")
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "chat")
+    monkeypatch.setenv("BUCKET", "bucket")
+    (tmp_path / "page.html").write_bytes(SAMPLE_PAGE)
+
+    main(
+        [
+            "--storage-dir",
+            str(tmp_path / "state"),
+            "--key",
+            "cache.bin",
+            str(tmp_path / "page.html"),
+        ]
+    )
+
+    assert DateCache(LocalStorage(str(tmp_path / "state")), "cache.bin").dates == [
+        SAMPLE_DATE
+    ]
+
+
+def test_malformed_warc_records_are_skipped(tmp_path, caplog):
+    good = _warc_record("response", "https://bfz.hu/ok", _http("200 OK", SAMPLE_PAGE))
+    bad_chunks = _http("200 OK", b"zz\r\n<html>", Transfer_Encoding="chunked")
+    bad_gzip = _http("200 OK", gzip.compress(SAMPLE_PAGE)[:20], Content_Encoding="gzip")
+    truncated = _warc_record(
+        "response", "https://bfz.hu/cut", _http("200 OK", SAMPLE_PAGE)
+    )
+    with gzip.open(tmp_path / "crawl.warc.gz", "wb") as warc:
+        warc.write(_warc_record("response", "https://bfz.hu/chunks", bad_chunks))
+        warc.write(_warc_record("response", "https://bfz.hu/gzip", bad_gzip))
+        warc.write(good)
+        warc.write(truncated[: len(truncated) // 2])
+    storage = InMemoryStorage()
+
+    stats = backfill([str(tmp_path)], storage, "dates.bin")
+
+    assert stats.pages == 1
+    assert DateCache(storage, "dates.bin").dates == [SAMPLE_DATE]
+    assert "https://bfz.hu/chunks" in caplog.text
+    assert "https://bfz.hu/gzip" in caplog.text
+    assert "Truncated WARC record" in caplog.text
+
+
+def test_damaged_archives_are_skipped(tmp_path, caplog):
+    (tmp_path / "a-broken.zip").write_bytes(b"PK\x03\x04 not a zip")
+    with zipfile.ZipFile(tmp_path / "b-damaged.zip", "w") as archive:
+        archive.writestr("bad.html", _page(dt.date(2000, 1, 1)))
+        archive.writestr("good.html", _page(dt.date(2024, 3, 2)))
+    damaged = (tmp_path / "b-damaged.zip").read_bytes()
+    # Breaks the CRC of the first member only
+    damaged = damaged.replace(b"2000</div>", b"2001</div>", 1)
+    (tmp_path / "b-damaged.zip").write_bytes(damaged)
+    page = _page(dt.date(2000, 1, 1))
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        info = tarfile.TarInfo("c/index.html")
+        info.size = len(page)
+        archive.addfile(info, io.BytesIO(page))
+    (tmp_path / "c-truncated.tar.gz").write_bytes(buffer.getvalue()[:40])
+    (tmp_path / "d.html").write_bytes(SAMPLE_PAGE)
+    storage = InMemoryStorage()
+
+    stats = backfill([str(tmp_path)], storage, "dates.bin")
+
+    assert stats.pages == 2
+    assert DateCache(storage, "dates.bin").dates == [dt.date(2024, 3, 2), SAMPLE_DATE]
+    assert "a-broken.zip" in caplog.text
+    assert "bad.html" in caplog.text
+    assert "c-truncated.tar.gz" in caplog.text
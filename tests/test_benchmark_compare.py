@@ -0,0 +1,45 @@
+import json
+
+from benchmarks.compare import main
+
+
+def _write_results(path, benchmarks):
+    path.write_text(
+        json.dumps(
+            {
+                "benchmarks": [
+                    {
+                        "fullname": name,
+                        "stats": {"mean": mean},
+                        "extra_info": {"peak_memory_bytes": memory},
+                    }
+                    for name, (mean, memory) in benchmarks.items()
+                ]
+            }
+        )
+    )
+    return str(path)
+
+
+def test_compare_passes_within_tolerance(tmp_path, capsys):
+    baseline = _write_results(tmp_path / "a.json", {"parse": (1.0, 1000)})
+    current = _write_results(
+        tmp_path / "b.json", {"parse": (1.1, 1050), "new": (1.0, 1)}
+    )
+
+    assert main([baseline, current]) == 0
+    assert "parse" in capsys.readouterr().out
+
+
+def test_compare_fails_on_time_or_memory_regression(tmp_path, capsys):
+    baseline = _write_results(
+        tmp_path / "a.json", {"slow": (1.0, 1000), "big": (1.0, 1000)}
+    )
+    current = _write_results(
+        tmp_path / "b.json", {"slow": (1.5, 1000), "big": (1.0, 2000)}
+    )
+
+    assert main([baseline, current, "--time-tolerance", "0.2"]) == 1
+    err = capsys.readouterr().err
+    assert "slow: mean time x1.50" in err
+    assert "big: peak memory x2.00" in err
@@ -22,3 +22,24 @@ def test_get_config_from_env(monkeypatch):
     assert config.telegram_token == "test-token"
     assert config.telegram_chat_id == "test-chat-id"
     assert config.bucket == "test-bucket"
+
+
+def test_get_config_urls_default_to_url(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "test-token")
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "test-chat-id")
+    monkeypatch.setenv("BUCKET", "test-bucket")
+    monkeypatch.setenv("URL", "https://example.com/a")
+    monkeypatch.delenv("URLS", raising=False)
+
+    config = get_config(env_file=None)
+    assert config.urls == ["https://example.com/a"]
+
+
+def test_get_config_multiple_urls(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "test-token")
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "test-chat-id")
+    monkeypatch.setenv("BUCKET", "test-bucket")
+    monkeypatch.setenv("URLS", "https://example.com/a, https://example.com/b")
+
+    config = get_config(env_file=None)
+    assert config.urls == ["https://example.com/a", "https://example.com/b"]
@@ -0,0 +1,168 @@
+import datetime as dt
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from src.crawler import crawl_concert_dates, find_next_page_url
+from src.scraper import FetchError
+
+BASE = "https://example.com/concerts/"
+
+
+def _page(day: int, month: str = "March", next_href: str | None = None) -> str:
+    nav = (
+        f'<a class="pagination__next" href="{next_href}">Next</a>' if next_href else ""
+    )
+    return f"""
+    <html><body><div class="list"><article class="event">
+        <div class="day">{day}</div><div class="month">{month}</div><div class="year">2025</div>
+        <div class="event__fn"><a>Buy tickets</a></div>
+    </article></div>{nav}</body></html>
+    """
+
+
+class FakeSession:
+    """Serves pages from a dict and records the order in which they were requested.
+
+    A page of None fails with a server error.
+    """
+
+    def __init__(self, pages: dict[str, str | None]):
+        self.pages = pages
+        self.requested: list[str] = []
+        self.fetched = {url: threading.Event() for url in pages}
+
+    def get(self, url, timeout):
+        self.requested.append(url)
+        self.fetched[url].set()
+        response = MagicMock()
+        if self.pages[url] is None:
+            response.raise_for_status.side_effect = requests.HTTPError("500")
+        response.text = self.pages[url]
+        return response
+
+
+# ---------------------------------------------------------------------------
+# find_next_page_url
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "markup",
+    [
+        '<link rel="next" href="?page=2">',
+        '<a href="?page=2" rel="next nofollow">2</a>',
+        "<a class='pagination__next' href='?page=2'>&raquo;</a>",
+        '<a class="next" href=?page=2>Next</a>',
+    ],
+)
+def test_find_next_page_url(markup):
+    assert find_next_page_url(f"<nav>{markup}</nav>", BASE) == BASE + "?page=2"
+
+
+def test_find_next_page_url_unescapes_and_resolves_href():
+    markup = '<a rel="next" href="/concerts/?page=2&amp;lang=en">Next</a>'
+    assert (
+        find_next_page_url(markup, BASE)
+        == "https://example.com/concerts/?page=2&lang=en"
+    )
+
+
+def test_find_next_page_url_last_page():
+    markup = '<a class="context" href="/x">x</a><a rel="prev" href="?page=1">1</a>'
+    assert find_next_page_url(markup, BASE) is None
+
+
+# ---------------------------------------------------------------------------
+# crawl_concert_dates
+# ---------------------------------------------------------------------------
+
+
+def test_crawl_follows_next_links():
+    session = FakeSession(
+        {
+            BASE: _page(1, next_href="?page=2"),
+            BASE + "?page=2": _page(2, next_href="?page=3"),
+            BASE + "?page=3": _page(3),
+        }
+    )
+
+    pages = list(crawl_concert_dates(BASE, session=session))
+
+    assert pages == [[dt.date(2025, 3, d)] for d in (1, 2, 3)]
+
+
+def test_crawl_respects_max_pages_and_cycles():
+    session = FakeSession(
+        {
+            BASE: _page(1, next_href="?page=2"),
+            BASE + "?page=2": _page(2, next_href=BASE),
+        }
+    )
+
+    assert len(list(crawl_concert_dates(BASE, session=session))) == 2
+    assert len(list(crawl_concert_dates(BASE, session=session, max_pages=1))) == 1
+
+
+def test_crawl_prefetches_next_page():
+    session = FakeSession(
+        {BASE: _page(1, next_href="?page=2"), BASE + "?page=2": _page(2)}
+    )
+    crawl = crawl_concert_dates(BASE, session=session)
+
+    assert next(crawl) == [dt.date(2025, 3, 1)]
+    # Page 2 is requested before the consumer asks for it
+    assert session.fetched[BASE + "?page=2"].wait(timeout=2)
+    crawl.close()
+
+
+def test_crawl_stops_at_pages_older_than_stop_before():
+    session = FakeSession(
+        {
+            BASE: _page(20, next_href="?page=2"),
+            BASE + "?page=2": _page(10, next_href="?page=3"),
+            BASE + "?page=3": _page(5, next_href="?page=4"),
+            BASE + "?page=4": _page(1),
+        }
+    )
+
+    pages = list(
+        crawl_concert_dates(BASE, session=session, stop_before=dt.date(2025, 3, 15))
+    )
+
+    # Up to the first page with nothing newer
+    assert pages == [[dt.date(2025, 3, 20)], [dt.date(2025, 3, 10)]]
+    # Page 3 may already have been prefetched, but nothing beyond it
+    assert BASE + "?page=4" not in session.requested
+
+
+def test_crawl_stops_when_consumer_stops():
+    session = FakeSession(
+        {
+            BASE: _page(1, next_href="?page=2"),
+            BASE + "?page=2": _page(2, next_href="?page=3"),
+            BASE + "?page=3": _page(3),
+        }
+    )
+
+    crawl = crawl_concert_dates(BASE, session=session)
+    next(crawl)
+    crawl.close()
+
+    assert BASE + "?page=3" not in session.requested
+
+
+def test_crawl_fails_on_a_page_that_cannot_be_fetched():
+    session = FakeSession(
+        {
+            BASE: _page(1, next_href="?page=2"),
+            BASE + "?page=2": None,
+        }
+    )
+    crawl = crawl_concert_dates(BASE, session=session)
+
+    assert next(crawl) == [dt.date(2025, 3, 1)]
+    with pytest.raises(FetchError, match="page=2"):
+        next(crawl)
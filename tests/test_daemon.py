@@ -0,0 +1,105 @@
+import datetime as dt
+import random
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.daemon import AdaptiveScheduler, Daemon, ReleaseWindow
+from src.metrics import RunMetrics
+from src.service import RunStatus
+
+# A Monday
+MORNING = dt.datetime(2025, 3, 3, 8, 0)
+
+
+def test_release_window_parse():
+    assert ReleaseWindow.parse("Mon 09:55-10:15") == ReleaseWindow(
+        dt.time(9, 55), dt.time(10, 15), weekday=0
+    )
+    assert ReleaseWindow.parse("10:00-11:00").weekday is None
+    with pytest.raises(ValueError, match="Unknown weekday"):
+        ReleaseWindow.parse("Someday 10:00-11:00")
+    with pytest.raises(ValueError, match="ends before"):
+        ReleaseWindow.parse("11:00-10:00")
+
+
+def test_release_window_next_start():
+    tuesday = ReleaseWindow(dt.time(10), dt.time(11), weekday=1)
+
+    assert tuesday.next_start(MORNING) == dt.datetime(2025, 3, 4, 10, 0)
+    assert tuesday.contains(dt.datetime(2025, 3, 4, 10, 30))
+    assert not tuesday.contains(dt.datetime(2025, 3, 3, 10, 30))
+
+
+def test_scheduler_backs_off_and_resets_after_new_dates():
+    scheduler = AdaptiveScheduler(min_interval=10, max_interval=40, backoff=2, jitter=0)
+    delays = [
+        scheduler.next_delay(status, MORNING)
+        for status in [RunStatus.UNCHANGED] * 4 + [RunStatus.NEW_DATES]
+    ]
+
+    assert delays == [20, 40, 40, 40, 10]
+
+
+def test_scheduler_polls_fast_around_release_windows():
+    window = ReleaseWindow(dt.time(8, 10), dt.time(9))
+    scheduler = AdaptiveScheduler(
+        min_interval=3000, backoff=1, jitter=0, windows=[window], hot_interval=5
+    )
+
+    # Doesn't sleep through the start of the window...
+    assert scheduler.next_delay(RunStatus.UNCHANGED, MORNING) == 600
+    # ...and polls every few seconds inside it
+    inside = MORNING.replace(minute=30)
+    assert scheduler.next_delay(RunStatus.UNCHANGED, inside) == 5
+
+
+def test_scheduler_jitter_stays_within_bounds():
+    scheduler = AdaptiveScheduler(
+        min_interval=100, backoff=1, jitter=0.2, rng=random.Random(1)
+    )
+    delays = [scheduler.next_delay(RunStatus.UNCHANGED, MORNING) for _ in range(50)]
+
+    assert all(80 <= d <= 120 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_daemon_keeps_running_after_failures():
+    service = MagicMock()
+    service.run.side_effect = [RunStatus.NEW_DATES, RuntimeError("boom"), None]
+    scheduler = MagicMock()
+    scheduler.next_delay.return_value = 0
+    sink = MagicMock()
+
+    runs = Daemon(service, scheduler, metrics_sink=sink).run_forever(max_runs=3)
+
+    assert runs == 3
+    statuses = [c.args[0] for c in scheduler.next_delay.call_args_list]
+    assert statuses == [RunStatus.NEW_DATES, RunStatus.FAILED]
+    emitted: list[RunMetrics] = [c.args[0] for c in sink.emit.call_args_list]
+    assert [m.as_dict().get("errors", 0) for m in emitted] == [0, 1, 0]
+    assert emitted[0].dimensions == {"Mode": "daemon"}
+
+
+def test_daemon_stop_interrupts_the_wait():
+    service = MagicMock()
+    started = threading.Event()
+
+    def run():
+        started.set()
+        return RunStatus.UNCHANGED
+
+    service.run.side_effect = run
+    scheduler = MagicMock()
+    scheduler.next_delay.return_value = 60
+    daemon = Daemon(service, scheduler)
+
+    thread = threading.Thread(target=daemon.run_forever)
+    thread.start()
+    started.wait(timeout=5)
+    daemon.stop()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert service.run.call_count == 1
@@ -0,0 +1,72 @@
+import datetime as dt
+from dataclasses import replace
+
+from src.events import (
+    Event,
+    EventChanges,
+    EventIndex,
+    EventState,
+    available_dates,
+    diff_events,
+)
+
+DAY = dt.date(2025, 3, 1)
+
+
+def test_event_key_is_stable_across_states():
+    event = Event(DAY, dt.time(14, 30), "Cocoa Concert")
+
+    assert Event(DAY, dt.time(14, 30), "cocoa concert", sold_out=True).key == event.key
+    assert Event(DAY, dt.time(16, 30), "Cocoa Concert").key != event.key
+    assert Event(DAY, event_id="42", title="Renamed").key == "id:42"
+
+
+def test_diff_events_by_key_and_state():
+    early = Event(DAY, dt.time(10), "A")
+    late = Event(DAY, dt.time(16), "A")
+    gone = Event(DAY + dt.timedelta(days=1), title="B")
+    back = Event(DAY + dt.timedelta(days=2), title="C", sold_out=True)
+
+    changes = diff_events(
+        [early, gone, back],
+        [
+            Event(DAY, dt.time(10), "A", sold_out=True),
+            late,
+            Event(back.date, title="C"),
+        ],
+    )
+
+    assert changes.added == [late]
+    assert changes.removed == [gone]
+    assert [e.key for e in changes.sold_out] == [early.key]
+    assert [e.key for e in changes.available] == [back.key]
+    assert not diff_events([early], [early])
+
+
+def test_changes_select_and_available_dates():
+    changes = EventChanges(
+        added=[Event(DAY), Event(DAY + dt.timedelta(days=1))],
+        removed=[Event(DAY, sold_out=True)],
+    )
+
+    selected = changes.select(lambda date: date == DAY)
+
+    assert selected.added == [Event(DAY)]
+    assert selected.removed == changes.removed
+    assert available_dates([Event(DAY), Event(DAY, sold_out=True)]) == [DAY]
+
+
+def test_index_tracks_removed_events():
+    listed = Event(DAY, dt.time(10), "A")
+    dropped = Event(DAY, dt.time(16), "A", sold_out=True)
+    index = EventIndex.of_listing([listed, dropped]).updated([listed])
+
+    assert index.state(dropped) is EventState.REMOVED
+    assert index.listed() == [listed]
+    assert index.diff([listed]) == (EventChanges(), False)
+    assert index.diff([listed, replace(dropped, sold_out=False)])[0].available == [
+        replace(dropped, sold_out=False)
+    ]
+    # New details are no change to report, but the index is out of date
+    assert index.diff([replace(listed, venue="Hall")]) == (EventChanges(), True)
+    assert len(index.updated([], prune_before=DAY + dt.timedelta(days=1))) == 0
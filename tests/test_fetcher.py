@@ -0,0 +1,101 @@
+import datetime as dt
+import threading
+import time
+
+import pytest
+
+from src import metrics
+from src.fetcher import fetch_all
+from src.metrics import run_metrics
+from src.scraper import FetchError
+
+
+@pytest.fixture
+def slow_fetch(monkeypatch):
+    """Replace the page fetcher with one that takes 0.2s and records its calls."""
+    state = {"in_flight": 0, "max_in_flight": 0, "starts": []}
+    lock = threading.Lock()
+
+    def fake_fetch(url, backend="stream", session=None, **kwargs):
+        with lock:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            state["starts"].append((url, time.monotonic()))
+        time.sleep(0.2)
+        with lock:
+            state["in_flight"] -= 1
+        day = int(url.rsplit("/", 1)[1])
+        return [dt.date(2025, 1, day), dt.date(2025, 2, 1)]
+
+    monkeypatch.setattr("src.fetcher.fetch_concert_dates", fake_fetch)
+    return state
+
+
+def test_fetch_all_merges_dates(slow_fetch):
+    urls = [f"https://host{i}.example/{i}" for i in range(1, 4)]
+
+    dates = fetch_all(urls, per_host_interval=0)
+
+    assert dates == [
+        dt.date(2025, 1, 1),
+        dt.date(2025, 1, 2),
+        dt.date(2025, 1, 3),
+        dt.date(2025, 2, 1),
+    ]
+
+
+def test_fetch_all_runs_pages_concurrently(slow_fetch):
+    urls = [f"https://host{i}.example/{i}" for i in range(1, 7)]
+
+    started = time.monotonic()
+    fetch_all(urls, per_host_interval=0)
+
+    # Six 0.2s pages in roughly the time of one, not 1.2s
+    assert time.monotonic() - started < 0.6
+    assert slow_fetch["max_in_flight"] == 6
+
+
+def test_fetch_all_bounds_concurrency(slow_fetch):
+    urls = [f"https://host{i}.example/{i}" for i in range(1, 7)]
+
+    fetch_all(urls, max_concurrency=2, per_host_interval=0)
+
+    assert slow_fetch["max_in_flight"] == 2
+
+
+def test_fetch_all_rate_limits_per_host(slow_fetch):
+    urls = [f"https://same.example/{i}" for i in range(1, 4)]
+    urls.append("https://other.example/9")
+
+    fetch_all(urls, per_host_interval=0.1)
+
+    same_host = sorted(t for url, t in slow_fetch["starts"] if "same." in url)
+    gaps = [b - a for a, b in zip(same_host, same_host[1:])]
+    assert all(gap >= 0.09 for gap in gaps)
+
+
+def test_fetch_all_records_metrics_from_worker_threads(monkeypatch):
+    def fake_fetch(url, backend="stream", session=None, **kwargs):
+        metrics.incr("fetch_requests")
+        return []
+
+    monkeypatch.setattr("src.fetcher.fetch_concert_dates", fake_fetch)
+
+    with run_metrics() as run:
+        fetch_all(
+            [f"https://example.com/{i}" for i in range(1, 4)], per_host_interval=0
+        )
+
+    assert run.as_dict()["fetch_requests"] == 3
+
+
+def test_fetch_all_discards_a_partial_listing(monkeypatch):
+    def fake_fetch(url, backend="stream", session=None, **kwargs):
+        if url.endswith("/2"):
+            raise FetchError(f"Failed to fetch {url}: 404")
+        return [dt.date(2025, 1, 1)]
+
+    monkeypatch.setattr("src.fetcher.fetch_concert_dates", fake_fetch)
+
+    urls = [f"https://example.com/{i}" for i in range(1, 4)]
+    assert fetch_all(urls, per_host_interval=0) == []
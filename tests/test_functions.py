@@ -1,10 +1,27 @@
 import datetime as dt
+import hashlib
+import logging
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 import pytest
+import requests
 
+from src.events import Event
 from src.functions import get_month_number, get_year
-from src.scraper import parse_html_content
+from src.metrics import run_metrics
+from src.scraper import (
+    EVENT_PARSER_BACKENDS,
+    PARSER_BACKENDS,
+    event_list_fingerprint,
+    fetch_concert_dates,
+    fetch_concert_events,
+    iter_html_dates,
+    parse_events,
+    parse_html_content,
+    parse_many,
+)
+from src.storage import InMemoryStorage, LocalStorage, ParseCache, ValidatorCache
 
 
 def test_get_month_number():
@@ -38,3 +55,393 @@ def test_parse_html_content():
 
     assert len(dates) == 2
     assert all(d == dt.date(2025, 10, 11) for d in dates)
+
+
+def _sample_html_bytes() -> bytes:
+    return (Path(__file__).parent / "assets" / "sample_page.html").read_bytes()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 20])
+def test_iter_html_dates_matches_parse_html_content(chunk_size):
+    raw = _sample_html_bytes()
+    chunks = (raw[i : i + chunk_size] for i in range(0, len(raw), chunk_size))
+
+    assert list(iter_html_dates(chunks)) == parse_html_content(raw.decode())
+
+
+def test_iter_html_dates_stops_after_event_list():
+    raw = _sample_html_bytes()
+    consumed = []
+
+    def chunks():
+        for i in range(0, len(raw), 1024):
+            consumed.append(i)
+            yield raw[i : i + 1024]
+
+    dates = list(iter_html_dates(chunks()))
+
+    assert len(dates) == 2
+    assert len(consumed) < len(raw) // 1024
+
+
+def _article(day: int, month: str) -> str:
+    return (
+        f'<article class="event"><div class="day">{day}</div>'
+        f'<div class="month">{month}</div><div class="year">2025</div>'
+        '<div class="event__fn"><a>Buy tickets</a></div></article>'
+    )
+
+
+# An event list grouped by month, as listings of several months are.
+GROUPED_HTML = (
+    '<main><section class="block block--event-list">'
+    f"<section><h2>March</h2>{_article(3, 'March')}{_article(10, 'March')}</section>"
+    f"<section><h2>April</h2>{_article(7, 'April')}</section>"
+    "</section></main>"
+)
+
+
+def test_iter_html_dates_reads_every_group_of_the_event_list():
+    assert list(iter_html_dates([GROUPED_HTML])) == [
+        dt.date(2025, 3, 3),
+        dt.date(2025, 3, 10),
+        dt.date(2025, 4, 7),
+    ]
+
+
+def test_iter_html_dates_without_list_container_reads_to_the_end():
+    html = GROUPED_HTML.replace("block--event-list", "block") + _article(1, "May")
+
+    assert list(iter_html_dates([html]))[-1] == dt.date(2025, 5, 1)
+
+
+EDGE_CASES_HTML = """
+<div><article class="event">
+    <div class="day">31</div><div class="month">February</div><div class="year">2025</div>
+    <div class="event__fn"><a>Buy tickets</a></div>
+</article>
+<article class="event">
+    <div class="day">1</div><div class="month">March</div><div class="year">2025.</div>
+    <div class="event__fn"><a>Venue</a> <span>Sold out</span></div>
+</article>
+<article class="event">
+    <div class="day">2</div><div class="month">March</div><div class="year">2025</div>
+</article>
+<article class="event extra">
+    <div class="day"> 3 </div><div class="month">March<br/></div><div class="year">2025</div>
+    <div class="event__fn"><p>Buy tickets<img src="x"></div>
+</article></div>
+"""
+
+
+def test_iter_html_dates_skips_malformed_and_sold_out():
+    assert list(iter_html_dates([EDGE_CASES_HTML])) == [dt.date(2025, 3, 3)]
+    assert parse_html_content(EDGE_CASES_HTML) == [dt.date(2025, 3, 3)]
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+def test_parse_records_article_metrics(backend, caplog):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+
+    with caplog.at_level(logging.INFO), run_metrics() as run:
+        parse_html_content(EDGE_CASES_HTML, backend=backend)
+
+    values = run.as_dict()
+    assert values["articles_seen"] == 4
+    assert values["articles_skipped"] == 1
+    assert values["events_sold_out"] == 1
+    assert values["events_failed"] == 1
+    assert values["parse_ms"] > 0
+    # Per-date lines are debug only
+    assert "Added date" not in caplog.text
+
+
+def _page_html(page: str) -> str:
+    if page == "sample_page":
+        return _sample_html_bytes().decode()
+    return {"edge_cases": EDGE_CASES_HTML, "grouped": GROUPED_HTML}[page]
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+@pytest.mark.parametrize("page", ["sample_page", "edge_cases", "grouped"])
+def test_parser_backends_agree(backend, page):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    html = _page_html(page)
+
+    assert parse_html_content(html, backend=backend) == parse_html_content(
+        html, backend="bs4"
+    )
+
+
+def test_parse_html_content_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown parser backend"):
+        parse_html_content("", backend="nope")
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parse_many_matches_parse_html_content(max_workers):
+    raw = _sample_html_bytes()
+    documents = [raw, EDGE_CASES_HTML, "", raw.decode()]
+
+    parsed = parse_many(
+        documents, backend="stream", max_workers=max_workers, min_batch=1
+    )
+
+    assert [[dt.date.fromordinal(o) for o in ordinals] for ordinals in parsed] == [
+        parse_html_content(raw.decode()),
+        [dt.date(2025, 3, 3)],
+        [],
+        parse_html_content(raw.decode()),
+    ]
+    assert all(ordinals.typecode == "I" for ordinals in parsed)
+
+
+def test_parse_many_parses_small_batches_in_process():
+    with run_metrics() as run:
+        parse_many([EDGE_CASES_HTML], max_workers=4)
+
+    # The parsers' metrics are only recorded in this process
+    assert run.as_dict()["articles_seen"] == 4
+
+
+def test_parse_many_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown parser backend"):
+        parse_many([""], backend="nope")
+
+
+def test_fetch_concert_dates_streams_response():
+    raw = _sample_html_bytes()
+    response = MagicMock()
+    response.encoding = "utf-8"
+    response.iter_content.return_value = iter([raw[:5000], raw[5000:]])
+    response.__enter__.return_value = response
+
+    with patch("src.scraper.requests.get", return_value=response) as mock_get:
+        dates = fetch_concert_dates("https://example.com/")
+
+    assert mock_get.call_args.kwargs["stream"] is True
+    assert dates == [dt.date(2025, 10, 11), dt.date(2025, 10, 11)]
+    response.__exit__.assert_called_once()
+
+
+def test_fetch_concert_dates_records_fetch_metrics():
+    raw = _sample_html_bytes()
+    response = _mock_response(body=raw)
+
+    with patch("src.scraper.requests.get", return_value=response), run_metrics() as run:
+        fetch_concert_dates("https://example.com/")
+
+    values = run.as_dict()
+    assert values["fetch_requests"] == 1
+    assert values["fetch_bytes"] == len(raw)
+    assert values["fetch_ttfb_ms"] == 5
+    assert run.units["fetch_bytes"] == "Bytes"
+    assert "fetch_errors" not in values
+
+
+def test_fetch_concert_dates_network_error_returns_empty():
+    with patch(
+        "src.scraper.requests.get", side_effect=requests.ConnectionError("boom")
+    ):
+        assert fetch_concert_dates("https://example.com/") == []
+
+
+def _mock_response(status_code=200, body=b"", headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.encoding = "utf-8"
+    response.headers = headers or {}
+    response.elapsed = dt.timedelta(milliseconds=5)
+    response.iter_content.return_value = iter([body])
+    response.__enter__.return_value = response
+    return response
+
+
+def test_fetch_concert_dates_not_modified(tmp_path):
+    validators = ValidatorCache(LocalStorage(str(tmp_path)), "validators.json")
+    validators.stage(
+        "https://example.com/", etag='"v1"', last_modified=None, content_hash="x"
+    )
+    validators.commit()
+
+    with patch(
+        "src.scraper.requests.get", return_value=_mock_response(304)
+    ) as mock_get:
+        assert fetch_concert_dates("https://example.com/", validators) is None
+
+    assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+
+def test_fetch_concert_dates_same_body_hash_skips_parsing(tmp_path):
+    validators = ValidatorCache(LocalStorage(str(tmp_path)), "validators.json")
+    raw = _sample_html_bytes()
+
+    with patch(
+        "src.scraper.requests.get",
+        return_value=_mock_response(body=raw, headers={"ETag": '"v2"'}),
+    ):
+        assert len(fetch_concert_dates("https://example.com/", validators, "bs4")) == 2
+    validators.commit()
+
+    with (
+        patch("src.scraper.requests.get", return_value=_mock_response(body=raw)),
+        patch.dict(PARSER_BACKENDS, {"bs4": MagicMock()}),
+    ):
+        assert fetch_concert_dates("https://example.com/", validators, "bs4") is None
+        PARSER_BACKENDS["bs4"].assert_not_called()
+
+
+def test_fetch_concert_dates_hashes_the_body_while_streaming(tmp_path):
+    validators = ValidatorCache(LocalStorage(str(tmp_path)), "validators.json")
+    raw = _sample_html_bytes()
+    pieces = [raw[i : i + 256] for i in range(0, len(raw), 256)]
+    pulled = []
+    pulled_at_first_date = []
+    iter_dates = iter_html_dates
+
+    def chunks():
+        for piece in pieces:
+            pulled.append(piece)
+            yield piece
+
+    def parse(chunks, encoding):
+        for date in iter_dates(chunks, encoding):
+            pulled_at_first_date.append(len(pulled))
+            yield date
+
+    def fetch():
+        response = _mock_response()
+        response.iter_content.return_value = chunks()
+        with (
+            patch("src.scraper.requests.get", return_value=response),
+            patch("src.scraper.iter_html_dates", parse),
+        ):
+            return fetch_concert_dates("https://example.com/", validators)
+
+    assert len(fetch()) == 2
+    # Parsed while downloading, and still hashed to the last chunk
+    assert pulled_at_first_date[0] < len(pieces)
+    assert len(pulled) == len(pieces)
+    validators.commit()
+    assert validators.content_hash("https://example.com/") == (
+        hashlib.sha256(raw).hexdigest()
+    )
+
+    pulled.clear()
+    assert fetch() is None
+
+
+def test_fetch_concert_dates_with_buffered_backend():
+    with patch(
+        "src.scraper.requests.get",
+        return_value=_mock_response(body=_sample_html_bytes()),
+    ):
+        dates = fetch_concert_dates("https://example.com/", backend="bs4")
+
+    assert dates == [dt.date(2025, 10, 11), dt.date(2025, 10, 11)]
+
+
+def _listing(day, *, token="abc", comment="", footer=""):
+    return f"""<html><head><meta name="csrf-token" content="{token}"></head><body>
+    <div class="list"><!-- {comment} -->
+    <article class="event" data-rendered-at="{token}">
+        <div class="day">{day}</div><div class="month">March</div>
+        <div class="year">2025</div>
+        <form><input type="hidden" name="csrf" value="{token}"></form>
+        <div class="event__fn"><a href="/buy?session={token}">Buy tickets</a></div>
+        <script>window.renderedAt = "{token}";</script>
+    </article>
+    </div><footer>{footer}</footer></body></html>"""
+
+
+def test_event_list_fingerprint_ignores_volatile_markup():
+    fingerprint = event_list_fingerprint(_listing(1))
+
+    assert (
+        event_list_fingerprint(
+            _listing(1, token="xyz", comment="12:00", footer="Generated at 12:00")
+        )
+        == fingerprint
+    )
+    assert event_list_fingerprint(_listing(2)) != fingerprint
+
+
+def test_parse_cache_skips_parsing_seen_event_lists():
+    parse_cache = ParseCache(InMemoryStorage(), "parse_cache.json")
+    assert parse_html_content(_listing(1), parse_cache=parse_cache) == [
+        dt.date(2025, 3, 1)
+    ]
+
+    bs4 = MagicMock()
+    with patch.dict(PARSER_BACKENDS, {"bs4": bs4}), run_metrics() as run:
+        dates = parse_html_content(_listing(1, token="new"), parse_cache=parse_cache)
+
+    assert dates == [dt.date(2025, 3, 1)]
+    bs4.assert_not_called()
+    assert run.as_dict()["parse_cache_hits"] == 1
+
+
+def test_fetch_concert_dates_uses_parse_cache():
+    parse_cache = ParseCache(InMemoryStorage(), "parse_cache.json")
+    raw = _sample_html_bytes()
+
+    with patch("src.scraper.requests.get", return_value=_mock_response(body=raw)):
+        first = fetch_concert_dates("https://example.com/", parse_cache=parse_cache)
+    with (
+        patch("src.scraper.requests.get", return_value=_mock_response(body=raw)),
+        patch("src.scraper.iter_html_dates") as mock_parse,
+    ):
+        second = fetch_concert_dates("https://example.com/", parse_cache=parse_cache)
+
+    assert first == second == [dt.date(2025, 10, 11), dt.date(2025, 10, 11)]
+    mock_parse.assert_not_called()
+
+
+def test_parse_events_reads_event_details():
+    events = parse_events(_sample_html_bytes().decode())
+
+    assert events[:2] == [
+        Event(
+            date=dt.date(2025, 10, 11),
+            time=dt.time(14, 30),
+            title="Cocoa Concert",
+            venue="BFO Rehearsal Hall, Budapest",
+            url="/en/program-management-site/202526/cocoa-concert/202510111430/",
+            event_id="4672",
+        ),
+        Event(
+            date=dt.date(2025, 10, 11),
+            time=dt.time(16, 30),
+            title="Cocoa Concert",
+            venue="BFO Rehearsal Hall, Budapest",
+            url="/en/program-management-site/202526/cocoa-concert/202510111630/",
+            event_id="4673",
+        ),
+    ]
+    # Sold out events are kept, only their dates are left out
+    assert len(events) > len(parse_html_content(_sample_html_bytes().decode()))
+    assert all(e.sold_out for e in events[2:])
+
+
+@pytest.mark.parametrize("backend", sorted(EVENT_PARSER_BACKENDS))
+@pytest.mark.parametrize("page", ["sample_page", "edge_cases", "grouped"])
+def test_event_parser_backends_agree(backend, page):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    html = _page_html(page)
+
+    assert parse_events(html, backend=backend) == parse_events(html, backend="bs4")
+
+
+def test_fetch_concert_events_resolves_urls():
+    with patch(
+        "src.scraper.requests.get",
+        return_value=_mock_response(body=_sample_html_bytes()),
+    ):
+        events = fetch_concert_events("https://bfz.hu/en/concerts/")
+
+    assert events[0].url == (
+        "https://bfz.hu/en/program-management-site/202526/cocoa-concert/202510111430/"
+    )
@@ -15,11 +15,16 @@ def mock_service():
 
 
 @pytest.fixture
-def mock_config():
-    with patch("lambda_function.get_config") as mock_get:
-        mock_settings = MagicMock()
-        mock_get.return_value = mock_settings
-        yield mock_settings
+def mock_runtime():
+    with patch("lambda_function.get_runtime") as mock_get:
+        mock_instance = MagicMock()
+        mock_get.return_value = mock_instance
+        yield mock_instance
+
+
+@pytest.fixture
+def mock_config(mock_runtime):
+    return mock_runtime.config
 
 
 def test_lambda_handler_scheduled_event(mock_service, mock_config):
@@ -42,6 +47,15 @@ def test_lambda_handler_force_event(mock_service, mock_config):
     mock_service.run.assert_called_once_with(force=True)
 
 
+def test_lambda_handler_compact_archive_event(mock_service, mock_runtime):
+    with patch("src.archive.compact_archive") as compact:
+        response = lambda_handler({"action": "compact_archive"}, None)
+
+    assert response["statusCode"] == 200
+    compact.assert_called_once_with(mock_runtime.config, mock_runtime.storage)
+    mock_service.run.assert_not_called()
+
+
 def test_lambda_handler_telegram_webhook_query_authorized(mock_service, mock_config):
     mock_config.telegram_chat_id = "456"
     # Simulate an authorized Telegram webhook event
@@ -103,3 +117,58 @@ def test_lambda_handler_exception(mock_service, mock_config):
 
     assert response["statusCode"] == 500
     assert "Test error" in response["body"]
+
+
+def test_lambda_handler_reuses_runtime(mock_service, mock_runtime):
+    with patch("lambda_function.create_service") as mock_create:
+        lambda_handler({}, None)
+
+    mock_create.assert_called_once_with(mock_runtime.config, mock_runtime)
+
+
+def test_lambda_handler_exception_invalidates_runtime(mock_service, mock_config):
+    mock_service.run.side_effect = Exception("Test error")
+
+    with patch("lambda_function.invalidate_runtime") as mock_invalidate:
+        lambda_handler({}, None)
+
+    mock_invalidate.assert_called_once()
+
+
+def test_lambda_handler_profile_in_response(mock_service, mock_config, monkeypatch):
+    monkeypatch.setenv("COLD_START_PROFILE", "1")
+
+    response = lambda_handler({}, None)
+
+    profile = json.loads(response["body"])["profile"]
+    assert set(profile["phases_ms"]) == {"runtime", "create_service", "run"}
+    assert "cold_start" in profile
+
+
+def test_lambda_handler_no_profile_by_default(mock_service, mock_config, monkeypatch):
+    monkeypatch.delenv("COLD_START_PROFILE", raising=False)
+
+    response = lambda_handler({}, None)
+
+    assert "profile" not in json.loads(response["body"])
+
+
+def test_lambda_handler_emits_run_metrics(mock_service, mock_runtime):
+    response = lambda_handler({"force": True}, None)
+
+    assert response["statusCode"] == 200
+    mock_runtime.metrics_sink.emit.assert_called_once()
+    run = mock_runtime.metrics_sink.emit.call_args.args[0]
+    assert run.dimensions == {"Mode": "query"}
+    assert "run_ms" in run.as_dict()
+
+
+def test_lambda_handler_counts_errors(mock_service, mock_runtime):
+    mock_service.run.side_effect = Exception("boom")
+
+    with patch("lambda_function.invalidate_runtime"):
+        lambda_handler({}, None)
+
+    run = mock_runtime.metrics_sink.emit.call_args.args[0]
+    assert run.as_dict()["errors"] == 1
+    assert run.dimensions == {"Mode": "scheduled"}
@@ -0,0 +1,95 @@
+import io
+import json
+import logging
+import threading
+from contextvars import copy_context
+
+import pytest
+
+from src import metrics
+from src.metrics import EMFSink, LogSink, RunMetrics, get_metrics_sink, run_metrics
+
+
+def test_helpers_do_nothing_outside_a_run():
+    metrics.incr("requests")
+    with metrics.timer("fetch_ms"):
+        pass
+    assert metrics.current() is None
+
+
+def test_run_metrics_collects_counters_and_timers():
+    with run_metrics() as run:
+        metrics.incr("requests")
+        metrics.incr("requests", 2)
+        metrics.incr("body", 100, metrics.BYTES)
+        with metrics.timer("fetch_ms"):
+            pass
+        with metrics.timer("fetch_ms"):
+            pass
+
+    assert metrics.current() is None
+    assert run.as_dict()["requests"] == 3
+    assert run.units == {
+        "requests": "Count",
+        "body": "Bytes",
+        "fetch_ms": "Milliseconds",
+    }
+    assert run.as_dict()["fetch_ms"] >= 0
+
+
+def test_worker_threads_record_into_the_run_of_their_context():
+    with run_metrics() as run:
+        context = copy_context()
+    thread = threading.Thread(target=context.run, args=(metrics.incr, "requests"))
+    thread.start()
+    thread.join()
+
+    assert run.as_dict() == {"requests": 1}
+
+
+def test_emf_record_layout():
+    run = RunMetrics({"Mode": "scheduled"})
+    run.incr("requests", 2)
+    run.incr("fetch_ms", 12.5, metrics.MILLISECONDS)
+
+    record = run.to_emf("CocoaTracker")
+
+    definition = record["_aws"]["CloudWatchMetrics"][0]
+    assert definition["Namespace"] == "CocoaTracker"
+    assert definition["Dimensions"] == [["Mode"]]
+    assert definition["Metrics"] == [
+        {"Name": "fetch_ms", "Unit": "Milliseconds"},
+        {"Name": "requests", "Unit": "Count"},
+    ]
+    assert record["Mode"] == "scheduled"
+    assert record["requests"] == 2
+    assert record["fetch_ms"] == 12.5
+    assert isinstance(record["_aws"]["Timestamp"], int)
+
+
+def test_emf_sink_writes_one_json_line():
+    stream = io.StringIO()
+    run = RunMetrics()
+    run.incr("requests")
+
+    EMFSink(stream=stream).emit(run)
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["requests"] == 1
+
+
+def test_log_sink(caplog):
+    run = RunMetrics()
+    run.incr("requests")
+
+    with caplog.at_level(logging.INFO):
+        LogSink().emit(run)
+
+    assert 'Run metrics: {"requests": 1}' in caplog.text
+
+
+def test_get_metrics_sink():
+    assert isinstance(get_metrics_sink("log"), LogSink)
+    with pytest.raises(ValueError, match="Unknown metrics sink"):
+        get_metrics_sink("statsd")
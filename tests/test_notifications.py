@@ -1,7 +1,20 @@
 import datetime as dt
 from unittest.mock import MagicMock, patch
 
-from src.notifications import TelegramNotificationService
+import pytest
+import requests
+
+from src.events import Event, EventChanges
+from src.notifications import (
+    AVAILABLE_HEADER,
+    CHANGES_HEADER,
+    MAX_MESSAGE_LENGTH,
+    NotificationError,
+    TelegramNotificationService,
+    batch_dates,
+    format_changes,
+    format_message,
+)
 
 
 def test_telegram_notification_service_send_success():
@@ -37,3 +50,123 @@ def test_telegram_notification_service_send_failure():
         service.send_notification(dates)
 
         mock_post.assert_called_once()
+
+
+def test_telegram_notification_service_uses_session():
+    session = MagicMock()
+    session.post.return_value.status_code = 200
+    service = TelegramNotificationService("test_token", "test_chat_id", session=session)
+
+    with patch("src.notifications.requests.post") as mock_post:
+        service.send_notification([dt.date(2023, 10, 27)])
+
+    session.post.assert_called_once()
+    mock_post.assert_not_called()
+
+
+def test_batch_dates_fits_telegram_limit():
+    dates = [dt.date(2025, 1, 1) + dt.timedelta(days=i) for i in range(1000)]
+
+    batches = batch_dates(dates)
+
+    assert [d for batch in batches for d in batch] == dates
+    assert all(len(format_message(batch)) <= MAX_MESSAGE_LENGTH for batch in batches)
+    # Each batch is full except the last one
+    assert all(
+        len(format_message(batch + [dt.date(2025, 1, 1)])) > MAX_MESSAGE_LENGTH
+        for batch in batches[:-1]
+    )
+
+
+def test_batch_dates_single_message_for_few_dates():
+    dates = [dt.date(2025, 1, 1), dt.date(2025, 1, 2)]
+    assert batch_dates(dates) == [dates]
+    assert batch_dates([]) == []
+
+
+def test_deliver_reports_rate_limit():
+    session = MagicMock()
+    session.post.return_value.status_code = 429
+    session.post.return_value.json.return_value = {
+        "ok": False,
+        "error_code": 429,
+        "parameters": {"retry_after": 7},
+    }
+    service = TelegramNotificationService("test_token", "test_chat_id", session=session)
+
+    with pytest.raises(NotificationError) as exc_info:
+        service.deliver([dt.date(2023, 10, 27)])
+
+    assert exc_info.value.retry_after == 7
+
+
+def test_deliver_reports_errors():
+    session = MagicMock()
+    session.post.return_value.status_code = 400
+    service = TelegramNotificationService("test_token", "test_chat_id", session=session)
+
+    with pytest.raises(NotificationError) as exc_info:
+        service.deliver([dt.date(2023, 10, 27)])
+    assert exc_info.value.retry_after is None
+    assert not exc_info.value.retryable
+
+    session.post.side_effect = requests.ConnectionError("down")
+    with pytest.raises(NotificationError):
+        service.deliver([dt.date(2023, 10, 27)])
+
+
+def test_format_changes_lists_each_kind_of_change():
+    concert = Event(
+        dt.date(2025, 3, 1),
+        dt.time(14, 30),
+        "Cocoa_Concert",
+        "Hall",
+        "https://bfz.hu/e/1/",
+    )
+    changes = EventChanges(
+        available=[concert], removed=[Event(dt.date(2025, 4, 1), title="Gone")]
+    )
+
+    (message,) = format_changes(changes)
+
+    assert message == (
+        f"{CHANGES_HEADER}\n"
+        "Újra van jegy:\n"
+        "- 2025-03-01 14:30 Cocoa\\_Concert (Hall) [link](https://bfz.hu/e/1/)\n"
+        "Lekerült a műsorról:\n"
+        "- 2025-04-01 Gone"
+    )
+    assert format_changes(EventChanges()) == []
+
+
+def test_format_changes_splits_long_reports():
+    changes = EventChanges(
+        added=[Event(dt.date(2025, 1, 1), title="x" * 100) for _ in range(100)]
+    )
+
+    messages = format_changes(changes)
+
+    assert len(messages) > 1
+    assert all(len(m) <= MAX_MESSAGE_LENGTH for m in messages)
+    assert all(m.startswith(CHANGES_HEADER) for m in messages)
+    assert sum(m.count("\n- ") for m in messages) == 100
+
+
+def test_send_available_alerts_with_event_details():
+    service = TelegramNotificationService("token", "chat")
+    concert = Event(dt.date(2025, 3, 1), dt.time(10), "Cocoa", url="https://bfz.hu/")
+
+    with patch.object(service, "send_text") as send_text:
+        service.send_available([concert])
+
+    send_text.assert_called_once_with(
+        f"{AVAILABLE_HEADER}\n- 2025-03-01 10:00 Cocoa [link](https://bfz.hu/)"
+    )
+
+
+def test_send_available_reports_failure():
+    service = TelegramNotificationService("token", "chat")
+    concert = Event(dt.date(2025, 3, 1), dt.time(10), "Cocoa")
+
+    with patch.object(service, "send_text", side_effect=NotificationError("429")):
+        assert service.send_available([concert]) is False
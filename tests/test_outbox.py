@@ -0,0 +1,142 @@
+import datetime as dt
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.notifications import MAX_MESSAGE_LENGTH, NotificationError, format_message
+from src.outbox import NotificationDispatcher, NotificationOutbox
+from src.storage import DateCache, InMemoryStorage
+
+
+@pytest.fixture
+def storage():
+    return InMemoryStorage()
+
+
+@pytest.fixture
+def outbox(storage):
+    return NotificationOutbox(storage, "outbox")
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+def make_dispatcher(notifier, outbox, sleeps, **kwargs):
+    return NotificationDispatcher(notifier, outbox, sleep=sleeps.append, **kwargs)
+
+
+def test_outbox_persists_pending_dates(storage, outbox):
+    outbox.enqueue([dt.date(2025, 2, 1), dt.date(2025, 1, 1)])
+    outbox.acknowledge([dt.date(2025, 1, 1)])
+
+    assert NotificationOutbox(storage, "outbox").pending == [dt.date(2025, 2, 1)]
+
+
+def test_release_keeps_dates_other_runs_hold(storage, outbox):
+    other = NotificationOutbox(storage, "outbox")
+    outbox.enqueue([dt.date(2025, 1, 1), dt.date(2025, 2, 1)])
+    other.enqueue([dt.date(2025, 1, 1)])
+
+    outbox.release([dt.date(2025, 1, 1), dt.date(2025, 2, 1)])
+
+    assert NotificationOutbox(storage, "outbox").pending == [dt.date(2025, 1, 1)]
+    other.release([dt.date(2025, 1, 1)])
+    assert NotificationOutbox(storage, "outbox").pending == []
+
+
+def test_reads_outbox_stored_as_a_date_cache(storage):
+    storage.write("outbox", DateCache.encode([dt.date(2025, 1, 1)]))
+    outbox = NotificationOutbox(storage, "outbox")
+
+    outbox.release([dt.date(2025, 1, 1)])
+
+    assert NotificationOutbox(storage, "outbox").pending == [dt.date(2025, 1, 1)]
+    outbox.acknowledge([dt.date(2025, 1, 1)])
+    assert NotificationOutbox(storage, "outbox").pending == []
+
+
+def test_dispatch_coalesces_pending_dates(outbox, sleeps):
+    notifier = MagicMock()
+    dates = [dt.date(2025, 1, 1) + dt.timedelta(days=i) for i in range(600)]
+    outbox.enqueue(dates)
+
+    delivered = make_dispatcher(notifier, outbox, sleeps).dispatch()
+
+    assert delivered == dates
+    batches = [call.args[0] for call in notifier.deliver.call_args_list]
+    assert 1 < len(batches) < 5
+    assert all(len(format_message(batch)) <= MAX_MESSAGE_LENGTH for batch in batches)
+    assert outbox.pending == []
+
+
+def test_dispatch_retries_with_backoff(outbox, sleeps):
+    notifier = MagicMock()
+    notifier.deliver.side_effect = [NotificationError("boom")] * 2 + [None]
+    outbox.enqueue([dt.date(2025, 1, 1)])
+
+    delivered = make_dispatcher(notifier, outbox, sleeps, backoff=0.5).dispatch()
+
+    assert delivered == [dt.date(2025, 1, 1)]
+    assert sleeps == [0.5, 1.0]
+
+
+def test_dispatch_honors_retry_after(outbox, sleeps):
+    notifier = MagicMock()
+    notifier.deliver.side_effect = [NotificationError("slow down", retry_after=3), None]
+    outbox.enqueue([dt.date(2025, 1, 1)])
+
+    make_dispatcher(notifier, outbox, sleeps).dispatch()
+
+    assert sleeps == [3]
+
+
+def test_failed_delivery_stays_pending(storage, outbox, sleeps):
+    notifier = MagicMock()
+    notifier.deliver.side_effect = NotificationError("down")
+    outbox.enqueue([dt.date(2025, 1, 1)])
+
+    delivered = make_dispatcher(notifier, outbox, sleeps, max_attempts=3).dispatch()
+
+    assert delivered == []
+    assert notifier.deliver.call_count == 3
+    assert NotificationOutbox(storage, "outbox").pending == [dt.date(2025, 1, 1)]
+
+
+def test_long_retry_after_is_left_for_the_next_run(outbox, sleeps):
+    notifier = MagicMock()
+    notifier.deliver.side_effect = NotificationError("slow down", retry_after=120)
+    outbox.enqueue([dt.date(2025, 1, 1)])
+
+    delivered = make_dispatcher(notifier, outbox, sleeps, max_delay=30).dispatch()
+
+    assert delivered == []
+    assert sleeps == []
+    notifier.deliver.assert_called_once()
+
+
+def test_dispatch_sees_dates_enqueued_by_other_runs(storage, outbox, sleeps):
+    notifier = MagicMock()
+    NotificationOutbox(storage, "outbox").enqueue([dt.date(2025, 1, 1)])
+
+    assert make_dispatcher(notifier, outbox, sleeps).dispatch() == [dt.date(2025, 1, 1)]
+
+
+def test_rejected_message_is_dropped_without_blocking_the_rest(outbox, sleeps):
+    notifier = MagicMock()
+    notifier.deliver.side_effect = [
+        NotificationError("bad request", retryable=False),
+        None,
+    ]
+    dates = [dt.date(2025, 1, 1) + dt.timedelta(days=i) for i in range(600)]
+    outbox.enqueue(dates)
+
+    delivered = make_dispatcher(notifier, outbox, sleeps).dispatch()
+
+    # Not retried, and the next message still went out
+    assert notifier.deliver.call_count == 2
+    rejected = notifier.deliver.call_args_list[0].args[0]
+    assert delivered == dates[len(rejected) :]
+    assert outbox.pending == []
+    assert sleeps == []
@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from src.profiling import ImportProfiler, PhaseTimer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cold import of the Lambda entry point must stay below this many milliseconds
+COLD_IMPORT_BUDGET_MS = float(os.getenv("COLD_IMPORT_BUDGET_MS", "500"))
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_profiler_records_new_imports(tmp_path, monkeypatch):
+    (tmp_path / "profiled_outer.py").write_text("import profiled_inner\n")
+    (tmp_path / "profiled_inner.py").write_text("import time\ntime.sleep(0.02)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    profiler = ImportProfiler()
+    profiler.install()
+    try:
+        # Through builtins.__import__, like an import statement
+        __import__("profiled_outer")
+    finally:
+        profiler.uninstall()
+        sys.modules.pop("profiled_outer", None)
+        sys.modules.pop("profiled_inner", None)
+
+    records = {name: (self_s, cum_s) for name, self_s, cum_s in profiler.records}
+    assert records["profiled_inner"][1] >= 0.02
+    # The nested import counts towards the outer module, but not its self time
+    assert records["profiled_outer"][1] >= records["profiled_inner"][1]
+    assert records["profiled_outer"][0] < 0.02
+    assert profiler.slowest(1)[0]["module"] == "profiled_outer"
+
+
+def test_import_profiler_separates_threads(tmp_path, monkeypatch):
+    (tmp_path / "profiled_slow.py").write_text("import time\ntime.sleep(0.1)\n")
+    (tmp_path / "profiled_quick.py").write_text("import time\ntime.sleep(0.03)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    profiler = ImportProfiler()
+    profiler.install()
+    try:
+        slow = threading.Thread(target=__import__, args=("profiled_slow",))
+        slow.start()
+        time.sleep(0.02)
+        # Finishes while profiled_slow is still importing in the other thread
+        __import__("profiled_quick")
+        slow.join()
+    finally:
+        profiler.uninstall()
+
+    records = {name: (self_s, cum_s) for name, self_s, cum_s in profiler.records}
+    # Neither import counts as nested in the other
+    assert records["profiled_slow"][0] == records["profiled_slow"][1]
+    assert records["profiled_quick"][0] == records["profiled_quick"][1]
+
+
+def test_phase_timer_accumulates():
+    timer = PhaseTimer()
+    for _ in range(2):
+        with timer.phase("run"):
+            time.sleep(0.01)
+
+    assert timer.as_dict()["run"] >= 20
+
+
+def test_lambda_function_import_skips_scraping_stack():
+    result = _run_python(
+        "-c",
+        "import sys, lambda_function; "
+        "heavy = ('bs4', 'lxml', 'asyncio', 'dotenv', 'src.fetcher', 'src.crawler'); "
+        "print(','.join(m for m in heavy if m in sys.modules))",
+    )
+
+    assert result.stdout.strip() == ""
+
+
+def test_lambda_function_cold_import_within_budget():
+    result = _run_python("-X", "importtime", "-c", "import lambda_function")
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative_us = next(
+        int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.split("|")[-1].strip() == "lambda_function"
+    )
+    assert cumulative_us / 1e3 < COLD_IMPORT_BUDGET_MS
+
+
+def test_forced_run_skips_asyncio():
+    # A /query run answers from the cache, so it mustn't pull in asyncio either
+    script = """
+import datetime as dt, sys
+from src.config import Settings
+from src.notifications import NotificationService
+from src.service import ConcertTrackerService
+from src.storage import DateCache, InMemoryStorage
+
+class Recorder(NotificationService):
+    def send_notification(self, dates):
+        print(dates)
+
+storage = InMemoryStorage()
+config = Settings("token", "chat", "bucket")
+DateCache(storage, config.storage_file).update([dt.date(2025, 1, 1)])
+service = ConcertTrackerService(config, storage, Recorder())
+print(service.run(force=True).name, "asyncio" in sys.modules)
+"""
+    result = _run_python("-c", script)
+
+    assert result.stdout.splitlines() == [
+        "[datetime.date(2025, 1, 1)]",
+        "FORCED False",
+    ]
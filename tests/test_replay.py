@@ -0,0 +1,106 @@
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+from src.config import Settings
+from src.notifications import NotificationError, TelegramNotificationService
+from src.replay import ReplayServer, load_pages, record_pages
+from src.scraper import fetch_concert_dates, parse_html_content
+from src.service import ConcertTrackerService, RunStatus
+from src.storage import InMemoryStorage, ValidatorCache
+from src.subscribers import FanOutNotificationService, Subscriber
+
+SAMPLE_PAGE = (Path(__file__).parent / "assets" / "sample_page.html").read_bytes()
+LISTING_PATH = urlsplit(Settings("t", "c", "b").url).path
+
+
+@pytest.fixture
+def server():
+    with ReplayServer({LISTING_PATH: SAMPLE_PAGE}, retry_after=0) as server:
+        yield server
+
+
+@pytest.fixture
+def config(server):
+    return Settings("token", "chat", "bucket", replay_url=server.url)
+
+
+def test_settings_point_the_tracker_at_the_replay_server(config, server):
+    assert config.urls == [server.url + LISTING_PATH]
+    assert config.telegram_api_url == server.url
+
+
+def test_pages_are_served_with_etags(config, server):
+    validators = ValidatorCache(InMemoryStorage(), "validators.json")
+
+    dates = fetch_concert_dates(config.url, validators=validators)
+    validators.commit()
+
+    assert dates == parse_html_content(SAMPLE_PAGE.decode())
+    assert fetch_concert_dates(config.url, validators=validators) is None
+    assert [status for _, _, status in server.requests] == [200, 304]
+
+
+def test_telegram_errors_can_be_injected(config, server):
+    notifier = TelegramNotificationService(
+        "token", "chat", api_url=config.telegram_api_url
+    )
+    server.fail_telegram(429)
+
+    with pytest.raises(NotificationError) as error:
+        notifier.send_text("first")
+    notifier.send_text("second")
+
+    assert error.value.retry_after == 0
+    assert [m.text for m in server.messages] == ["second"]
+
+
+def test_telegram_rate_limit_is_emulated():
+    with ReplayServer(telegram_rate=2, retry_after=0) as server:
+        notifier = TelegramNotificationService("token", "chat", api_url=server.url)
+        notifier.send_text("one")
+        notifier.send_text("two")
+        with pytest.raises(NotificationError, match="rate limit"):
+            notifier.send_text("three")
+
+
+def test_latency_is_injected():
+    with ReplayServer({"/": b"page"}, latency=0.05) as server:
+        started = time.monotonic()
+        fetch_concert_dates(server.url + "/")
+        assert time.monotonic() - started >= 0.05
+
+
+def test_fan_out_retries_against_the_replay_server(config, server):
+    server.fail_telegram(429, 500)
+    notifier = FanOutNotificationService(
+        "token",
+        [Subscriber("a"), Subscriber("b")],
+        backoff=0,
+        api_url=config.telegram_api_url,
+    )
+
+    notifier.deliver(parse_html_content(SAMPLE_PAGE.decode()))
+
+    assert sorted(m.chat_id for m in server.messages) == ["a", "b"]
+
+
+def test_service_runs_offline(config, server):
+    service = ConcertTrackerService(
+        config,
+        InMemoryStorage(),
+        TelegramNotificationService("token", "chat", api_url=config.telegram_api_url),
+    )
+
+    assert service.run() == RunStatus.NEW_DATES
+    assert service.run() == RunStatus.UNCHANGED
+    (message,) = server.messages
+    assert message.chat_id == "chat"
+
+
+def test_record_and_load_pages(server, tmp_path):
+    record_pages([server.url + LISTING_PATH], str(tmp_path))
+
+    assert load_pages(str(tmp_path)) == {LISTING_PATH: SAMPLE_PAGE}
@@ -0,0 +1,63 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src import runtime
+from src.config import Settings
+from src.storage import TieredStorage
+
+
+@pytest.fixture(autouse=True)
+def fresh_runtime(monkeypatch):
+    monkeypatch.setattr(runtime, "_runtime", None)
+    monkeypatch.setattr(
+        runtime,
+        "get_config",
+        lambda: Settings(
+            telegram_token="test_token",
+            telegram_chat_id="test_chat",
+            bucket="test_bucket",
+        ),
+    )
+    yield
+    runtime.invalidate_runtime()
+
+
+def test_get_runtime_is_reused():
+    first = runtime.get_runtime()
+    assert runtime.get_runtime() is first
+
+
+def test_invalidate_runtime_builds_a_new_one():
+    first = runtime.get_runtime()
+    first.session = MagicMock()
+
+    runtime.invalidate_runtime()
+
+    first.session.close.assert_called_once()
+    assert runtime.get_runtime() is not first
+
+
+def test_s3_client_is_created_lazily_once():
+    rt = runtime.get_runtime()
+    with patch("boto3.client") as mock_client:
+        assert rt.s3_client is rt.s3_client
+    mock_client.assert_called_once_with("s3")
+
+
+def test_storage_caches_the_bucket():
+    rt = runtime.get_runtime()
+    rt.s3_client = MagicMock()
+
+    assert rt.storage is rt.storage
+    assert isinstance(rt.storage, TieredStorage)
+    assert rt.storage._backing._s3 is rt.s3_client
+
+
+def test_create_session_retries_idempotent_requests():
+    session = runtime.create_session(pool_size=4, retries=2)
+    adapter = session.get_adapter("https://example.com/")
+
+    assert adapter.max_retries.total == 2
+    assert "POST" not in adapter.max_retries.allowed_methods
+    assert adapter._pool_maxsize == 4
@@ -1,11 +1,23 @@
+import asyncio
 import datetime as dt
+import threading
+from dataclasses import replace
+from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 
+from src import scraper
+from src.archive import SnapshotArchive
 from src.config import Settings
-from src.service import ConcertTrackerService
-from src.storage import LocalStorage
+from src.events import Event
+from src.metrics import run_metrics
+from src.notifications import NotificationError, TelegramNotificationService
+from src.outbox import NotificationOutbox
+from src.scraper import FetchError
+from src.service import ConcertTrackerService, RunStatus, create_service
+from src.storage import InMemoryStorage, LocalStorage
+from src.subscribers import FanOutNotificationService, Subscriber, SubscriberRegistry
 
 
 @pytest.fixture
@@ -30,21 +42,23 @@ def test_service_run_new_dates(mock_config, temp_storage, monkeypatch):
 
     # Mock scraper to return specific dates
     test_dates = sorted([dt.date(2025, 1, 1), dt.date(2025, 1, 2)])
-    monkeypatch.setattr("src.service.fetch_concert_dates", lambda url: test_dates)
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: test_dates
+    )
 
     # Execution: First run (all dates are new)
-    service.run()
+    assert service.run() == RunStatus.NEW_DATES
 
     # Validation
-    mock_notification.send_notification.assert_called_once_with(sorted(test_dates))
+    mock_notification.deliver.assert_called_once_with(sorted(test_dates))
     assert len(service.cache.dates) == 2
 
     # Execution: Second run (no new dates)
     mock_notification.reset_mock()
-    service.run()
+    assert service.run() == RunStatus.NO_NEW_DATES
 
     # Validation: Notification should NOT be sent again
-    mock_notification.send_notification.assert_not_called()
+    mock_notification.deliver.assert_not_called()
 
 
 def test_service_run_force_mode(mock_config, temp_storage, monkeypatch):
@@ -52,7 +66,9 @@ def test_service_run_force_mode(mock_config, temp_storage, monkeypatch):
     service = ConcertTrackerService(mock_config, temp_storage, mock_notification)
 
     test_dates = [dt.date(2025, 1, 1)]
-    monkeypatch.setattr("src.service.fetch_concert_dates", lambda url: test_dates)
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: test_dates
+    )
 
     # First run to populate cache
     service.run()
@@ -63,3 +79,542 @@ def test_service_run_force_mode(mock_config, temp_storage, monkeypatch):
 
     # Validation: Should send notification even if dates are already in cache
     mock_notification.send_notification.assert_called_once_with(test_dates)
+
+
+def test_service_run_page_unchanged(mock_config, temp_storage, monkeypatch):
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(mock_config, temp_storage, mock_notification)
+    update = MagicMock()
+    monkeypatch.setattr(service.cache, "update", update)
+
+    calls = []
+
+    def fake_fetch(url, validators=None, **kwargs):
+        calls.append(validators)
+        return None
+
+    monkeypatch.setattr("src.service.fetch_concert_dates", fake_fetch)
+
+    assert service.run() == RunStatus.UNCHANGED
+
+    assert calls == [service.validators]
+    mock_notification.send_notification.assert_not_called()
+    update.assert_not_called()
+
+
+def test_service_run_force_skips_conditional_request(
+    mock_config, temp_storage, monkeypatch
+):
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(mock_config, temp_storage, mock_notification)
+
+    calls = []
+
+    def fake_fetch(url, validators=None, **kwargs):
+        calls.append(validators)
+        return [dt.date(2025, 1, 1)]
+
+    monkeypatch.setattr("src.service.fetch_concert_dates", fake_fetch)
+
+    service.run(force=True)
+
+    assert calls == [None]
+    mock_notification.send_notification.assert_called_once_with([dt.date(2025, 1, 1)])
+
+
+def test_service_run_multiple_urls(temp_storage, monkeypatch):
+    config = Settings(
+        telegram_token="test_token",
+        telegram_chat_id="test_chat",
+        bucket="test_bucket",
+        urls=["https://example.com/a", "https://example.com/b"],
+    )
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(config, temp_storage, mock_notification)
+
+    fetched = []
+
+    def fake_fetch_all(urls, **kwargs):
+        fetched.append(urls)
+        return [dt.date(2025, 1, 1), dt.date(2025, 1, 2)]
+
+    monkeypatch.setattr("src.fetcher.fetch_all", fake_fetch_all)
+
+    service.run()
+
+    assert fetched == [config.urls]
+    mock_notification.deliver.assert_called_once_with(
+        [dt.date(2025, 1, 1), dt.date(2025, 1, 2)]
+    )
+
+
+def test_failed_page_of_several_leaves_the_cache_alone(temp_storage, monkeypatch):
+    config = Settings(
+        telegram_token="test_token",
+        telegram_chat_id="test_chat",
+        bucket="test_bucket",
+        urls=["https://example.com/a/", "https://example.com/b/"],
+        per_host_interval=0,
+    )
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(config, temp_storage, mock_notification)
+    listings = {"a": [dt.date(2030, 3, 3)], "b": [dt.date(2030, 3, 10)]}
+    down = set()
+
+    def fake_fetch(url, **kwargs):
+        page = url.rstrip("/").rsplit("/", 1)[1]
+        if page in down:
+            raise FetchError(f"Failed to fetch {url}: 404")
+        return listings[page]
+
+    monkeypatch.setattr("src.fetcher.fetch_concert_dates", fake_fetch)
+
+    assert service.run() == RunStatus.NEW_DATES
+    down.add("b")
+    assert service.run() == RunStatus.FAILED
+    down.clear()
+    assert service.run() == RunStatus.NO_NEW_DATES
+
+    assert list(service.cache.dates) == [dt.date(2030, 3, 3), dt.date(2030, 3, 10)]
+    # Each date was announced once, not again once /b/ recovered
+    mock_notification.deliver.assert_called_once_with(
+        [dt.date(2030, 3, 3), dt.date(2030, 3, 10)]
+    )
+
+
+def test_service_run_crawls_paginated_listing(temp_storage, monkeypatch):
+    config = Settings(
+        telegram_token="test_token",
+        telegram_chat_id="test_chat",
+        bucket="test_bucket",
+        max_pages=5,
+        newest_first=True,
+    )
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(config, temp_storage, mock_notification)
+    service.cache.update([dt.date(2025, 1, 1), dt.date(2025, 2, 1)])
+
+    crawls = []
+
+    def fake_crawl(url, **kwargs):
+        crawls.append(kwargs)
+        yield [dt.date(2025, 3, 1), dt.date(2025, 2, 1)]
+
+    monkeypatch.setattr("src.crawler.crawl_concert_dates", fake_crawl)
+
+    service.run()
+
+    assert crawls[0]["stop_before"] == dt.date(2025, 2, 1)
+    mock_notification.deliver.assert_called_once_with([dt.date(2025, 3, 1)])
+    # Dates on pages that were not crawled stay cached
+    assert sorted(service.cache.dates) == [
+        dt.date(2025, 1, 1),
+        dt.date(2025, 2, 1),
+        dt.date(2025, 3, 1),
+    ]
+
+
+def test_service_run_fails_on_an_incomplete_crawl(temp_storage, monkeypatch):
+    config = Settings(
+        telegram_token="test_token",
+        telegram_chat_id="test_chat",
+        bucket="test_bucket",
+        max_pages=5,
+    )
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(config, temp_storage, mock_notification)
+    service.cache.update([dt.date(2025, 3, 1), dt.date(2025, 4, 1)])
+
+    def fake_crawl(url, **kwargs):
+        yield [dt.date(2025, 3, 1)]
+        raise FetchError("Failed to fetch page 2")
+
+    monkeypatch.setattr("src.crawler.crawl_concert_dates", fake_crawl)
+
+    assert service.run() == RunStatus.FAILED
+    # The date on the page that failed is still known
+    assert list(service.cache.dates) == [dt.date(2025, 3, 1), dt.date(2025, 4, 1)]
+
+
+def test_crawl_cut_off_at_the_first_page_is_not_a_failure(temp_storage):
+    url = "https://example.com/concerts/"
+    config = Settings(
+        telegram_token="test_token",
+        telegram_chat_id="test_chat",
+        bucket="test_bucket",
+        url=url,
+        max_pages=5,
+        newest_first=True,
+    )
+    session = MagicMock()
+    session.get.return_value.text = """<html><body><article class="event">
+        <div class="day">1</div><div class="month">March</div><div class="year">2025</div>
+        <div class="event__fn"><a>Buy tickets</a></div>
+    </article><a class="pagination__next" href="?page=2">Next</a></body></html>"""
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(
+        config, temp_storage, mock_notification, session=session
+    )
+    service.cache.update([dt.date(2025, 3, 1), dt.date(2025, 4, 1)])
+
+    # Nothing on the first page is newer than the cache, so the crawl ends there
+    assert service.run() == RunStatus.NO_NEW_DATES
+    mock_notification.deliver.assert_not_called()
+    assert list(service.cache.dates) == [dt.date(2025, 3, 1), dt.date(2025, 4, 1)]
+
+
+def test_service_run_force_with_cache_does_not_scrape(
+    mock_config, temp_storage, monkeypatch
+):
+    mock_notification = MagicMock()
+    service = ConcertTrackerService(mock_config, temp_storage, mock_notification)
+    service.cache.update([dt.date(2025, 1, 1)])
+    fetch = MagicMock()
+    monkeypatch.setattr("src.service.fetch_concert_dates", fetch)
+
+    service.run(force=True)
+
+    fetch.assert_not_called()
+    mock_notification.send_notification.assert_called_once_with([dt.date(2025, 1, 1)])
+
+
+def test_overlapping_runs_notify_each_date_once(mock_config, monkeypatch):
+    storage = InMemoryStorage()
+    first_notification, second_notification = MagicMock(), MagicMock()
+    # Both services load the (empty) cache before either of them writes
+    first = ConcertTrackerService(mock_config, storage, first_notification)
+    second = ConcertTrackerService(mock_config, storage, second_notification)
+    first.load_state()
+    second.load_state()
+    test_dates = [dt.date(2025, 1, 1), dt.date(2025, 1, 2)]
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: test_dates
+    )
+
+    first.run()
+    second.run()
+
+    first_notification.deliver.assert_called_once_with(test_dates)
+    second_notification.deliver.assert_not_called()
+
+
+def test_dates_are_not_claimed_unless_queued(mock_config, monkeypatch):
+    storage = InMemoryStorage()
+    write_if_match = storage.write_if_match
+
+    def failing_outbox_write(key, data, version):
+        if key == mock_config.outbox_file:
+            raise OSError("storage unavailable")
+        return write_if_match(key, data, version)
+
+    monkeypatch.setattr(storage, "write_if_match", failing_outbox_write)
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: [dt.date(2025, 1, 1)]
+    )
+    notifier = MagicMock()
+    with pytest.raises(OSError):
+        ConcertTrackerService(mock_config, storage, notifier).run()
+
+    # The date was not claimed, so the next run still finds it new
+    monkeypatch.setattr(storage, "write_if_match", write_if_match)
+    service = ConcertTrackerService(mock_config, storage, notifier)
+
+    assert service.run() == RunStatus.NEW_DATES
+    notifier.deliver.assert_called_once_with([dt.date(2025, 1, 1)])
+    assert service.outbox.pending == []
+
+
+def test_default_run_parses_the_page_while_it_downloads(mock_config, monkeypatch):
+    page = (Path(__file__).parent / "assets" / "sample_page.html").read_bytes()
+    chunks = [page[i : i + 256] for i in range(0, len(page), 256)]
+    pulled = []
+    pulled_at_first_date = []
+
+    def download(chunk_size):
+        for chunk in chunks:
+            pulled.append(chunk)
+            yield chunk
+
+    response = MagicMock(status_code=200, encoding="utf-8", headers={})
+    response.elapsed = dt.timedelta(milliseconds=5)
+    response.iter_content.side_effect = download
+    response.__enter__.return_value = response
+    session = MagicMock()
+    session.get.return_value = response
+    iter_html_dates = scraper.iter_html_dates
+
+    def parse(chunks, encoding):
+        for date in iter_html_dates(chunks, encoding):
+            pulled_at_first_date.append(len(pulled))
+            yield date
+
+    monkeypatch.setattr(scraper, "iter_html_dates", parse)
+    service = ConcertTrackerService(
+        mock_config, InMemoryStorage(), MagicMock(), session=session
+    )
+
+    assert service.run() == RunStatus.NEW_DATES
+    assert service.parse_cache is None
+    assert pulled_at_first_date[0] < len(chunks)
+    # Still hashed to the end, for the next run's unchanged check
+    assert len(pulled) == len(chunks)
+
+
+def test_losing_run_leaves_the_winners_date_queued(mock_config, monkeypatch):
+    storage = InMemoryStorage()
+    date = dt.date(2025, 1, 1)
+    notifier = MagicMock()
+    winner = ConcertTrackerService(mock_config, storage, notifier)
+    loser = ConcertTrackerService(mock_config, storage, MagicMock())
+    winner.load_state()
+    loser.load_state()
+    claim = loser.cache.update
+
+    def claimed_by_the_winner_first(dates):
+        # The winner queues the date the loser queued already, then claims it
+        assert winner._record_new_dates(dates) == [date]
+        return claim(dates)
+
+    monkeypatch.setattr(loser.cache, "update", claimed_by_the_winner_first)
+
+    assert loser._record_new_dates([date]) == []
+    assert winner.dispatcher.dispatch() == [date]
+    notifier.deliver.assert_called_once_with([date])
+    assert NotificationOutbox(storage, mock_config.outbox_file).pending == []
+
+
+def test_undelivered_dates_are_retried_by_the_next_run(
+    mock_config, temp_storage, monkeypatch
+):
+    mock_notification = MagicMock()
+    mock_notification.deliver.side_effect = NotificationError("down")
+    service = ConcertTrackerService(mock_config, temp_storage, mock_notification)
+    service.dispatcher.max_attempts = 1
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: [dt.date(2025, 1, 1)]
+    )
+
+    service.run()
+
+    assert service.outbox.pending == [dt.date(2025, 1, 1)]
+
+    # The page has not changed since, but the pending date is still sent
+    mock_notification.deliver.side_effect = None
+    monkeypatch.setattr("src.service.fetch_concert_dates", lambda url, **kwargs: None)
+    ConcertTrackerService(mock_config, temp_storage, mock_notification).run()
+
+    mock_notification.deliver.assert_called_with([dt.date(2025, 1, 1)])
+    assert (
+        ConcertTrackerService(
+            mock_config, temp_storage, mock_notification
+        ).outbox.pending
+        == []
+    )
+
+
+def test_force_mode_only_answers_the_admin_chat(mock_config, temp_storage, monkeypatch):
+    subscribers, admin = MagicMock(), MagicMock()
+    service = ConcertTrackerService(
+        mock_config, temp_storage, subscribers, admin_notification_service=admin
+    )
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: [dt.date(2025, 1, 1)]
+    )
+
+    service.run(force=True)
+
+    admin.send_notification.assert_called_once_with([dt.date(2025, 1, 1)])
+    subscribers.send_notification.assert_not_called()
+    subscribers.deliver.assert_not_called()
+
+
+def test_create_service_fans_out_to_subscribers(mock_config):
+    runtime = MagicMock()
+    runtime.storage = InMemoryStorage()
+    assert isinstance(
+        create_service(mock_config, runtime).notification_service,
+        TelegramNotificationService,
+    )
+
+    registry = SubscriberRegistry(runtime.storage, mock_config.subscribers_file)
+    registry.add(Subscriber("123"))
+    registry.save()
+    service = create_service(mock_config, runtime)
+
+    assert isinstance(service.notification_service, FanOutNotificationService)
+    assert service.notification_service.subscribers == [Subscriber("123")]
+    assert service.admin_notification_service.chat_id == mock_config.telegram_chat_id
+
+
+def test_service_run_records_metrics(mock_config, temp_storage, monkeypatch):
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates",
+        lambda url, **kwargs: [dt.date(2025, 1, 1), dt.date(2025, 1, 2)],
+    )
+
+    with run_metrics() as run:
+        service = ConcertTrackerService(mock_config, temp_storage, MagicMock())
+        service.run()
+
+    values = run.as_dict()
+    assert values["dates_scraped"] == 2
+    assert values["dates_new"] == 2
+    assert values["notifications_sent"] == 1
+    assert {"cache_load_ms", "scrape_ms", "cache_save_ms", "notify_ms"} <= set(values)
+
+
+def test_service_reports_event_changes(mock_config, temp_storage, monkeypatch):
+    mock_config.track_events = True
+    day = dt.date(2099, 3, 1)
+    morning = Event(day, dt.time(10), "Cocoa", event_id="1")
+    afternoon = Event(day, dt.time(16), "Cocoa", event_id="2", sold_out=True)
+    evening = Event(day, dt.time(18), "Cocoa", event_id="3")
+    listings = [
+        [morning, afternoon],
+        [replace(morning, sold_out=True), replace(afternoon, sold_out=False), evening],
+    ]
+    monkeypatch.setattr(
+        "src.service.fetch_concert_events", lambda url, **kwargs: listings.pop(0)
+    )
+    notifier = MagicMock()
+    service = ConcertTrackerService(mock_config, temp_storage, notifier)
+
+    # The first run only fills the event cache, the new date goes out as usual
+    assert service.run() == RunStatus.NEW_DATES
+    notifier.deliver.assert_called_once_with([day])
+    notifier.send_changes.assert_not_called()
+
+    assert service.run() == RunStatus.NO_NEW_DATES
+    notifier.send_available.assert_called_once_with(
+        [replace(afternoon, sold_out=False)]
+    )
+    (changes,), _ = notifier.send_changes.call_args
+    assert changes.added == [evening]
+    assert [e.event_id for e in changes.sold_out] == ["1"]
+    assert changes.available == changes.removed == []
+
+
+def test_service_alerts_reappearing_event_instead_of_new_date(
+    mock_config, temp_storage, monkeypatch
+):
+    mock_config.track_events = True
+    known = Event(dt.date(2099, 3, 1), dt.time(10), "Cocoa", event_id="1")
+    sold_out = Event(dt.date(2099, 4, 1), dt.time(10), "Cocoa", event_id="2")
+    # Sold-out events may drop off the listing and reappear once there are tickets
+    listings = [[known, replace(sold_out, sold_out=True)], [known], [known, sold_out]]
+    monkeypatch.setattr(
+        "src.service.fetch_concert_events", lambda url, **kwargs: listings.pop(0)
+    )
+    notifier = MagicMock()
+    service = ConcertTrackerService(mock_config, temp_storage, notifier)
+
+    service.run()
+    service.run()
+    notifier.reset_mock()
+
+    assert service.run() == RunStatus.NO_NEW_DATES
+    notifier.send_available.assert_called_once_with([sold_out])
+    notifier.deliver.assert_not_called()
+    assert sold_out.date in service.cache.dates
+
+
+@pytest.mark.parametrize("drops_off", [False, True])
+def test_unsent_availability_alert_is_announced_through_the_outbox(
+    mock_config, temp_storage, monkeypatch, drops_off
+):
+    mock_config.track_events = True
+    known = Event(dt.date(2099, 3, 1), dt.time(10), "Cocoa", event_id="1")
+    concert = Event(dt.date(2099, 4, 1), dt.time(10), "Cocoa", event_id="2")
+    # Whether it is still listed while sold out or not, its date is known by then
+    gone = [known] if drops_off else [known, replace(concert, sold_out=True)]
+    listings = [[known, concert], gone, [known, concert]]
+    monkeypatch.setattr(
+        "src.service.fetch_concert_events", lambda url, **kwargs: listings.pop(0)
+    )
+    notifier = MagicMock()
+    notifier.send_available.return_value = False
+    service = ConcertTrackerService(mock_config, temp_storage, notifier)
+
+    service.run()
+    service.run()
+    notifier.reset_mock()
+    notifier.send_available.return_value = False
+    notifier.deliver.side_effect = NotificationError("rate limited", retry_after=60)
+
+    assert service.run() == RunStatus.NEW_DATES
+    notifier.send_available.assert_called_once_with([concert])
+    # Kept in the outbox until it goes out
+    assert service.outbox.pending == [concert.date]
+
+
+def test_service_archives_listings(mock_config, temp_storage, monkeypatch):
+    mock_config.archive_prefix = "archive/"
+    listings = [[dt.date(2099, 3, 1)], None, [dt.date(2099, 3, 1), dt.date(2099, 3, 8)]]
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: listings.pop(0)
+    )
+    service = ConcertTrackerService(mock_config, temp_storage, MagicMock())
+
+    for _ in range(3):
+        service.run()
+
+    snapshots = list(SnapshotArchive(temp_storage, "archive/").snapshots())
+    assert [s.dates for s in snapshots] == [
+        [dt.date(2099, 3, 1)],
+        [dt.date(2099, 3, 1), dt.date(2099, 3, 8)],
+    ]
+
+
+def test_corrupt_archive_does_not_fail_the_run(mock_config, temp_storage, monkeypatch):
+    mock_config.archive_prefix = "archive/"
+    temp_storage.write("archive/index.bin", b"CSI\x01 corrupt")
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: [dt.date(2099, 3, 1)]
+    )
+    notifier = MagicMock()
+    service = ConcertTrackerService(mock_config, temp_storage, notifier)
+
+    assert service.run() == RunStatus.NEW_DATES
+
+    notifier.deliver.assert_called_once_with([dt.date(2099, 3, 1)])
+    # Loading is retried on the next run
+    temp_storage.delete("archive/index.bin")
+    assert service.run() == RunStatus.NO_NEW_DATES
+    assert len(SnapshotArchive(temp_storage, "archive/")) == 1
+
+
+def test_run_loads_state_while_fetching(mock_config, monkeypatch):
+    storage = InMemoryStorage()
+    loading = threading.Event()
+    read_versioned = storage.read_versioned
+
+    def slow_read(key):
+        if key == mock_config.storage_file:
+            loading.set()
+        return read_versioned(key)
+
+    monkeypatch.setattr(storage, "read_versioned", slow_read)
+
+    def fetch(url, **kwargs):
+        # Only returns once the date cache started loading concurrently
+        assert loading.wait(timeout=5)
+        return [dt.date(2025, 1, 1)]
+
+    monkeypatch.setattr("src.service.fetch_concert_dates", fetch)
+    notifier = MagicMock()
+    service = ConcertTrackerService(mock_config, storage, notifier)
+
+    assert service.run() == RunStatus.NEW_DATES
+    notifier.deliver.assert_called_once_with([dt.date(2025, 1, 1)])
+
+
+def test_run_works_inside_an_event_loop(mock_config, monkeypatch):
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: [dt.date(2025, 1, 1)]
+    )
+    service = ConcertTrackerService(mock_config, InMemoryStorage(), MagicMock())
+
+    async def main():
+        return service.run()
+
+    assert asyncio.run(main()) == RunStatus.NEW_DATES
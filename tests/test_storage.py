@@ -1,10 +1,24 @@
-"""Tests for LocalStorage and DateCache."""
+"""Tests for the storage backends and caches."""
 
 import datetime as dt
+import threading
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.storage import DateCache, LocalStorage
+from src.events import Event, EventIndex, EventState
+from src.storage import (
+    CacheFormatError,
+    DateCache,
+    EventCache,
+    InMemoryStorage,
+    LocalStorage,
+    ParseCache,
+    S3Storage,
+    TieredStorage,
+    ValidatorCache,
+    WriteConflictError,
+)
 
 # ---------------------------------------------------------------------------
 # Helpers / fixtures
@@ -45,6 +59,259 @@ class TestLocalStorage:
         tmp_storage.write("file.bin", b"second")
         assert tmp_storage.read("file.bin") == b"second"
 
+    def test_delete_removes_key(self, tmp_storage):
+        tmp_storage.write("file.bin", b"data")
+        tmp_storage.delete("file.bin")
+        tmp_storage.delete("file.bin")
+        assert tmp_storage.read("file.bin") is None
+
+
+# ---------------------------------------------------------------------------
+# Conditional writes
+# ---------------------------------------------------------------------------
+
+
+class TestConditionalWrites:
+    @pytest.fixture(params=["memory", "local"])
+    def storage(self, request, tmp_path):
+        if request.param == "memory":
+            return InMemoryStorage()
+        return LocalStorage(base_dir=str(tmp_path))
+
+    def test_missing_key_has_no_version(self, storage):
+        assert storage.read_versioned("k") == (None, None)
+
+    def test_write_with_current_version_succeeds(self, storage):
+        v1 = storage.write_if_match("k", b"one", None)
+        assert storage.read_versioned("k") == (b"one", v1)
+
+        v2 = storage.write_if_match("k", b"two", v1)
+        assert v2 != v1
+        assert storage.read_versioned("k") == (b"two", v2)
+
+    def test_write_with_stale_version_conflicts(self, storage):
+        v1 = storage.write_if_match("k", b"one", None)
+        storage.write_if_match("k", b"two", v1)
+
+        with pytest.raises(WriteConflictError):
+            storage.write_if_match("k", b"three", v1)
+        assert storage.read("k") == b"two"
+
+    def test_create_conflicts_when_key_exists(self, storage):
+        storage.write("k", b"one")
+        with pytest.raises(WriteConflictError):
+            storage.write_if_match("k", b"two", None)
+
+
+class TestS3Storage:
+    @pytest.fixture
+    def client(self):
+        botocore_exceptions = pytest.importorskip("botocore.exceptions")
+        client = MagicMock()
+        client.exceptions.NoSuchKey = type("NoSuchKey", (Exception,), {})
+        client.exceptions.ClientError = botocore_exceptions.ClientError
+        return client
+
+    def test_read_versioned_returns_etag(self, client):
+        client.get_object.return_value = {
+            "Body": MagicMock(read=lambda: b"data"),
+            "ETag": '"abc"',
+        }
+        assert S3Storage("bucket", client=client).read_versioned("k") == (
+            b"data",
+            '"abc"',
+        )
+
+    def test_read_if_modified_handles_not_modified(self, client):
+        client.get_object.side_effect = client.exceptions.ClientError(
+            {"Error": {"Code": "304"}}, "GetObject"
+        )
+        storage = S3Storage("bucket", client=client)
+
+        assert storage.read_if_modified("k", '"abc"') is None
+        client.get_object.assert_called_once_with(
+            Bucket="bucket", Key="k", IfNoneMatch='"abc"'
+        )
+
+    def test_write_if_match_sends_precondition(self, client):
+        client.put_object.return_value = {"ETag": '"new"'}
+        storage = S3Storage("bucket", client=client)
+
+        assert storage.write_if_match("k", b"data", '"old"') == '"new"'
+        client.put_object.assert_called_with(
+            Bucket="bucket", Key="k", Body=b"data", IfMatch='"old"'
+        )
+
+        storage.write_if_match("k", b"data", None)
+        client.put_object.assert_called_with(
+            Bucket="bucket", Key="k", Body=b"data", IfNoneMatch="*"
+        )
+
+    def test_precondition_failure_is_a_conflict(self, client):
+        client.put_object.side_effect = client.exceptions.ClientError(
+            {"Error": {"Code": "PreconditionFailed"}}, "PutObject"
+        )
+        with pytest.raises(WriteConflictError):
+            S3Storage("bucket", client=client).write_if_match("k", b"data", '"old"')
+
+    def test_other_errors_propagate(self, client):
+        client.put_object.side_effect = client.exceptions.ClientError(
+            {"Error": {"Code": "AccessDenied"}}, "PutObject"
+        )
+        with pytest.raises(client.exceptions.ClientError):
+            S3Storage("bucket", client=client).write_if_match("k", b"data", None)
+
+
+# ---------------------------------------------------------------------------
+# TieredStorage
+# ---------------------------------------------------------------------------
+
+
+class RecordingStorage(InMemoryStorage):
+    """InMemoryStorage that records which backing calls were made."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: list[str] = []
+
+    def read_versioned(self, key):
+        self.calls.append("read")
+        return super().read_versioned(key)
+
+    def read_if_modified(self, key, version):
+        self.calls.append("revalidate")
+        data, current = super().read_versioned(key)
+        if current == version:
+            return None
+        self.calls.append("transfer")
+        return data, current
+
+
+class TestTieredStorage:
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr("src.storage.time.monotonic", lambda: now[0])
+        return now
+
+    @pytest.fixture
+    def backing(self):
+        storage = RecordingStorage()
+        storage.write("k", b"one")
+        return storage
+
+    def test_reads_within_ttl_skip_the_backing_store(self, backing, clock):
+        tiered = TieredStorage(backing, ttl=60)
+        assert tiered.read("k") == b"one"
+        clock[0] += 59
+        assert tiered.read("k") == b"one"
+        assert backing.calls == ["read"]
+
+    def test_stale_entries_are_revalidated(self, backing, clock):
+        tiered = TieredStorage(backing, ttl=60)
+        tiered.read("k")
+        clock[0] += 61
+        assert tiered.read("k") == b"one"
+        assert backing.calls == ["read", "revalidate"]
+
+        backing.write("k", b"two")
+        clock[0] += 61
+        assert tiered.read("k") == b"two"
+        assert backing.calls[-2:] == ["revalidate", "transfer"]
+
+    def test_missing_keys_are_cached(self, backing, clock):
+        tiered = TieredStorage(backing, ttl=60)
+        assert tiered.read("missing") is None
+        assert tiered.read("missing") is None
+        assert backing.calls == ["read"]
+
+    def test_disk_tier_survives_a_new_process(self, backing, tmp_path):
+        TieredStorage(backing, cache_dir=str(tmp_path)).read("k")
+        backing.calls.clear()
+
+        fresh = TieredStorage(backing, cache_dir=str(tmp_path))
+        assert fresh.read_versioned("k") == backing.read_versioned("k")
+        # Revalidated by version, without transferring the content again
+        assert backing.calls[0] == "revalidate"
+        assert "transfer" not in backing.calls
+
+    def test_conditional_writes_go_through_and_refresh_the_cache(self, backing):
+        tiered = TieredStorage(backing, ttl=60)
+        _, version = tiered.read_versioned("k")
+
+        new_version = tiered.write_if_match("k", b"two", version)
+
+        assert backing.read("k") == b"two"
+        backing.calls.clear()
+        assert tiered.read_versioned("k") == (b"two", new_version)
+        assert backing.calls == []
+
+    def test_conflicts_invalidate_the_cache(self, backing):
+        tiered = TieredStorage(backing, ttl=60)
+        _, version = tiered.read_versioned("k")
+        backing.write("k", b"theirs")
+
+        with pytest.raises(WriteConflictError):
+            tiered.write_if_match("k", b"ours", version)
+        assert tiered.read("k") == b"theirs"
+
+    def test_blind_writes_invalidate_the_cache(self, backing):
+        tiered = TieredStorage(backing, ttl=60)
+        tiered.read("k")
+        tiered.write("k", b"two")
+        assert tiered.read("k") == b"two"
+
+    def test_deletes_invalidate_the_cache(self, backing):
+        tiered = TieredStorage(backing, ttl=60)
+        tiered.read("k")
+        tiered.delete("k")
+        assert tiered.read("k") is None
+        assert backing.read("k") is None
+
+    def test_least_recently_used_entries_are_evicted(self, backing):
+        for key in ("a", "b", "c"):
+            backing.write(key, b"x")
+        tiered = TieredStorage(backing, ttl=60, max_entries=2)
+        tiered.read("a")
+        tiered.read("b")
+        tiered.read("a")
+        tiered.read("c")
+        backing.calls.clear()
+
+        tiered.read("a")
+        tiered.read("c")
+        assert backing.calls == []
+        tiered.read("b")
+        assert backing.calls == ["read"]
+
+    def test_entries_are_evicted_by_size(self, backing):
+        backing.write("big", b"x" * 98)
+        backing.write("huge", b"x" * 200)
+        tiered = TieredStorage(backing, ttl=60, max_bytes=100)
+        tiered.read("k")
+        # Does not fit next to "k", which is evicted
+        tiered.read("big")
+        # Larger than the whole memory tier, never cached
+        tiered.read("huge")
+        backing.calls.clear()
+
+        tiered.read("big")
+        assert backing.calls == []
+        tiered.read("huge")
+        tiered.read("k")
+        assert backing.calls == ["read", "read"]
+
+    def test_date_cache_detects_writes_hidden_by_the_ttl(self, clock):
+        backing = InMemoryStorage()
+        tiered = TieredStorage(backing, ttl=60)
+        DateCache(tiered, "dates").update([dt.date(2025, 1, 1)])
+        # Another container adds a date the memory tier does not know about yet
+        DateCache(backing, "dates").update([dt.date(2025, 1, 1), dt.date(2025, 2, 2)])
+
+        cache = DateCache(tiered, "dates")
+        assert cache.dates == [dt.date(2025, 1, 1)]
+        assert cache.update([dt.date(2025, 1, 1), dt.date(2025, 2, 2)]) == []
+
 
 # ---------------------------------------------------------------------------
 # DateCache – initial state
@@ -55,12 +322,21 @@ class TestDateCacheInitialState:
     def test_empty_on_first_load(self, cache):
         assert cache.dates == []
 
-    def test_dates_property_returns_a_copy(self, cache):
-        """Mutating the returned list must not affect internal state."""
+    def test_dates_property_is_read_only(self, cache):
+        """The returned view cannot be used to change internal state."""
         dates = cache.dates
-        dates.append(dt.date(2025, 1, 1))
+        with pytest.raises(AttributeError):
+            dates.append(dt.date(2025, 1, 1))
+        with pytest.raises(TypeError):
+            dates[0] = dt.date(2025, 1, 1)
         assert cache.dates == []
 
+    def test_view_is_unaffected_by_later_updates(self, cache):
+        cache.update([dt.date(2025, 1, 1)])
+        dates = cache.dates
+        cache.update([dt.date(2025, 2, 2)])
+        assert dates == [dt.date(2025, 1, 1)]
+
 
 # ---------------------------------------------------------------------------
 # DateCache – adding and retrieving dates
@@ -160,3 +436,390 @@ class TestDateCacheFindNewDates:
     def test_empty_incoming_returns_empty(self, cache):
         cache.update([dt.date(2025, 1, 1)])
         assert cache.find_new_dates([]) == []
+
+
+# ---------------------------------------------------------------------------
+# DateCache – range queries
+# ---------------------------------------------------------------------------
+
+
+class TestDateCacheRangeQueries:
+    @pytest.fixture
+    def filled(self, cache):
+        cache.update(
+            [
+                dt.date(2025, 1, 31),
+                dt.date(2025, 2, 1),
+                dt.date(2025, 2, 14),
+                dt.date(2025, 2, 28),
+                dt.date(2025, 3, 1),
+                dt.date(2025, 12, 31),
+            ]
+        )
+        return cache
+
+    def test_dates_after_is_exclusive(self, filled):
+        assert filled.dates_after(dt.date(2025, 2, 28)) == [
+            dt.date(2025, 3, 1),
+            dt.date(2025, 12, 31),
+        ]
+
+    def test_dates_before_is_exclusive(self, filled):
+        assert filled.dates_before(dt.date(2025, 2, 1)) == [dt.date(2025, 1, 31)]
+
+    def test_dates_between_is_inclusive(self, filled):
+        assert filled.dates_between(dt.date(2025, 2, 1), dt.date(2025, 2, 28)) == [
+            dt.date(2025, 2, 1),
+            dt.date(2025, 2, 14),
+            dt.date(2025, 2, 28),
+        ]
+
+    def test_dates_between_with_reversed_bounds_is_empty(self, filled):
+        assert filled.dates_between(dt.date(2025, 3, 1), dt.date(2025, 2, 1)) == []
+
+    def test_dates_in_month(self, filled):
+        assert filled.dates_in_month(2025, 2) == [
+            dt.date(2025, 2, 1),
+            dt.date(2025, 2, 14),
+            dt.date(2025, 2, 28),
+        ]
+        assert filled.dates_in_month(2025, 12) == [dt.date(2025, 12, 31)]
+        assert filled.dates_in_month(2024, 2) == []
+
+    def test_view_supports_sequence_operations(self, filled):
+        view = filled.dates_in_month(2025, 2)
+        assert len(view) == 3
+        assert view[-1] == dt.date(2025, 2, 28)
+        assert view[1:] == [dt.date(2025, 2, 14), dt.date(2025, 2, 28)]
+        assert dt.date(2025, 2, 14) in view
+        assert dt.date(2025, 3, 1) not in view
+        assert view.index(dt.date(2025, 2, 28)) == 2
+
+
+# ---------------------------------------------------------------------------
+# DateCache – storage format
+# ---------------------------------------------------------------------------
+
+
+class CountingStorage(LocalStorage):
+    """LocalStorage that counts writes."""
+
+    def __init__(self, base_dir):
+        super().__init__(base_dir)
+        self.writes = 0
+
+    def write(self, key, data):
+        self.writes += 1
+        super().write(key, data)
+
+
+class TestDateCacheFormat:
+    def test_saved_in_binary_format(self, cache, tmp_storage):
+        cache.update([dt.date(2025, 6, 1), dt.date(2025, 1, 1), dt.date(2025, 6, 1)])
+
+        raw = tmp_storage.read("dates.json")
+        assert raw.startswith(DateCache.MAGIC)
+        # 12 byte header plus one 4 byte ordinal per distinct date
+        assert len(raw) == 12 + 2 * 4
+        assert DateCache.decode(raw) == [dt.date(2025, 1, 1), dt.date(2025, 6, 1)]
+
+    def test_reads_legacy_json_and_migrates_on_save(self, tmp_storage):
+        tmp_storage.write("dates.json", b'["2025-10-11", "2025-12-07"]')
+
+        cache = DateCache(storage=tmp_storage, key="dates.json")
+        assert cache.dates == [dt.date(2025, 10, 11), dt.date(2025, 12, 7)]
+
+        cache.save()
+        assert tmp_storage.read("dates.json").startswith(DateCache.MAGIC)
+        assert DateCache(storage=tmp_storage, key="dates.json").dates == cache.dates
+
+    def test_corrupt_payload_is_rejected(self, cache, tmp_storage):
+        cache.update([dt.date(2025, 1, 1)])
+        raw = bytearray(tmp_storage.read("dates.json"))
+        raw[-1] ^= 0xFF
+        tmp_storage.write("dates.json", bytes(raw))
+
+        with pytest.raises(CacheFormatError, match="checksum"):
+            DateCache(storage=tmp_storage, key="dates.json")
+
+    def test_unknown_version_is_rejected(self):
+        raw = bytearray(DateCache.encode([]))
+        raw[3] = 99
+
+        with pytest.raises(CacheFormatError, match="version"):
+            DateCache.decode(bytes(raw))
+
+    def test_unchanged_content_is_not_written(self, tmp_path):
+        storage = CountingStorage(str(tmp_path))
+        cache = DateCache(storage=storage, key="dates.json")
+
+        cache.update([])
+        assert storage.writes == 0
+
+        cache.update([dt.date(2025, 1, 1)])
+        cache.update([dt.date(2025, 1, 1)])
+        assert storage.writes == 1
+
+        DateCache(storage=storage, key="dates.json").update([dt.date(2025, 1, 1)])
+        assert storage.writes == 1
+
+
+# ---------------------------------------------------------------------------
+# DateCache – concurrent writers
+# ---------------------------------------------------------------------------
+
+
+class TestDateCacheConcurrentUpdates:
+    def test_update_returns_added_dates(self, cache):
+        assert cache.update([dt.date(2025, 1, 1)]) == [dt.date(2025, 1, 1)]
+        assert cache.update([dt.date(2025, 1, 1), dt.date(2025, 2, 2)]) == [
+            dt.date(2025, 2, 2)
+        ]
+        assert cache.update([dt.date(2025, 2, 2)]) == []
+
+    def test_concurrent_update_is_merged(self):
+        storage = InMemoryStorage()
+        DateCache(storage, "dates").update([dt.date(2025, 1, 1), dt.date(2025, 2, 2)])
+        first = DateCache(storage, "dates")
+        second = DateCache(storage, "dates")
+
+        # Both runs scraped the same new date, the first one wins it
+        assert first.update([dt.date(2025, 2, 2), dt.date(2025, 3, 3)]) == [
+            dt.date(2025, 3, 3)
+        ]
+        assert (
+            second.update(
+                [dt.date(2025, 1, 1), dt.date(2025, 2, 2), dt.date(2025, 3, 3)]
+            )
+            == []
+        )
+
+        # The removal made by the first run survives the second run's write
+        assert DateCache(storage, "dates").dates == [
+            dt.date(2025, 2, 2),
+            dt.date(2025, 3, 3),
+        ]
+        assert second.dates == [dt.date(2025, 2, 2), dt.date(2025, 3, 3)]
+
+    def test_gives_up_after_max_attempts(self):
+        storage = InMemoryStorage()
+        cache = DateCache(storage, "dates")
+        writes = 0
+
+        def conflicting_write(key, data, version):
+            nonlocal writes
+            writes += 1
+            storage.write(key, DateCache.encode([dt.date(2000, 1, writes)]))
+            raise WriteConflictError(key)
+
+        storage.write_if_match = conflicting_write
+        with pytest.raises(WriteConflictError):
+            cache.update([dt.date(2025, 1, 1)])
+        assert writes == DateCache.MAX_WRITE_ATTEMPTS
+
+    def test_parallel_runs_claim_each_date_once(self):
+        storage = InMemoryStorage()
+        scraped = [dt.date(2025, 1, d) for d in range(1, 21)]
+        claimed: list[dt.date] = []
+        barrier = threading.Barrier(4)
+
+        def run(offset):
+            cache = DateCache(storage, "dates")
+            barrier.wait()
+            claimed.extend(cache.update(scraped[offset:] + scraped[:offset]))
+
+        threads = [threading.Thread(target=run, args=(i * 5,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == scraped
+        assert DateCache(storage, "dates").dates == scraped
+
+
+# ---------------------------------------------------------------------------
+# ValidatorCache
+# ---------------------------------------------------------------------------
+
+
+class TestValidatorCache:
+    URL = "https://example.com/"
+
+    def test_no_headers_for_unknown_url(self, tmp_storage):
+        validators = ValidatorCache(tmp_storage, "validators.json")
+        assert validators.request_headers(self.URL) == {}
+        assert validators.content_hash(self.URL) is None
+
+    def test_staged_values_are_not_visible_before_commit(self, tmp_storage):
+        validators = ValidatorCache(tmp_storage, "validators.json")
+        validators.stage(self.URL, etag='"abc"', last_modified=None, content_hash="h")
+
+        assert validators.request_headers(self.URL) == {}
+        assert tmp_storage.read("validators.json") is None
+
+    def test_commit_persists_across_instances(self, tmp_storage):
+        validators = ValidatorCache(tmp_storage, "validators.json")
+        validators.stage(
+            self.URL,
+            etag='"abc"',
+            last_modified="Wed, 01 Oct 2025 10:00:00 GMT",
+            content_hash="h",
+        )
+        validators.commit()
+
+        reloaded = ValidatorCache(tmp_storage, "validators.json")
+        assert reloaded.request_headers(self.URL) == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 01 Oct 2025 10:00:00 GMT",
+        }
+        assert reloaded.content_hash(self.URL) == "h"
+
+    def test_commit_without_staged_values_does_not_write(self, tmp_storage):
+        ValidatorCache(tmp_storage, "validators.json").commit()
+        assert tmp_storage.read("validators.json") is None
+
+
+# ---------------------------------------------------------------------------
+# ParseCache
+# ---------------------------------------------------------------------------
+
+
+class TestParseCache:
+    DATES = [dt.date(2025, 3, 1), dt.date(2025, 3, 1), dt.date(2025, 4, 2)]
+
+    def test_round_trip_across_instances(self, tmp_storage):
+        cache = ParseCache(tmp_storage, "parse_cache.json")
+        assert cache.get("a") is None
+        cache.put("a", self.DATES)
+        cache.save()
+
+        assert ParseCache(tmp_storage, "parse_cache.json").get("a") == self.DATES
+
+    def test_evicts_least_recently_used(self, tmp_storage):
+        cache = ParseCache(tmp_storage, "parse_cache.json", max_entries=2)
+        cache.put("a", [])
+        cache.put("b", [])
+        cache.get("a")
+        cache.put("c", [])
+        cache.save()
+
+        reloaded = ParseCache(tmp_storage, "parse_cache.json", max_entries=2)
+        assert reloaded.get("b") is None
+        assert reloaded.get("a") == []
+        assert reloaded.get("c") == []
+
+    def test_save_only_writes_changes(self):
+        storage = InMemoryStorage()
+        cache = ParseCache(storage, "parse_cache.json")
+        cache.save()
+        assert storage.read("parse_cache.json") is None
+
+        cache.put("a", self.DATES)
+        cache.save()
+        storage.write = MagicMock()
+        # Hitting the most recent entry again leaves nothing to save
+        cache.get("a")
+        cache.save()
+        storage.write.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# EventCache
+# ---------------------------------------------------------------------------
+
+
+class TestEventCache:
+    EVENTS = [
+        Event(
+            dt.date(2025, 3, 1), dt.time(16, 30), "Cocoa", "Hall", "/e/2/", False, "2"
+        ),
+        Event(dt.date(2025, 3, 1), dt.time(10, 0), "Cocoa", "Hall", "/e/1/", True, "1"),
+        Event(dt.date(2025, 4, 1), title="Ünnep\0"),
+    ]
+
+    def test_round_trip(self):
+        entries = [
+            (self.EVENTS[0], EventState.AVAILABLE),
+            (self.EVENTS[1], EventState.SOLD_OUT),
+            (self.EVENTS[2], EventState.REMOVED),
+        ]
+        decoded = EventCache.decode(EventCache.encode(entries))
+
+        # Ordered by date and time, with NUL characters dropped
+        assert decoded == [
+            entries[1],
+            entries[0],
+            (Event(dt.date(2025, 4, 1), title="Ünnep"), EventState.REMOVED),
+        ]
+        assert EventCache.decode(EventCache.encode([])) == []
+
+    def test_encoding_is_compact(self):
+        events = [
+            Event(
+                dt.date(2025, 1, 1) + dt.timedelta(days=i),
+                dt.time(14, 30),
+                "Cocoa Concert",
+                "BFO Rehearsal Hall, Budapest",
+                f"https://bfz.hu/en/program/cocoa-concert/{i}/",
+                i % 4 == 0,
+                str(4000 + i),
+            )
+            for i in range(1000)
+        ]
+
+        index = EventIndex.of_listing(events)
+
+        assert len(EventCache.encode(index)) < 16 * len(events)
+
+    def test_rejects_corrupt_data(self):
+        data = bytearray(EventCache.encode(EventIndex.of_listing(self.EVENTS)))
+        data[-1] ^= 0xFF
+        with pytest.raises(CacheFormatError, match="checksum"):
+            EventCache.decode(bytes(data))
+        with pytest.raises(CacheFormatError):
+            EventCache.decode(b"[]")
+
+    def test_update_reports_changes_and_persists(self, tmp_storage):
+        cache = EventCache(tmp_storage, "events.bin")
+        assert cache.update(self.EVENTS[:2]).added == [self.EVENTS[1], self.EVENTS[0]]
+
+        sold_out = Event(
+            dt.date(2025, 3, 1), dt.time(16, 30), "Cocoa", event_id="2", sold_out=True
+        )
+        changes = EventCache(tmp_storage, "events.bin").update([sold_out])
+
+        assert changes.sold_out == [sold_out]
+        assert changes.removed == [self.EVENTS[1]]
+        assert EventCache(tmp_storage, "events.bin").events == (sold_out,)
+
+    def test_keeps_removed_events_until_they_are_past(self, tmp_storage):
+        future = Event(dt.date(2099, 3, 1), dt.time(10), "Cocoa", event_id="9")
+        past = Event(dt.date(2000, 3, 1), dt.time(10), "Cocoa", event_id="8")
+        cache = EventCache(tmp_storage, "events.bin")
+        cache.update([future, past])
+
+        assert cache.update([]).removed == [past, future]
+        reloaded = EventCache(tmp_storage, "events.bin")
+        assert reloaded.events == ()
+        assert list(reloaded.index) == [(future, EventState.REMOVED)]
+        # Back with tickets, so it is available again rather than new
+        changes = reloaded.update([future])
+        assert changes.available == [future] and not changes.added
+
+    def test_skips_write_without_changes(self, tmp_storage):
+        cache = EventCache(tmp_storage, "events.bin")
+        cache.update(self.EVENTS)
+
+        with patch.object(tmp_storage, "write_if_match") as write:
+            assert not cache.update(list(reversed(self.EVENTS)))
+        write.assert_not_called()
+
+    def test_overlapping_updates_report_changes_once(self):
+        storage = InMemoryStorage()
+        first = EventCache(storage, "events.bin")
+        second = EventCache(storage, "events.bin")
+
+        assert first.update(self.EVENTS[:1]).added == self.EVENTS[:1]
+        # Loaded before the first write, so its write conflicts and is re-diffed
+        assert not second.update(self.EVENTS[:1])
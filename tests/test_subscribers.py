@@ -0,0 +1,218 @@
+import datetime as dt
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.notifications import NotificationError
+from src.outbox import NotificationDispatcher, NotificationOutbox
+from src.storage import InMemoryStorage
+from src.subscribers import (
+    DeliveryProgress,
+    FanOutNotificationService,
+    MessageRateLimiter,
+    Subscriber,
+    SubscriberRegistry,
+)
+
+SATURDAY = dt.date(2025, 3, 1)
+SUNDAY = dt.date(2025, 3, 2)
+MONDAY = dt.date(2025, 3, 3)
+
+
+def _response(status_code, payload=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload or {}
+    return response
+
+
+class FakeTelegram:
+    """Session stand-in that records the chats messages were sent to."""
+
+    def __init__(self, statuses=None, delay=0.0):
+        # Per chat id, the status codes to answer with in turn (200 when exhausted)
+        self.statuses = statuses or {}
+        self.delay = delay
+        self.sent: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+
+    def post(self, url, json, headers):
+        time.sleep(self.delay)
+        chat_id = json["chat_id"]
+        with self._lock:
+            queue = self.statuses.get(chat_id, [])
+            status = queue.pop(0) if queue else 200
+            if status == 200:
+                self.sent.setdefault(chat_id, []).append(json["text"])
+        if status == 429:
+            return _response(429, {"parameters": {"retry_after": 0.01}})
+        return _response(status)
+
+
+def test_subscriber_filters():
+    weekend = Subscriber("1", weekdays=frozenset({5, 6}))
+    march = Subscriber("2", start=SUNDAY, end=MONDAY)
+
+    assert weekend.select([SATURDAY, SUNDAY, MONDAY]) == [SATURDAY, SUNDAY]
+    assert march.select([SATURDAY, SUNDAY, MONDAY]) == [SUNDAY, MONDAY]
+    assert Subscriber("3").wants(MONDAY)
+
+
+def test_registry_persists_subscribers():
+    storage = InMemoryStorage()
+    registry = SubscriberRegistry(storage, "subscribers.json")
+    registry.add(Subscriber("1", weekdays=frozenset({5}), start=SATURDAY))
+    registry.add(Subscriber("2"))
+    registry.add(Subscriber("2", end=MONDAY))
+    registry.remove("missing")
+    registry.save()
+
+    assert SubscriberRegistry(storage, "subscribers.json").subscribers == [
+        Subscriber("1", weekdays=frozenset({5}), start=SATURDAY),
+        Subscriber("2", end=MONDAY),
+    ]
+
+
+def test_fan_out_sends_each_subscriber_its_dates():
+    telegram = FakeTelegram()
+    service = FanOutNotificationService(
+        "token",
+        [
+            Subscriber("weekend", weekdays=frozenset({5, 6})),
+            Subscriber("everything"),
+            Subscriber("past", end=dt.date(2024, 1, 1)),
+        ],
+        session=telegram,
+    )
+
+    service.deliver([SATURDAY, MONDAY])
+
+    assert "2025-03-03" not in telegram.sent["weekend"][0]
+    assert "2025-03-03" in telegram.sent["everything"][0]
+    assert "past" not in telegram.sent
+    assert {r.chat_id: r.delivered for r in service.last_results} == {
+        "weekend": [SATURDAY],
+        "everything": [SATURDAY, MONDAY],
+        "past": [],
+    }
+    assert all(r.ok for r in service.last_results)
+
+
+def test_fan_out_retries_rate_limited_messages():
+    telegram = FakeTelegram(statuses={"1": [429, 429]})
+    service = FanOutNotificationService("token", [Subscriber("1")], session=telegram)
+
+    service.deliver([SATURDAY])
+
+    assert len(telegram.sent["1"]) == 1
+    assert service.last_results[0].ok
+
+
+def test_fan_out_reports_partial_failures():
+    telegram = FakeTelegram(statuses={"blocked": [403]})
+    service = FanOutNotificationService(
+        "token", [Subscriber("blocked"), Subscriber("ok")], session=telegram
+    )
+
+    # The rejected message is not retried, nor is the whole send
+    with pytest.raises(NotificationError) as error:
+        service.deliver([SATURDAY])
+
+    assert not error.value.retryable
+    results = {r.chat_id: r for r in service.last_results}
+    assert not results["blocked"].ok
+    assert results["blocked"].delivered == []
+    assert results["ok"].delivered == [SATURDAY]
+
+
+@pytest.mark.parametrize(
+    "status, retryable, retry_after",
+    [(403, False, None), (500, True, None), (429, True, 0.01)],
+)
+def test_fan_out_fails_when_nobody_was_reached(status, retryable, retry_after):
+    telegram = FakeTelegram(statuses={"1": [status] * 3})
+    service = FanOutNotificationService(
+        "token", [Subscriber("1")], session=telegram, backoff=0
+    )
+
+    with pytest.raises(NotificationError) as error:
+        service.deliver([SATURDAY])
+
+    assert error.value.retryable is retryable
+    assert error.value.retry_after == retry_after
+
+
+def test_retried_send_only_goes_to_subscribers_not_reached():
+    storage = InMemoryStorage()
+    telegram = FakeTelegram(statuses={"flaky": [500]})
+    outbox = NotificationOutbox(storage, "outbox")
+    outbox.enqueue([SATURDAY])
+
+    def dispatch():
+        service = FanOutNotificationService(
+            "token",
+            [Subscriber("flaky"), Subscriber("ok")],
+            session=telegram,
+            max_attempts=1,
+            progress=DeliveryProgress(storage, "progress.json"),
+        )
+        return NotificationDispatcher(service, outbox, max_attempts=1).dispatch()
+
+    # Kept in the outbox until every subscriber has it
+    assert dispatch() == []
+    assert outbox.pending == [SATURDAY]
+
+    assert dispatch() == [SATURDAY]
+    assert outbox.pending == []
+    assert {chat: len(texts) for chat, texts in telegram.sent.items()} == {
+        "flaky": 1,
+        "ok": 1,
+    }
+    assert storage.read("progress.json") == b"{}"
+
+
+def test_fan_out_is_concurrent_and_rate_limited():
+    subscribers = [Subscriber(str(i)) for i in range(20)]
+    telegram = FakeTelegram(delay=0.05)
+    service = FanOutNotificationService(
+        "token",
+        subscribers,
+        session=telegram,
+        max_concurrency=10,
+        messages_per_second=200,
+    )
+
+    start = time.monotonic()
+    service.deliver([SATURDAY])
+    elapsed = time.monotonic() - start
+
+    assert len(telegram.sent) == 20
+    # Sequential sends would take a second; 20 messages at 200/s take at least 0.095s
+    assert 0.095 <= elapsed < 0.5
+
+
+def test_services_sharing_a_rate_limiter_share_its_budget():
+    limiter = MessageRateLimiter(100)
+    telegram = FakeTelegram()
+    services = [
+        FanOutNotificationService(
+            "token",
+            [Subscriber(f"{i}-{j}") for j in range(5)],
+            session=telegram,
+            rate_limiter=limiter,
+        )
+        for i in range(2)
+    ]
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=s.deliver, args=([SATURDAY],)) for s in services]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(telegram.sent) == 10
+    # Ten messages at 100/s, although each service alone would need only 0.04s
+    assert time.monotonic() - start >= 0.09
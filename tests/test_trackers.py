@@ -0,0 +1,133 @@
+import datetime as dt
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.config import Settings
+from src.notifications import format_message
+from src.service import ConcertTrackerService, RunStatus, create_service
+from src.storage import DateCache, InMemoryStorage
+from src.subscribers import Subscriber
+from src.trackers import MultiTrackerService, TrackerSpec, load_tracker_specs
+
+
+@pytest.fixture
+def config():
+    return Settings(telegram_token="token", telegram_chat_id="admin", bucket="b")
+
+
+def _store_trackers(storage, trackers):
+    storage.write("trackers.json", json.dumps(trackers).encode())
+
+
+def test_spec_from_dict():
+    spec = TrackerSpec.from_dict(
+        {
+            "name": "weekend",
+            "url": "https://example.com/a",
+            "recipients": [123, "456"],
+            "weekdays": [5, 6],
+            "start": "2025-03-01",
+        }
+    )
+
+    assert spec.urls == ("https://example.com/a",)
+    assert spec.subscribers("admin") == [
+        Subscriber("123", frozenset({5, 6}), dt.date(2025, 3, 1)),
+        Subscriber("456", frozenset({5, 6}), dt.date(2025, 3, 1)),
+    ]
+    assert TrackerSpec("all", ("u",)).subscribers("admin") == [Subscriber("admin")]
+
+
+def test_spec_settings_isolate_state(config):
+    settings = TrackerSpec("kids", ("https://a", "https://b")).settings(config)
+
+    assert settings.urls == ["https://a", "https://b"]
+    assert settings.storage_file == "trackers/kids/dates.bin"
+    assert settings.outbox_file == "trackers/kids/outbox.bin"
+    assert settings.telegram_token == config.telegram_token
+
+
+def test_load_tracker_specs_rejects_bad_lists():
+    storage = InMemoryStorage()
+    assert load_tracker_specs(storage, "trackers.json") == []
+
+    _store_trackers(storage, [{"name": "a", "url": "u"}, {"name": "a", "url": "v"}])
+    with pytest.raises(ValueError, match="Duplicate tracker names: a"):
+        load_tracker_specs(storage, "trackers.json")
+    with pytest.raises(ValueError, match="Invalid tracker name"):
+        TrackerSpec("a/b", ("u",))
+
+
+def test_multi_tracker_runs_concurrently_and_isolates_failures():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def tracker(status):
+        service = MagicMock()
+
+        def run(force=False):
+            # Only returns if the other tracker runs at the same time
+            barrier.wait()
+            return status
+
+        service.run.side_effect = run
+        return lambda: service
+
+    def broken():
+        raise RuntimeError("bad config")
+
+    multi = MultiTrackerService(
+        {
+            "a": tracker(RunStatus.UNCHANGED),
+            "b": tracker(RunStatus.NEW_DATES),
+            "c": broken,
+        }
+    )
+
+    assert multi.run() == RunStatus.NEW_DATES
+    assert multi.last_results == {
+        "a": RunStatus.UNCHANGED,
+        "b": RunStatus.NEW_DATES,
+        "c": RunStatus.FAILED,
+    }
+    # Built services are kept for the next run, failed ones are retried
+    assert set(multi.services) == {"a", "b"}
+
+
+def test_create_service_runs_configured_trackers(config, monkeypatch):
+    runtime = MagicMock()
+    runtime.storage = InMemoryStorage()
+    _store_trackers(
+        runtime.storage,
+        [
+            {"name": "a", "url": "https://example.com/a", "recipients": ["1"]},
+            {"name": "b", "url": "https://example.com/b"},
+        ],
+    )
+    pages = {
+        "https://example.com/a": [dt.date(2025, 1, 1)],
+        "https://example.com/b": [dt.date(2025, 2, 1)],
+    }
+    monkeypatch.setattr(
+        "src.service.fetch_concert_dates", lambda url, **kwargs: pages[url]
+    )
+    sent = []
+    monkeypatch.setattr(
+        "src.notifications.TelegramNotificationService.send_text",
+        lambda self, text: sent.append((self.chat_id, text)),
+    )
+
+    service = create_service(config, runtime)
+
+    assert isinstance(service, MultiTrackerService)
+    assert service.run() == RunStatus.NEW_DATES
+    assert sorted(sent) == [
+        ("1", format_message([dt.date(2025, 1, 1)])),
+        ("admin", format_message([dt.date(2025, 2, 1)])),
+    ]
+    assert isinstance(service.services["a"], ConcertTrackerService)
+    assert list(DateCache(runtime.storage, "trackers/a/dates.bin").dates) == [
+        dt.date(2025, 1, 1)
+    ]